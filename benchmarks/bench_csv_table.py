@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конвертации CSV таблиц в PDF
+
+Создает CSV файл с заданным числом строк и измеряет скорость конвертации
+(строк в секунду), размер PDF и пиковое потребление памяти процессом.
+С --converter файл проходит тот же путь, что и в приложении
+(FileConverter.convert_to_document): так проверяется, что таблица на
+миллионы строк не упирается в таймаут и лимиты изолированного процесса.
+
+Пример:
+    python benchmarks/bench_csv_table.py --rows 1000000
+    python benchmarks/bench_csv_table.py --rows 2000000 --converter
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.converters import registry
+from core.file_converter import FileConverter
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def make_table(path, rows, columns):
+    """Создает CSV с числами, датами и текстом разной длины."""
+    words = ["альфа", "beta", "гамма", "delta", "эпсилон", "zeta", "эта", "theta"]
+    rng = random.Random(42)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([f"Столбец {i + 1}" for i in range(columns)])
+        for row in range(rows):
+            writer.writerow(
+                [row, f"2024-{row % 12 + 1:02d}-{row % 28 + 1:02d}", f"{rng.random() * 1000:.2f}"]
+                + [" ".join(rng.choices(words, k=rng.randint(1, 6))) for _ in range(columns - 3)]
+            )
+
+
+def peak_memory_mb():
+    """Пиковое потребление памяти процессом (МБ) или None, если недоступно."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_converter(table_path, rows):
+    """Конвертация через FileConverter (с изолированными процессами, как в приложении)."""
+    converter = FileConverter()
+    try:
+        started = time.perf_counter()
+        success, result = converter.convert_to_document(table_path)
+        elapsed = time.perf_counter() - started
+        if not success:
+            print(f"Ошибка: {result}")
+            sys.exit(1)
+
+        print(f"Время: {elapsed:.2f} с ({rows / elapsed:,.0f} строк/с)")
+        print(f"Размер PDF: {result.size / 1024 / 1024:.1f} МБ")
+        with result.open_fitz() as doc:
+            print(f"Страниц: {doc.page_count}")
+    finally:
+        converter.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--columns', type=int, default=6)
+    parser.add_argument('--converter', action='store_true',
+                        help='конвертировать через FileConverter, как приложение')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        table_path = os.path.join(temp_dir, 'table.csv')
+        make_table(table_path, args.rows, args.columns)
+        print(f"Таблица {args.rows} x {args.columns}, {os.path.getsize(table_path) / 1024 / 1024:.1f} МБ")
+
+        if args.converter:
+            run_converter(table_path, args.rows)
+            return
+
+        # PDF пишется в файл, как в приложении: пиковая память - это память конвертера,
+        # а не буфер с результатом
+        pdf_path = os.path.join(temp_dir, 'table.pdf')
+        memory_before = peak_memory_mb()
+        started = time.perf_counter()
+        success, error = registry.get('csv').convert(table_path, pdf_path, None)
+        elapsed = time.perf_counter() - started
+        if not success:
+            print(f"Ошибка: {error}")
+            return
+
+        print(f"Время: {elapsed:.2f} с ({args.rows / elapsed:,.0f} строк/с)")
+        print(f"Размер PDF: {os.path.getsize(pdf_path) / 1024 / 1024:.1f} МБ")
+        memory_after = peak_memory_mb()
+        if memory_after is not None:
+            print(f"Пиковая память: {memory_before:.0f} -> {memory_after:.0f} МБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конвертации изображений в PDF при разных target_dpi
+
+Создает синтетическую «фотографию» заданного размера и измеряет время
+конвертации и размер получившегося PDF для каждого значения DPI.
+
+Пример:
+    python benchmarks/bench_image_dpi.py --width 8000 --height 6000
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from PIL import Image
+
+from core.converters import ConversionOptions, registry
+
+
+def make_photo(path, width, height):
+    """Создает JPEG с шумом и градиентами - плохо сжимаемый, как настоящее фото."""
+    noise = Image.effect_noise((width, height), 40).convert('L')
+    gradient = Image.linear_gradient('L').resize((width, height))
+    photo = Image.merge('RGB', (noise, gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    photo.save(path, 'JPEG', quality=92)
+
+
+def run(image_path, dpi_values, repeats):
+    backend = registry.get('jpg')
+    print(f"{'DPI':>8} {'время, с':>10} {'размер PDF, КБ':>16}")
+    for dpi in dpi_values:
+        options = ConversionOptions(target_dpi=dpi)
+        timings = []
+        size = 0
+        for _ in range(repeats):
+            buffer = io.BytesIO()
+            started = time.perf_counter()
+            success, error = backend.convert(image_path, buffer, options)
+            timings.append(time.perf_counter() - started)
+            if not success:
+                print(f"Ошибка: {error}")
+                return
+            size = len(buffer.getvalue())
+        label = 'исходн.' if dpi is None else str(dpi)
+        print(f"{label:>8} {min(timings):>10.3f} {size / 1024:>16.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--width', type=int, default=8000)
+    parser.add_argument('--height', type=int, default=6000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--dpi', type=int, nargs='*', default=[300, 200, 150, 100, 72])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'photo.jpg')
+        make_photo(image_path, args.width, args.height)
+        print(f"Изображение {args.width}x{args.height}, {os.path.getsize(image_path) / 1024:.0f} КБ")
+        run(image_path, [None] + args.dpi, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк многопроцессного рендеринга страниц (страниц в секунду)
+
+Рендерит одни и те же страницы в текущем процессе и в RenderFarm с разным
+количеством процессов. Запуск процессов в замер не входит. Без --pdf
+создается синтетический документ с векторной графикой и текстом.
+
+Пример:
+    python benchmarks/bench_render_farm.py --pages 200 --workers 1 2 4 8
+    python benchmarks/bench_render_farm.py --pdf big.pdf --zoom 1.5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fitz
+
+from core.render_farm import RenderFarm
+
+
+def make_document(path, pages):
+    """Создает документ со страницами, которые заметно дольше рендерить, чем открыть."""
+    doc = fitz.open()
+    page = doc.new_page()
+    shape = page.new_shape()
+    for i in range(300):
+        x, y = 40 + (i * 37) % 520, 40 + (i * 53) % 760
+        shape.draw_circle((x, y), 5 + i % 30)
+    shape.finish(color=(0.2, 0.3, 0.8), fill=(0.9, 0.6, 0.2), fill_opacity=0.3)
+    shape.commit()
+    page.insert_textbox(fitz.Rect(40, 40, 560, 800), "Lorem ipsum dolor sit amet. " * 120, fontsize=9)
+    for _ in range(pages - 1):
+        doc.fullcopy_page(0)
+    doc.save(path)
+    doc.close()
+
+
+def run_local(pdf_path, pages, zoom):
+    """Рендеринг в текущем процессе - как в потоке предпросмотра."""
+    doc = fitz.open(pdf_path)
+    started = time.perf_counter()
+    for page_num in pages:
+        doc[page_num].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    elapsed = time.perf_counter() - started
+    doc.close()
+    return elapsed
+
+
+def run_farm(pdf_path, pages, zoom, workers):
+    farm = RenderFarm(workers)
+    try:
+        # Прогрев: процессы запущены и документ открыт в каждом
+        warmup = [farm.submit(pdf_path, 0, 0.1) for _ in range(workers * 2)]
+        for future in warmup:
+            farm.collect(future).close()
+
+        started = time.perf_counter()
+        futures = [farm.submit(pdf_path, page_num, zoom) for page_num in pages]
+        wait(futures)
+        for future in futures:
+            farm.collect(future).close()
+        return time.perf_counter() - started
+    finally:
+        farm.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pdf', help='PDF файл (по умолчанию - синтетический)')
+    parser.add_argument('--pages', type=int, default=120)
+    parser.add_argument('--zoom', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, nargs='*',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(temp_dir, 'pages.pdf')
+            make_document(pdf_path, args.pages)
+
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+        pages = [i % page_count for i in range(args.pages)]
+        print(f"Страниц: {len(pages)}, масштаб {args.zoom}, ядер: {os.cpu_count()}")
+
+        print(f"{'процессов':>10} {'время, с':>10} {'стр/с':>8} {'ускорение':>10}")
+        baseline = run_local(pdf_path, pages, args.zoom)
+        print(f"{'в потоке':>10} {baseline:>10.2f} {len(pages) / baseline:>8.1f} {1.0:>10.2f}")
+        for workers in args.workers:
+            elapsed = run_farm(pdf_path, pages, args.zoom, workers)
+            print(f"{workers:>10} {elapsed:>10.2f} {len(pages) / elapsed:>8.1f} {baseline / elapsed:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -58,6 +58,12 @@ def check_dependencies():
     except ImportError:
         print("⚠️  reportlab не установлен (конвертация текста недоступна)")
 
+    try:
+        import numpy
+        print(f"✅ numpy {numpy.__version__} (сжатие черно-белых и серых сканов)")
+    except ImportError:
+        print("⚠️  numpy не установлен (сканы сохраняются как цветные изображения)")
+
     try:
         import docx2pdf
         # Получаем версию если доступна
@@ -140,6 +146,11 @@ a = Analysis(
         'reportlab.pdfbase.pdfmetrics',
         'reportlab.lib.fonts',
         'docx2pdf',
+        # Конвертеры форматов загружаются лениво через importlib
+        'core.converters.image',
+        'core.converters.text',
+        'core.converters.table',
+        'core.converters.word',
         'platform',
         'tempfile',
         'pathlib',
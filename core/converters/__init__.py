@@ -0,0 +1,277 @@
+"""
+Реестр конвертеров форматов в PDF
+
+Каждый формат описывается объектом ConverterBackend: расширения,
+подпись для диалога выбора файлов, возможности и модуль реализации.
+Модуль реализации (и его тяжелые библиотеки: Pillow, reportlab,
+docx2pdf) импортируется только при первой конвертации этого формата,
+поэтому сессии, работающие только с PDF, их не загружают.
+
+Каждый конвертер перечисляет параметры ConversionOptions, от которых
+зависит его результат: только они входят в ключ готового результата,
+поэтому, например, смена размера страницы изображений не заставляет
+заново конвертировать Word документы.
+
+Модуль реализации должен определять функцию
+`convert(source_path, output, options) -> Tuple[bool, str]`, а также может
+определять `convert_many(jobs, options)`, `is_available()` и `shutdown()`.
+"""
+
+import importlib
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Разрешение, до которого уменьшаются изображения по умолчанию (точек на дюйм)
+DEFAULT_IMAGE_DPI = 300
+
+# Размер страницы для изображений
+PAGE_FIT_A4 = 'a4'                  # вписать в A4 с полями
+PAGE_ORIGINAL = 'original'          # исходный размер при заданном DPI
+PAGE_LONGEST_EDGE = 'longest_edge'  # длинная сторона равна длинной стороне A4
+
+PAGE_SIZE_LABELS = {
+    PAGE_FIT_A4: "Вписать в A4",
+    PAGE_ORIGINAL: "Исходный размер",
+    PAGE_LONGEST_EDGE: "По длинной стороне A4",
+}
+
+# Имена пакетов pip для модулей-зависимостей
+PACKAGE_NAMES = {
+    'PIL': 'Pillow',
+    'reportlab': 'reportlab',
+    'docx2pdf': 'docx2pdf',
+}
+
+
+# Параметры ConversionOptions
+OPTION_NAMES = ('target_dpi', 'jpeg_quality', 'page_size', 'page_dpi')
+
+
+class ConversionOptions:
+    """Параметры конвертации, передаваемые конвертерам."""
+
+    def __init__(self, target_dpi: Optional[int] = DEFAULT_IMAGE_DPI, jpeg_quality: int = 85,
+                 page_size: str = PAGE_FIT_A4, page_dpi: Optional[int] = None):
+        """
+        Args:
+            target_dpi: Максимальное разрешение изображений на странице
+                (None - встраивать изображения в исходном разрешении)
+            jpeg_quality: Качество JPEG при перекодировании уменьшенных фотографий
+            page_size: Размер страницы для изображений (PAGE_FIT_A4, PAGE_ORIGINAL,
+                PAGE_LONGEST_EDGE)
+            page_dpi: Разрешение для PAGE_ORIGINAL (None - из файла изображения)
+        """
+        if page_size not in PAGE_SIZE_LABELS:
+            raise ValueError(f"Неизвестный размер страницы: {page_size}")
+        self.target_dpi = target_dpi
+        self.jpeg_quality = jpeg_quality
+        self.page_size = page_size
+        self.page_dpi = page_dpi
+
+    def cache_key(self, names: Tuple[str, ...] = OPTION_NAMES) -> str:
+        """Строка, различающая результаты конвертации с разными значениями параметров names."""
+        return ";".join(f"{name}={getattr(self, name)}" for name in names)
+
+
+class ConverterBackend:
+    """Описание конвертера одного семейства форматов."""
+
+    def __init__(self, name: str, extensions: Tuple[str, ...], label: str,
+                 module: Optional[str] = None, requirements: Tuple[str, ...] = (),
+                 purpose: str = "", in_memory: bool = True, batch: bool = False,
+                 probe: bool = False, options: Tuple[str, ...] = (),
+                 isolated: bool = True, time_limited: bool = True):
+        """
+        Args:
+            name: Имя конвертера
+            extensions: Расширения файлов без точки
+            label: Подпись для фильтра диалога выбора файлов
+            module: Модуль реализации, относительно core.converters или абсолютный
+                (None - файл уже является PDF)
+            requirements: Модули, необходимые для работы
+            purpose: Для чего нужны зависимости (для сообщений пользователю)
+            in_memory: Пишет PDF в память (иначе - в файл каталога сессии)
+            batch: Поддерживает параллельную конвертацию convert_many
+            probe: Доступность определяется функцией is_available модуля
+            options: Параметры ConversionOptions, влияющие на результат
+            isolated: Конвертирует в изолированном процессе (иначе - в текущем,
+                например, передавая работу внешней программе)
+            time_limited: Конвертация ограничена таймаутом изолированного процесса
+        """
+        self.name = name
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.label = label
+        self.module = module
+        self.requirements = requirements
+        self.purpose = purpose
+        self.in_memory = in_memory
+        self.batch = batch
+        self.probe = probe
+        self.options = tuple(options)
+        self.isolated = isolated
+        self.time_limited = time_limited
+        self._impl = None
+
+    @property
+    def passthrough(self) -> bool:
+        """Файлы этого формата не требуют конвертации."""
+        return self.module is None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._impl is not None
+
+    def variant(self, options: ConversionOptions) -> str:
+        """Вариант конвертации для ключа результата: имя и влияющие на результат параметры."""
+        return f"{self.name};{options.cache_key(self.options)}"
+
+    def load(self):
+        """Импортирует модуль реализации при первом обращении."""
+        if self._impl is None:
+            self._impl = importlib.import_module(self.module, __name__)
+        return self._impl
+
+    def missing_requirements(self) -> List[str]:
+        """Возвращает недостающие модули, не импортируя их."""
+        return [
+            name for name in self.requirements
+            if importlib.util.find_spec(name) is None
+        ]
+
+    def missing_packages(self) -> List[str]:
+        """Возвращает имена pip пакетов для недостающих модулей."""
+        return [PACKAGE_NAMES.get(name, name) for name in self.missing_requirements()]
+
+    def is_available(self) -> bool:
+        """Проверяет, может ли конвертер работать в текущем окружении."""
+        if self.passthrough:
+            return True
+        if self.missing_requirements():
+            return False
+        if self.probe:
+            return self.load().is_available()
+        return True
+
+    def convert(self, source_path: str, output,
+                options: Optional[ConversionOptions] = None) -> Tuple[bool, str]:
+        """Конвертирует файл в PDF (путь или файловый объект)."""
+        return self.load().convert(source_path, output, options or ConversionOptions())
+
+    def convert_many(self, jobs: List[Tuple[str, str]],
+                     options: Optional[ConversionOptions] = None) -> Optional[List[Tuple[bool, str]]]:
+        """
+        Параллельно конвертирует пары (исходный_путь, путь_к_pdf).
+
+        Returns:
+            Результаты или None, если параллельная конвертация сейчас недоступна
+        """
+        if not self.batch:
+            return None
+        return self.load().convert_many(jobs, options or ConversionOptions())
+
+    def shutdown(self):
+        """Освобождает ресурсы загруженной реализации."""
+        if self._impl is not None and hasattr(self._impl, 'shutdown'):
+            self._impl.shutdown()
+
+
+class ConverterRegistry:
+    """Реестр конвертеров с поиском по расширению."""
+
+    def __init__(self):
+        self._backends: List[ConverterBackend] = []
+        self._by_extension: Dict[str, ConverterBackend] = {}
+
+    def register(self, backend: ConverterBackend) -> ConverterBackend:
+        """Регистрирует конвертер; более поздняя регистрация переопределяет расширения."""
+        self._backends.append(backend)
+        for ext in backend.extensions:
+            self._by_extension[ext] = backend
+        return backend
+
+    @property
+    def backends(self) -> List[ConverterBackend]:
+        return list(self._backends)
+
+    def by_name(self, name: str) -> ConverterBackend:
+        """Возвращает конвертер по имени."""
+        for backend in self._backends:
+            if backend.name == name:
+                return backend
+        raise KeyError(f"Неизвестный конвертер: {name}")
+
+    def extensions(self) -> List[str]:
+        """Все поддерживаемые расширения в порядке регистрации."""
+        return list(self._by_extension)
+
+    def get(self, extension: str) -> Optional[ConverterBackend]:
+        """Возвращает конвертер для расширения (с точкой или без)."""
+        return self._by_extension.get(extension.lower().lstrip('.'))
+
+    def for_path(self, file_path: str) -> Optional[ConverterBackend]:
+        """Возвращает конвертер для файла по его расширению."""
+        return self.get(Path(file_path).suffix)
+
+    def is_supported(self, file_path: str) -> bool:
+        return self.for_path(file_path) is not None
+
+    def file_filter(self) -> str:
+        """Строит фильтр файлов для QFileDialog."""
+        all_supported = " ".join(f"*.{ext}" for ext in self.extensions())
+
+        filters = [f"Все поддерживаемые файлы ({all_supported})"]
+        for backend in self._backends:
+            patterns = " ".join(f"*.{ext}" for ext in backend.extensions)
+            filters.append(f"{backend.label} ({patterns})")
+        filters.append("Все файлы (*.*)")
+
+        return ";;".join(filters)
+
+    def missing_dependencies(self) -> List[str]:
+        """Возвращает недостающие зависимости в виде 'пакет (для чего)'."""
+        purposes: Dict[str, List[str]] = {}
+        for backend in self._backends:
+            for package in backend.missing_packages():
+                purposes.setdefault(package, []).append(backend.purpose)
+            if backend.probe and not backend.missing_requirements() and not backend.is_available():
+                purposes.setdefault(backend.load().INSTALL_HINT, []).append(backend.purpose)
+
+        return [
+            f"{package} (для {' и '.join(items)})"
+            for package, items in purposes.items()
+        ]
+
+    def shutdown(self):
+        """Освобождает ресурсы всех загруженных конвертеров."""
+        for backend in self._backends:
+            backend.shutdown()
+
+
+registry = ConverterRegistry()
+
+registry.register(ConverterBackend(
+    'pdf', ('pdf',), "PDF файлы",
+))
+registry.register(ConverterBackend(
+    'word', ('doc', 'docx'), "Word документы",
+    module='.word', purpose="Word документов",
+    in_memory=False, batch=True, probe=True, isolated=False,
+))
+registry.register(ConverterBackend(
+    'text', ('txt',), "Текстовые файлы",
+    module='.text', requirements=('reportlab',), purpose="текста",
+))
+# Таблица на миллионы строк конвертируется дольше таймаута изолированного
+# процесса и дает PDF в сотни МБ - изолированный процесс пишет такие файлы
+# прямо в каталог сессии и работает без таймаута
+registry.register(ConverterBackend(
+    'table', ('csv', 'tsv'), "Таблицы CSV/TSV",
+    module='.table', requirements=('reportlab',), purpose="таблиц",
+    in_memory=False, time_limited=False,
+))
+registry.register(ConverterBackend(
+    'image', ('jpg', 'jpeg', 'png', 'bmp', 'tif', 'tiff', 'gif', 'webp'), "Изображения",
+    module='.image', requirements=('PIL', 'reportlab'), purpose="изображений",
+    options=OPTION_NAMES,
+))
@@ -0,0 +1,413 @@
+"""
+Конвертер изображений (JPG, PNG, BMP, TIFF, GIF, WebP) в PDF
+
+Каждый кадр многостраничного TIFF или анимированного GIF/WebP становится
+отдельной страницей. Кадры декодируются по одному, поэтому в памяти не
+держится больше одного кадра. Снимки телефонов в формате MPO (JPEG с
+дополнительными изображениями: глубина, превью) дают одну страницу с
+основным изображением, как обычный JPEG.
+
+Размер страницы задается options.page_size: изображение вписывается в A4
+с полями, занимает страницу своего исходного размера при заданном DPI или
+страницу, чья длинная сторона равна длинной стороне A4. Если при этом оно получает
+разрешение выше options.target_dpi, оно заранее уменьшается: для JPEG
+через draft-декодирование в 1/2, 1/4 или 1/8 масштаба, затем
+целочисленным Image.reduce и, при необходимости, точным resize.
+Нетронутые JPEG встраиваются в PDF как есть, без перекодирования.
+
+Сканы документов распознаются по пикселям (NumPy): фактически черно-белые
+изображения встраиваются как 1-битные, серые - как 8-битные DeviceGray
+вместо трехканального RGB. Без NumPy классификация опирается только на
+режим изображения. Кадры TIFF, уже сжатые CCITT G4 одной полосой,
+встраиваются без перекодирования.
+"""
+
+import hashlib
+import io
+import math
+import zlib
+from typing import Optional, Tuple
+
+from PIL import Image, ImageSequence
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+
+from . import PAGE_ORIGINAL, PAGE_LONGEST_EDGE
+from .reportlab_utils import binary_streams, register_image_xobject
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Отступ от краев страницы (пункты)
+PAGE_MARGIN = 20
+
+# Разрешение для исходного размера страницы, если в файле оно не указано
+DEFAULT_SOURCE_DPI = 96
+
+# Максимальный размер стороны страницы по спецификации PDF (пункты)
+MAX_PAGE_SIDE = 14400
+
+# Форматы, каждый кадр которых - отдельная страница
+MULTI_FRAME_FORMATS = ('TIFF', 'GIF', 'WEBP')
+
+# Форматы JPEG: MPO - JPEG с дополнительными изображениями после основного
+JPEG_FORMATS = ('JPEG', 'MPO')
+
+# Классы изображений
+KIND_BITONAL = 'bitonal'
+KIND_GRAY = 'gray'
+KIND_COLOR = 'color'
+
+# Сколько пикселей анализировать при классификации (выборка по сетке)
+_SAMPLE_PIXELS = 1_000_000
+
+# Пиксель считается цветным, если каналы расходятся больше чем на это значение
+_GRAY_TOLERANCE = 24
+
+# Допустимая доля цветных пикселей в сером изображении (шум JPEG)
+_COLOR_FRACTION = 0.001
+
+# Допустимая доля полутонов в черно-белом изображении (сглаженные края)
+_MIDTONE_FRACTION = 0.04
+
+# Порог бинаризации черно-белых изображений
+_BITONAL_THRESHOLD = 128
+
+
+def _fit_to_page(img_width: int, img_height: int) -> Tuple[float, float, float, float]:
+    """Вычисляет положение и размер изображения на странице A4 (x, y, ширина, высота)."""
+    page_width, page_height = A4
+
+    # Вычисляем масштаб для вписывания в страницу
+    scale_x = (page_width - 2 * PAGE_MARGIN) / img_width
+    scale_y = (page_height - 2 * PAGE_MARGIN) / img_height
+    scale = min(scale_x, scale_y, 1.0)  # Не увеличиваем, только уменьшаем
+
+    # Вычисляем позицию для центрирования
+    scaled_width = img_width * scale
+    scaled_height = img_height * scale
+    x = (page_width - scaled_width) / 2
+    y = (page_height - scaled_height) / 2
+    return x, y, scaled_width, scaled_height
+
+
+def _source_dpi(img: Image.Image) -> float:
+    """Разрешение изображения из его метаданных."""
+    dpi = img.info.get('dpi')
+    try:
+        value = float(dpi[0])
+    except (TypeError, ValueError, IndexError):
+        return DEFAULT_SOURCE_DPI
+    # Некоторые программы пишут 1 или 0 вместо отсутствующего значения
+    return value if value >= 10 else DEFAULT_SOURCE_DPI
+
+
+def _page_layout(img: Image.Image, options) -> Tuple[Tuple[float, float], Tuple[float, float, float, float]]:
+    """Возвращает размер страницы и положение изображения на ней ((ш, в), (x, y, ш, в))."""
+    if options.page_size == PAGE_ORIGINAL:
+        dpi = options.page_dpi or _source_dpi(img)
+        scale = min(72 / dpi, MAX_PAGE_SIDE / max(img.size))
+        width = img.width * scale
+        height = img.height * scale
+        return (width, height), (0, 0, width, height)
+
+    if options.page_size == PAGE_LONGEST_EDGE:
+        scale = max(A4) / max(img.size)
+        width = img.width * scale
+        height = img.height * scale
+        return (width, height), (0, 0, width, height)
+
+    return A4, _fit_to_page(*img.size)
+
+
+def _target_pixels(width_pt: float, height_pt: float,
+                   target_dpi: Optional[int]) -> Optional[Tuple[int, int]]:
+    """Размер в пикселях, нужный для вывода с target_dpi (None - без ограничения)."""
+    if not target_dpi:
+        return None
+    return (max(1, math.ceil(width_pt / 72 * target_dpi)),
+            max(1, math.ceil(height_pt / 72 * target_dpi)))
+
+
+def _downsample(img: Image.Image, target: Tuple[int, int]) -> Image.Image:
+    """Уменьшает изображение до target, используя самые дешевые способы декодирования."""
+    # JPEG: декодирование сразу в уменьшенном масштабе (до загрузки пикселей)
+    if img.format in JPEG_FORMATS:
+        img.draft(img.mode, target)
+
+    # reduce и resize с усреднением не работают с 1-битными и палитровыми изображениями
+    if img.mode == '1':
+        img = img.convert('L')
+    elif img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+    # Целочисленное уменьшение усреднением блоков
+    factor = int(min(img.width / target[0], img.height / target[1]))
+    if factor >= 2:
+        img = img.reduce(factor)
+
+    # Доводим до точного размера, если остаток заметный
+    if img.width > target[0] * 1.05:
+        img = img.resize(target, Image.Resampling.LANCZOS)
+
+    return img
+
+
+def _classify(img: Image.Image) -> str:
+    """Определяет, является ли изображение черно-белым, серым или цветным."""
+    if img.mode == '1':
+        return KIND_BITONAL
+    if not NUMPY_AVAILABLE:
+        return KIND_GRAY if img.mode in ('L', 'LA') else KIND_COLOR
+    if img.mode not in ('RGB', 'L'):
+        # Палитры, прозрачность, CMYK и 16-битные режимы оставляем как есть
+        return KIND_COLOR
+
+    # Равномерная выборка без усреднения, чтобы не размыть края штрихов
+    step = max(1, math.isqrt(img.width * img.height // _SAMPLE_PIXELS))
+    sample = img
+    if step > 1:
+        sample = img.resize((img.width // step, img.height // step), Image.Resampling.NEAREST)
+
+    if sample.mode == 'RGB':
+        pixels = np.asarray(sample)
+        spread = pixels.max(axis=2) - pixels.min(axis=2)
+        if np.count_nonzero(spread > _GRAY_TOLERANCE) > spread.size * _COLOR_FRACTION:
+            return KIND_COLOR
+        sample = sample.convert('L')
+
+    gray = np.asarray(sample)
+    midtones = np.count_nonzero((gray > 64) & (gray < 192))
+    if midtones <= gray.size * _MIDTONE_FRACTION:
+        return KIND_BITONAL
+    return KIND_GRAY
+
+
+def _to_bitonal(img: Image.Image) -> Image.Image:
+    """Бинаризует изображение по порогу (без дизеринга)."""
+    if img.mode == '1':
+        return img
+    if img.mode != 'L':
+        img = img.convert('L')
+    return img.point(lambda value: 255 if value >= _BITONAL_THRESHOLD else 0, mode='1')
+
+
+class _BitonalImage(pdfdoc.PDFImageXObject):
+    """
+    1-битное изображение DeviceGray с готовым сжатым потоком.
+
+    Словарь потока формируется здесь целиком из открытых объектов pdfdoc,
+    без внутренних полей PDFImageXObject.
+    """
+
+    def __init__(self, width: int, height: int, data: bytes, filter_name: str,
+                 decode_parms: Optional[dict] = None):
+        super().__init__('bw' + hashlib.sha1(data).hexdigest())
+        self.width = width
+        self.height = height
+        self.bitsPerComponent = 1
+        self.colorSpace = 'DeviceGray'
+        self.streamContent = data
+        self.filter_name = filter_name
+        self.decode_parms = decode_parms
+
+    @classmethod
+    def from_image(cls, img: Image.Image) -> '_BitonalImage':
+        """Сжимает изображение режима '1' через Flate."""
+        # Строки Pillow в режиме '1' упакованы по байтам, 1 - белый, как в DeviceGray
+        return cls(img.width, img.height, zlib.compress(img.tobytes()), 'FlateDecode')
+
+    @classmethod
+    def from_tiff_g4(cls, frame: Image.Image) -> Optional['_BitonalImage']:
+        """Берет кадр TIFF в исходном сжатии CCITT G4, если его можно встроить как есть."""
+        if frame.format != 'TIFF' or frame.info.get('compression') != 'group4':
+            return None
+
+        tags = frame.tag_v2
+        offsets = tags.get(273)      # StripOffsets
+        byte_counts = tags.get(279)  # StripByteCounts
+        # Полосы кодируются независимо - склеить несколько в один поток G4 нельзя
+        if not offsets or len(offsets) != 1 or len(byte_counts) != 1:
+            return None
+        # Обратный порядок бит (FillOrder) и нестандартные опции T6 не поддерживаем
+        if tags.get(266, 1) != 1 or tags.get(293, 0) != 0:
+            return None
+
+        frame.fp.seek(offsets[0])
+        data = frame.fp.read(byte_counts[0])
+        if len(data) != byte_counts[0]:
+            return None
+
+        parms = {'K': -1, 'Columns': frame.width, 'Rows': frame.height}
+        # PhotometricInterpretation 1 (черный - ноль): белые серии кодируют черные пиксели
+        if tags.get(262, 0) == 1:
+            parms['BlackIs1'] = 'true'
+        return cls(frame.width, frame.height, data, 'CCITTFaxDecode', parms)
+
+    def format(self, document):
+        stream = pdfdoc.PDFStream(content=self.streamContent)
+        info = stream.dictionary
+        info["Type"] = pdfdoc.PDFName("XObject")
+        info["Subtype"] = pdfdoc.PDFName("Image")
+        info["Width"] = self.width
+        info["Height"] = self.height
+        info["BitsPerComponent"] = self.bitsPerComponent
+        info["ColorSpace"] = pdfdoc.PDFName(self.colorSpace)
+        # Фильтр уже применен - PDFStream не сжимает поток повторно.
+        # При массиве Filter параметры тоже должны быть массивом, иначе их игнорируют
+        info["Filter"] = pdfdoc.PDFArray([pdfdoc.PDFName(self.filter_name)])
+        if self.decode_parms:
+            info["DecodeParms"] = pdfdoc.PDFArray([pdfdoc.PDFDictionary(dict(self.decode_parms))])
+        return stream.format(document)
+
+
+def _draw_xobject(c: canvas.Canvas, image: pdfdoc.PDFImageXObject,
+                  x: float, y: float, width: float, height: float) -> bool:
+    """
+    Рисует готовый XObject изображения (аналог Canvas.drawImage).
+
+    Returns:
+        bool: False, если изображение не удалось встроить (нужно нарисовать его через drawImage)
+    """
+    if not register_image_xobject(c, image):
+        return False
+    c.saveState()
+    c.translate(x, y)
+    c.scale(width, height)
+    c.doForm(image.name)
+    c.restoreState()
+    return True
+
+
+def _strip_mpf(data: bytes) -> Optional[bytes]:
+    """
+    Убирает из JPEG сегмент APP2 с индексом MP.
+
+    Без индекса Pillow опознает основное изображение MPO как обычный JPEG, и
+    ImageReader встраивает его поток как есть. Данные кадра не меняются.
+    """
+    parts = [data[:2]]
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker == 0xDA:
+            # Начало сжатых данных (SOS) - дальше сегментов заголовка нет
+            parts.append(data[pos:])
+            return b''.join(parts)
+        end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if not (marker == 0xE2 and data[pos + 4:pos + 8] == b'MPF\0'):
+            parts.append(data[pos:end])
+        pos = end
+    return None
+
+
+def _mpo_primary(img: Image.Image, image_path: str) -> Optional[ImageReader]:
+    """Основное изображение MPO (первый JPEG файла) без дополнительных или None."""
+    try:
+        # Первая запись индекса MP - основное изображение от начала файла
+        size = img.mpinfo[0xB002][0]['Size']
+    except (AttributeError, KeyError, IndexError, TypeError):
+        return None
+    with open(image_path, 'rb') as f:
+        data = f.read(size)
+    if not data.startswith(b'\xff\xd8'):
+        return None
+    data = _strip_mpf(data)
+    if data is None:
+        return None
+    reader = ImageReader(io.BytesIO(data))
+    # Без потока JPEG ImageReader перекодировал бы пиксели - тогда лучше исходный кадр
+    return reader if reader.jpeg_fh() is not None else None
+
+
+def _encode(img: Image.Image, photo: bool, jpeg_quality: int) -> ImageReader:
+    """Готовит уменьшенное изображение для встраивания."""
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    if photo:
+        # Фотографии перекодируем в JPEG - reportlab встроит его без сжатия Flate
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=jpeg_quality)
+        buffer.seek(0)
+        return ImageReader(buffer)
+
+    return ImageReader(img)
+
+
+def _draw_frame(c: canvas.Canvas, img: Image.Image, image_path: str, options):
+    """Рисует один кадр на текущей странице."""
+    page_size, (x, y, width, height) = _page_layout(img, options)
+    c.setPageSize(page_size)
+
+    # Сжатые G4 сканы встраиваем как есть: это быстрее и не хуже по размеру
+    g4_image = _BitonalImage.from_tiff_g4(img)
+    if g4_image is not None and _draw_xobject(c, g4_image, x, y, width, height):
+        return
+
+    target = _target_pixels(width, height, options.target_dpi)
+    is_jpeg = img.format in JPEG_FORMATS
+
+    # Исходный JPEG можно встроить как есть, только если пиксели не менялись
+    modified = bool(target and img.width > target[0])
+    if modified:
+        img = _downsample(img, target)
+    kind = _classify(img)
+
+    if kind == KIND_BITONAL:
+        # Сканы текста: 1 бит на пиксель вместо 24
+        bitonal = _to_bitonal(img)
+        if not _draw_xobject(c, _BitonalImage.from_image(bitonal), x, y, width, height):
+            c.drawImage(ImageReader(bitonal.convert('L')), x, y, width, height)
+        return
+
+    if kind == KIND_GRAY and img.mode != 'L':
+        img = img.convert('L')
+        modified = True
+
+    if modified:
+        source = _encode(img, is_jpeg, options.jpeg_quality)
+    elif is_jpeg and img.mode in ('RGB', 'L'):
+        # JPEG без изменений встраивается как есть (у MPO - только основное изображение)
+        source = image_path if img.format == 'JPEG' else _mpo_primary(img, image_path)
+        if source is None:
+            source = ImageReader(img)
+    else:
+        # Конвертируем в RGB если нужно
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        source = ImageReader(img)
+
+    c.drawImage(source, x, y, width, height)
+
+
+def convert(image_path: str, output, options) -> Tuple[bool, str]:
+    """Конвертирует изображение в PDF (путь или файловый объект), кадр на страницу."""
+    try:
+        # Открываем изображение (пиксели еще не декодированы).
+        # Потоки пишем в бинарном виде, без ASCII85 (+25% к размеру и медленно)
+        with Image.open(image_path) as img, binary_streams():
+            c = canvas.Canvas(output, pagesize=A4)
+
+            # Итератор переходит к следующему кадру через seek, не загружая остальные.
+            # Дополнительные изображения MPO - не страницы
+            frames = ImageSequence.Iterator(img) if img.format in MULTI_FRAME_FORMATS else [img]
+            for frame in frames:
+                _draw_frame(c, frame, image_path, options)
+                c.showPage()
+
+            c.save()
+
+        return True, ""
+
+    except MemoryError:
+        # Сообщение формирует вызывающий код (лимит памяти процесса конвертации)
+        raise
+    except Exception as e:
+        return False, f"Ошибка конвертации изображения: {str(e)}"
@@ -0,0 +1,74 @@
+"""
+Общие приемы работы с reportlab для конвертеров
+
+binary_streams отключает ASCII85 в потоках PDF на время конвертации.
+register_image_xobject - единственное место, где конвертеры обращаются к
+внутреннему документу холста reportlab: открытого способа добавить
+готовый XObject изображения нет. При обновлении reportlab проверять
+нужно только этот модуль.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from reportlab import rl_config
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+
+# Сколько конвертаций сейчас пишет потоки без ASCII85 (см. binary_streams)
+_binary_streams_lock = threading.Lock()
+_binary_streams_depth = 0
+_saved_use_a85 = None
+
+
+@contextmanager
+def binary_streams():
+    """
+    На время конвертации отключает ASCII85 в потоках PDF reportlab.
+
+    По умолчанию reportlab кодирует потоки страниц и изображений в ASCII85:
+    это +25% к размеру и медленное кодирование на Python. Настройка
+    глобальная (rl_config.useA85) и читается при загрузке изображения и при
+    save(), поэтому холст нужно создавать и сохранять внутри блока.
+    Исходное значение возвращается, когда завершается последняя из
+    одновременных конвертаций.
+    """
+    global _binary_streams_depth, _saved_use_a85
+    with _binary_streams_lock:
+        if _binary_streams_depth == 0:
+            _saved_use_a85 = rl_config.useA85
+            rl_config.useA85 = 0
+        _binary_streams_depth += 1
+    try:
+        yield
+    finally:
+        with _binary_streams_lock:
+            _binary_streams_depth -= 1
+            if _binary_streams_depth == 0:
+                rl_config.useA85 = _saved_use_a85
+
+
+def register_image_xobject(c: canvas.Canvas, image: pdfdoc.PDFImageXObject) -> bool:
+    """
+    Добавляет готовый XObject изображения в документ холста.
+
+    После регистрации изображение рисуется открытым Canvas.doForm(image.name).
+    drawImage так не умеет: он сам кодирует пиксели через ImageReader, а тот
+    переводит 1-битные изображения в 8-битные и не встраивает сжатые CCITT
+    данные как есть. Регистрация повторяет то, что делает сам drawImage,
+    через внутренние Canvas._doc, idToObject, Reference и addForm.
+
+    Returns:
+        bool: False, если внутренний интерфейс reportlab изменился
+            (изображение нужно нарисовать через drawImage)
+    """
+    try:
+        doc = c._doc
+        reg_name = doc.getXObjectName(image.name)
+        if reg_name not in doc.idToObject:
+            doc.Reference(image, reg_name)
+            doc.addForm(image.name, image)
+    except AttributeError as e:
+        print(f"⚠️ Внутренний интерфейс reportlab изменился, изображение встраивается через drawImage: {e}")
+        return False
+    return True
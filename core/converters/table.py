@@ -0,0 +1,336 @@
+"""
+Конвертер таблиц (CSV, TSV) в PDF
+
+Строки читаются потоком через csv.reader и сразу выводятся на страницы,
+поэтому файл целиком в памяти не держится. reportlab хранит несжатое
+содержимое всех страниц до save(), поэтому большие таблицы выводятся
+частями по CHUNK_PAGES страниц, и каждая готовая часть сразу дописывается
+в итоговый файл (PyMuPDF), поэтому память не растет с числом строк.
+Число столбцов определяется предварительным проходом по всему файлу,
+ширины столбцов - по первым SAMPLE_ROWS строкам; более длинные значения
+обрезаются с многоточием. Первая строка считается заголовком и
+повторяется на каждой странице. Широкие таблицы выводятся на альбомные
+страницы.
+"""
+
+import codecs
+import csv
+import itertools
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Tuple
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase import pdfmetrics
+
+from .reportlab_utils import binary_streams
+from .text import _make_text_safe, _setup_cyrillic_font
+
+# Сколько строк читается для определения формата и ширин столбцов
+SAMPLE_ROWS = 200
+
+# Сколько байт читается для определения кодировки и разделителя
+SAMPLE_BYTES = 64 * 1024
+
+# Оформление таблицы (пункты)
+FONT_SIZE = 8
+ROW_HEIGHT = 11
+PAGE_MARGIN = 30
+CELL_PADDING = 3
+MIN_COLUMN_WIDTH = 24
+MAX_COLUMN_WIDTH = 220
+
+ELLIPSIS = '…'
+
+# Сколько страниц выводится одним холстом reportlab
+CHUNK_PAGES = 300
+
+# Части меньше этого размера остаются в памяти (байт)
+CHUNK_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Предел длины поля на время конвертации: в CSV бывают очень длинные поля (например, JSON)
+FIELD_SIZE_LIMIT = 2 ** 31 - 1
+
+
+def _detect_encoding(table_path: str) -> str:
+    """Определяет кодировку по началу файла: UTF-8 (с BOM или без) или CP1251."""
+    with open(table_path, 'rb') as f:
+        sample = f.read(SAMPLE_BYTES)
+    try:
+        # Инкрементальный декодер не падает на символе, разрезанном границей выборки
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1251'
+
+
+def _detect_dialect(sample: str, table_path: str):
+    """Определяет разделитель: TSV - табуляция, для CSV - по содержимому."""
+    if table_path.lower().endswith('.tsv'):
+        return csv.excel_tab
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|')
+    except csv.Error:
+        return csv.excel
+
+
+def _column_widths(rows: List[List[str]], columns: int, font_name: str, available: float) -> List[float]:
+    """Вычисляет ширины столбцов по выборке строк и вписывает их в доступную ширину."""
+    widths = [MIN_COLUMN_WIDTH] * columns
+    for row in rows:
+        for i, cell in enumerate(row):
+            width = pdfmetrics.stringWidth(cell, font_name, FONT_SIZE) + 2 * CELL_PADDING
+            if width > widths[i]:
+                widths[i] = min(width, MAX_COLUMN_WIDTH)
+
+    total = sum(widths)
+    if total > available:
+        scale = available / total
+        widths = [width * scale for width in widths]
+    return widths
+
+
+class _CellFitter:
+    """Обрезает значения по ширине столбца, измеряя только потенциально длинные."""
+
+    def __init__(self, widths: List[float], font_name: str):
+        self.font_name = font_name
+        self.text_widths = [max(1.0, width - 2 * CELL_PADDING) for width in widths]
+        # Самый широкий символ шрифта: короче этого числа символов значение точно помещается
+        widest = pdfmetrics.stringWidth('Ш', font_name, FONT_SIZE)
+        widest = max(widest, pdfmetrics.stringWidth('W', font_name, FONT_SIZE))
+        self.safe_lengths = [int(width // widest) for width in self.text_widths]
+
+    def fit(self, column: int, text: str) -> str:
+        if len(text) <= self.safe_lengths[column]:
+            return text
+
+        limit = self.text_widths[column]
+        measure = pdfmetrics.stringWidth
+        width = measure(text, self.font_name, FONT_SIZE)
+        if width <= limit:
+            return text
+
+        # Оцениваем место обрезки пропорционально ширине и уточняем парой замеров
+        limit -= measure(ELLIPSIS, self.font_name, FONT_SIZE)
+        cut = int(len(text) * limit / width)
+        while cut > 0 and measure(text[:cut], self.font_name, FONT_SIZE) > limit:
+            cut -= 1
+        return text[:cut].rstrip() + ELLIPSIS
+
+
+def _draw_rows(c, rows, header: Optional[List[str]], widths: List[float],
+               fitter: _CellFitter, font_name: str, page_height: float,
+               safe_text: bool, max_pages: int) -> int:
+    """Выводит строки из итератора постранично. Возвращает количество страниц."""
+    offsets = list(itertools.accumulate([PAGE_MARGIN] + widths))
+    columns = len(widths)
+    table_right = offsets[-1]
+    top = page_height - PAGE_MARGIN
+    rows_per_page = max(1, int((page_height - 2 * PAGE_MARGIN) // ROW_HEIGHT) - (1 if header else 0))
+    baseline = ROW_HEIGHT - FONT_SIZE + 1
+
+    # Координаты ячеек одинаковы на всех страницах
+    cell_x = [x + CELL_PADDING for x in offsets[:columns]]
+    row_y = [top - (r + 1) * ROW_HEIGHT + baseline for r in range(rows_per_page + 1)]
+
+    def prepare(row):
+        cells = row[:columns]
+        if safe_text:
+            cells = [_make_text_safe(cell) for cell in cells]
+        return [fitter.fit(i, cell) for i, cell in enumerate(cells)]
+
+    header_cells = prepare(header) if header else None
+    pages = 0
+
+    while pages < max_pages:
+        page_rows = list(itertools.islice(rows, rows_per_page))
+        if not page_rows:
+            break
+
+        lines = [prepare(row) for row in page_rows]
+        if header_cells:
+            lines.insert(0, header_cells)
+
+        # Ячейки по строкам, чтобы текст страницы копировался и искался строками таблицы;
+        # textLine, в отличие от textOut, не измеряет ширину выведенного текста
+        text = c.beginText()
+        text.setFont(font_name, FONT_SIZE)
+        for y, cells in zip(row_y, lines):
+            for x, cell in zip(cell_x, cells):
+                if cell:
+                    text.setTextOrigin(x, y)
+                    text.textLine(cell)
+        c.drawText(text)
+
+        body_top = top - ROW_HEIGHT if header_cells else top
+        y = body_top - ROW_HEIGHT * len(page_rows)
+
+        # Сетка: линии под заголовком и по краям, разделители столбцов
+        c.setLineWidth(0.3)
+        c.setStrokeGray(0.6)
+        c.line(PAGE_MARGIN, top, table_right, top)
+        c.line(PAGE_MARGIN, body_top, table_right, body_top)
+        c.line(PAGE_MARGIN, y, table_right, y)
+        for x in offsets:
+            c.line(x, top, x, y)
+
+        pages += 1
+        c.showPage()
+
+    return pages
+
+
+def _write_output(source, output):
+    """Копирует готовый PDF в путь или файловый объект."""
+    if isinstance(output, str):
+        with open(output, 'wb') as f:
+            shutil.copyfileobj(source, f)
+    else:
+        shutil.copyfileobj(source, output)
+
+
+class _ChunkWriter:
+    """
+    Дописывает PDF части в итоговый документ по мере их готовности.
+
+    С PyMuPDF каждая часть добавляется к файлу инкрементальным сохранением,
+    поэтому в памяти держится одна часть, а не весь документ. PyPDF2 так не
+    умеет - без PyMuPDF части копятся в PdfWriter до finish().
+    """
+
+    def __init__(self, output):
+        try:
+            import fitz
+        except ImportError:
+            fitz = None
+        self.fitz = fitz
+        self.output = output
+        self.parts = 0
+        self.writer = None
+        # Инкрементальное сохранение требует файла на диске
+        self.path = output if isinstance(output, str) else None
+        self.temp_path = None
+
+    def append(self, chunk):
+        """Добавляет часть (файловый объект с PDF) в конец документа."""
+        chunk.seek(0)
+        self.parts += 1
+
+        if self.fitz is None:
+            from PyPDF2 import PdfReader, PdfWriter
+            if self.writer is None:
+                self.writer = PdfWriter()
+            for page in PdfReader(chunk).pages:
+                self.writer.add_page(page)
+            return
+
+        if self.parts == 1:
+            # Первая часть становится документом как есть
+            if self.path is None:
+                fd, self.temp_path = tempfile.mkstemp(suffix='.pdf')
+                os.close(fd)
+                self.path = self.temp_path
+            _write_output(chunk, self.path)
+            return
+
+        with self.fitz.open(self.path) as doc, \
+                self.fitz.open(stream=chunk.read(), filetype="pdf") as part:
+            doc.insert_pdf(part)
+            doc.saveIncr()
+
+    def finish(self):
+        """Завершает документ; в файловый объект копируется готовый результат."""
+        if self.writer is not None:
+            if isinstance(self.output, str):
+                with open(self.output, 'wb') as f:
+                    self.writer.write(f)
+            else:
+                self.writer.write(self.output)
+        elif self.temp_path is not None:
+            with open(self.temp_path, 'rb') as f:
+                _write_output(f, self.output)
+
+    def close(self):
+        """Удаляет промежуточный файл."""
+        if self.temp_path is not None and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def convert(table_path: str, output, options=None) -> Tuple[bool, str]:
+    """Конвертирует CSV/TSV файл в PDF (путь или файловый объект)."""
+    field_size_limit = csv.field_size_limit(FIELD_SIZE_LIMIT)
+    try:
+        encoding = _detect_encoding(table_path)
+        with open(table_path, 'r', encoding=encoding, errors='replace', newline='') as f:
+            dialect = _detect_dialect(f.read(SAMPLE_BYTES), table_path)
+            f.seek(0)
+            reader = csv.reader(f, dialect)
+
+            sample = list(itertools.islice(reader, SAMPLE_ROWS))
+            if not sample:
+                return False, "Таблица пуста"
+            header, body = sample[0], sample[1:]
+
+            # Строки дальше выборки бывают шире - столбцы считаются по всему файлу,
+            # чтобы не терять значения (чтение без вывода быстрее самой конвертации)
+            columns = max(len(row) for row in sample)
+            for row in reader:
+                if len(row) > columns:
+                    columns = len(row)
+            f.seek(0)
+            reader = csv.reader(f, dialect)
+            for _ in itertools.islice(reader, len(sample)):
+                pass
+
+            font_name = _setup_cyrillic_font()
+            # Стандартные шрифты PDF не содержат кириллицы
+            safe_text = font_name == "Helvetica"
+
+            # Широкие таблицы - на альбомных страницах
+            natural = _column_widths(sample, columns, font_name, float('inf'))
+            page_size = A4
+            if sum(natural) > A4[0] - 2 * PAGE_MARGIN:
+                page_size = landscape(A4)
+            widths = _column_widths(sample, columns, font_name, page_size[0] - 2 * PAGE_MARGIN)
+            fitter = _CellFitter(widths, font_name)
+
+            rows = itertools.chain(body, reader)
+            if not body:
+                # Только одна строка - выводим ее как данные
+                rows, header = iter([header]), None
+
+            # Потоки страниц пишем в бинарном виде, без ASCII85 (+25% к размеру и медленно)
+            with binary_streams():
+                writer = _ChunkWriter(output)
+                try:
+                    while True:
+                        chunk = tempfile.SpooledTemporaryFile(max_size=CHUNK_SPOOL_BYTES)
+                        with chunk:
+                            # Сжатие страниц: у больших таблиц содержимое страниц - основной объем PDF
+                            c = canvas.Canvas(chunk, pagesize=page_size, pageCompression=1)
+                            pages = _draw_rows(c, rows, header, widths, fitter, font_name,
+                                               page_size[1], safe_text, CHUNK_PAGES)
+                            if pages == 0 and writer.parts:
+                                break
+                            c.save()
+                            writer.append(chunk)
+                        if pages < CHUNK_PAGES:
+                            break
+                    writer.finish()
+                finally:
+                    writer.close()
+
+        return True, ""
+
+    except MemoryError:
+        # Сообщение формирует вызывающий код (лимит памяти процесса конвертации)
+        raise
+    except csv.Error as e:
+        return False, f"Ошибка разбора таблицы: {str(e)}"
+    except Exception as e:
+        return False, f"Ошибка конвертации таблицы: {str(e)}"
+    finally:
+        csv.field_size_limit(field_size_limit)
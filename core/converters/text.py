@@ -0,0 +1,199 @@
+"""
+Конвертер текстовых файлов (TXT) в PDF с поддержкой кириллицы
+"""
+
+import os
+import platform
+from typing import Tuple
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# Карта транслитерации кириллических символов
+_CYRILLIC_MAP = {
+    'А': 'A', 'Б': 'B', 'В': 'V', 'Г': 'G', 'Д': 'D', 'Е': 'E', 'Ё': 'E',
+    'Ж': 'Zh', 'З': 'Z', 'И': 'I', 'Й': 'Y', 'К': 'K', 'Л': 'L', 'М': 'M',
+    'Н': 'N', 'О': 'O', 'П': 'P', 'Р': 'R', 'С': 'S', 'Т': 'T', 'У': 'U',
+    'Ф': 'F', 'Х': 'H', 'Ц': 'Ts', 'Ч': 'Ch', 'Ш': 'Sh', 'Щ': 'Sch',
+    'Ъ': '', 'Ы': 'Y', 'Ь': '', 'Э': 'E', 'Ю': 'Yu', 'Я': 'Ya',
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
+}
+
+# Имя зарегистрированного шрифта (None - еще не искали)
+_font_name = None
+
+
+def _make_text_safe(text: str) -> str:
+    """Делает текст безопасным для отрисовки, заменяя проблемные символы."""
+    try:
+        # Пытаемся закодировать в latin1 (базовая кодировка PDF)
+        text.encode('latin1')
+        return text
+    except UnicodeEncodeError:
+        # Заменяем символы, которые не могут быть отображены
+        safe_text = ""
+        for char in text:
+            try:
+                char.encode('latin1')
+                safe_text += char
+            except UnicodeEncodeError:
+                # Заменяем кириллические символы на транслитерацию
+                if char in _CYRILLIC_MAP:
+                    safe_text += _CYRILLIC_MAP[char]
+                else:
+                    safe_text += '?'  # Неизвестный символ
+        return safe_text
+
+
+def _setup_cyrillic_font() -> str:
+    """Настраивает шрифт с поддержкой кирилицы."""
+    global _font_name
+    if _font_name is not None:
+        # Возвращаем уже инициализированный шрифт
+        return _font_name
+
+    try:
+        # Пытаемся найти системные шрифты с поддержкой кирилицы
+        system = platform.system()
+
+        font_paths = []
+        if system == "Windows":
+            # Windows шрифты
+            font_paths = [
+                "C:/Windows/Fonts/arial.ttf",
+                "C:/Windows/Fonts/calibri.ttf",
+                "C:/Windows/Fonts/tahoma.ttf",
+                "C:/Windows/Fonts/verdana.ttf"
+            ]
+        elif system == "Darwin":  # macOS
+            font_paths = [
+                "/System/Library/Fonts/Arial.ttf",
+                "/System/Library/Fonts/Helvetica.ttc",
+                "/Library/Fonts/Arial.ttf"
+            ]
+        else:  # Linux
+            font_paths = [
+                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+                "/usr/share/fonts/TTF/arial.ttf",
+                "/usr/share/fonts/truetype/ttf-dejavu/DejaVuSans.ttf"
+            ]
+
+        # Ищем первый доступный шрифт
+        for font_path in font_paths:
+            if os.path.exists(font_path):
+                try:
+                    # Регистрируем шрифт
+                    pdfmetrics.registerFont(TTFont('CyrillicFont', font_path))
+                    _font_name = 'CyrillicFont'
+                    print(f"✅ Найден шрифт с поддержкой кирилицы: {os.path.basename(font_path)}")
+                    return _font_name
+                except Exception as e:
+                    print(f"⚠️ Не удалось загрузить шрифт {font_path}: {e}")
+                    continue
+
+        # Если не нашли системные шрифты
+        print("⚠️ Системные шрифты с кириллицей не найдены, используется Helvetica")
+        print("   Кирилица может отображаться некорректно")
+        _font_name = "Helvetica"
+        return _font_name
+
+    except Exception as e:
+        print(f"⚠️ Ошибка при настройке шрифта: {e}")
+        _font_name = "Helvetica"
+        return _font_name
+
+
+def _read_text(text_path: str) -> str:
+    """Читает текстовый файл в UTF-8, при ошибке - в CP1251."""
+    try:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        # Пробуем другие кодировки
+        with open(text_path, 'r', encoding='cp1251') as f:
+            return f.read()
+
+
+def _draw_line(c, x: float, y: float, text: str):
+    """Рисует строку, заменяя символы, которые не удается отрисовать."""
+    try:
+        c.drawString(x, y, text)
+    except Exception:
+        c.drawString(x, y, _make_text_safe(text))
+
+
+def convert(text_path: str, output, options=None) -> Tuple[bool, str]:
+    """Конвертирует текстовый файл в PDF (путь или файловый объект)."""
+    try:
+        content = _read_text(text_path)
+    except Exception:
+        return False, "Не удалось прочитать текстовый файл (проблема с кодировкой)"
+
+    try:
+        # Создаем PDF
+        c = canvas.Canvas(output, pagesize=A4)
+        page_width, page_height = A4
+
+        # Настройки текста
+        font_size = 12
+        line_height = 14
+        margin = 40
+        max_width = page_width - 2 * margin
+
+        # Настраиваем шрифт с поддержкой кирилицы
+        font_name = _setup_cyrillic_font()
+
+        # Разбиваем текст на строки
+        lines = content.split('\n')
+        y_position = page_height - margin
+
+        c.setFont(font_name, font_size)
+
+        for line in lines:
+            # Проверяем, помещается ли строка на страницу
+            if y_position < margin + line_height:
+                c.showPage()  # Новая страница
+                y_position = page_height - margin
+                c.setFont(font_name, font_size)
+
+            # Разбиваем длинные строки
+            if c.stringWidth(line) > max_width:
+                words = line.split(' ')
+                current_line = ""
+
+                for word in words:
+                    test_line = current_line + (" " if current_line else "") + word
+                    if c.stringWidth(test_line) <= max_width:
+                        current_line = test_line
+                    else:
+                        if current_line:
+                            _draw_line(c, margin, y_position, current_line)
+                            y_position -= line_height
+                            if y_position < margin + line_height:
+                                c.showPage()
+                                y_position = page_height - margin
+                                c.setFont(font_name, font_size)
+                        current_line = word
+
+                if current_line:
+                    _draw_line(c, margin, y_position, current_line)
+                    y_position -= line_height
+            else:
+                _draw_line(c, margin, y_position, line)
+                y_position -= line_height
+
+        c.save()
+        return True, ""
+
+    except MemoryError:
+        # Сообщение формирует вызывающий код (лимит памяти процесса конвертации)
+        raise
+    except Exception as e:
+        return False, f"Ошибка конвертации текста: {str(e)}"
@@ -0,0 +1,82 @@
+"""
+Конвертер Word документов (DOC/DOCX) в PDF
+
+На Windows/macOS используется docx2pdf (через установленный Microsoft Word),
+в остальных случаях - пул процессов LibreOffice.
+"""
+
+import os
+import platform
+import importlib.util
+from typing import List, Optional, Tuple
+
+from ..office_pool import OfficeConversionPool, find_soffice
+
+INSTALL_HINT = "docx2pdf или LibreOffice"
+
+_office_pool = None
+
+
+def _use_docx2pdf() -> bool:
+    """docx2pdf работает только при установленном Microsoft Word (Windows/macOS)."""
+    return (platform.system() in ("Windows", "Darwin")
+            and importlib.util.find_spec('docx2pdf') is not None)
+
+
+def _get_office_pool() -> Optional[OfficeConversionPool]:
+    """Возвращает пул LibreOffice, создавая его при первом обращении."""
+    global _office_pool
+    if _office_pool is None:
+        soffice_path = find_soffice()
+        if soffice_path is None:
+            return None
+        _office_pool = OfficeConversionPool(soffice_path=soffice_path)
+    return _office_pool
+
+
+def is_available() -> bool:
+    """Проверяет, есть ли чем конвертировать Word документы."""
+    return _use_docx2pdf() or find_soffice() is not None
+
+
+def convert(word_path: str, output_path: str, options=None) -> Tuple[bool, str]:
+    """Конвертирует Word документ в PDF."""
+    if not _use_docx2pdf():
+        pool = _get_office_pool()
+        if pool is None:
+            return False, ("Для конвертации Word документов нужен LibreOffice "
+                           "или библиотека docx2pdf (Windows/macOS)")
+        return pool.convert(word_path, output_path)
+
+    try:
+        from docx2pdf import convert as docx_convert
+
+        # Конвертируем Word в PDF
+        docx_convert(word_path, output_path)
+
+        # Проверяем, что файл создан
+        if os.path.exists(output_path):
+            return True, ""
+        else:
+            return False, "Не удалось создать PDF файл"
+
+    except Exception as e:
+        return False, f"Ошибка конвертации Word документа: {str(e)}"
+
+
+def convert_many(jobs: List[Tuple[str, str]], options=None) -> Optional[List[Tuple[bool, str]]]:
+    """Параллельно конвертирует документы в пуле LibreOffice."""
+    if _use_docx2pdf():
+        return None
+    pool = _get_office_pool()
+    if pool is None:
+        return None
+    return pool.convert_many(jobs)
+
+
+def shutdown():
+    """Останавливает пул LibreOffice."""
+    global _office_pool
+    if _office_pool is not None:
+        _office_pool.shutdown()
+        _office_pool = None
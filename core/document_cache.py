@@ -0,0 +1,118 @@
+"""
+Кэш открытых PDF документов
+
+fitz.open разбирает таблицу объектов файла, и для больших документов это
+заметное время. Кэш держит несколько последних документов открытыми и
+ограничен количеством и оценкой занимаемой памяти (по размеру файла),
+поэтому при переключении между файлами каждый разбирается один раз за
+сессию. Перезаписанный файл открывается заново.
+
+У каждого потока (диалог, поток рендеринга, загрузчик миниатюр) свой
+экземпляр кэша со своими ограничениями, но сами документы общие: файл,
+уже открытый одним кэшем, другой получает без повторного разбора.
+Документ закрывается, когда его не держит ни один кэш. PyMuPDF выполняет
+каждый вызов под GIL, поэтому обращения к общему документу из разных
+потоков не пересекаются.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Ограничения кэша по умолчанию
+DEFAULT_MAX_DOCUMENTS = 8
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class _SharedDocuments:
+    """Открытые документы процесса со счетчиком ссылок кэшей."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # (путь, (размер, mtime)) -> [документ, число ссылок]
+
+    def acquire(self, path: str, version):
+        """Возвращает открытый документ этой версии файла, открывая его при необходимости."""
+        with self._lock:
+            entry = self._entries.get((path, version))
+            if entry is None:
+                # Разбор идет под блокировкой: второй поток дождется его, а не начнет свой
+                entry = self._entries[(path, version)] = [fitz.open(path), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, path: str, version):
+        """Отпускает документ; последний отпустивший его закрывает."""
+        with self._lock:
+            entry = self._entries[(path, version)]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._entries[(path, version)]
+                entry[0].close()
+
+
+# Документы, общие для всех кэшей процесса
+_shared = _SharedDocuments()
+
+
+class DocumentCache:
+    """LRU открытых документов с ограничением по количеству и объему."""
+
+    def __init__(self, max_documents: int = DEFAULT_MAX_DOCUMENTS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # путь -> (документ, (размер, mtime)), от давних к свежим
+        self._usage = 0
+
+    def __contains__(self, file_path: str) -> bool:
+        return os.path.abspath(file_path) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def open(self, file_path: str):
+        """Возвращает открытый документ, открывая его при первом обращении."""
+        if fitz is None:
+            raise RuntimeError("PyMuPDF не установлен")
+
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+
+        entry = self._entries.get(path)
+        if entry is not None:
+            if entry[1] == version:
+                self._entries.move_to_end(path)
+                return entry[0]
+            # Файл изменился - открываем заново
+            self._close(path)
+
+        doc = _shared.acquire(path, version)
+        self._entries[path] = (doc, version)
+        self._usage += stat.st_size
+        self._enforce_limits(keep=path)
+        return doc
+
+    def _close(self, path: str):
+        _, version = self._entries.pop(path)
+        self._usage -= version[0]
+        _shared.release(path, version)
+
+    def _enforce_limits(self, keep: str):
+        """Закрывает давно не использованные документы при превышении ограничений."""
+        for path in list(self._entries):
+            if len(self._entries) <= self.max_documents and self._usage <= self.max_bytes:
+                break
+            if path != keep:
+                self._close(path)
+
+    def close(self):
+        """Закрывает все документы."""
+        for path in list(self._entries):
+            self._close(path)
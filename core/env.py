@@ -0,0 +1,35 @@
+"""
+Настройки из переменных окружения
+"""
+
+import os
+
+
+def env_int(name: str, default: int, minimum: int = 1, unit: str = "") -> int:
+    """
+    Читает целое число из переменной окружения.
+
+    Пустая или не заданная переменная дает default; нечисловое значение или
+    значение меньше minimum отклоняется с предупреждением, и тоже
+    используется default.
+
+    Args:
+        name: Имя переменной окружения
+        default: Значение по умолчанию
+        minimum: Наименьшее допустимое значение
+        unit: Единица измерения для предупреждения (например, "МБ")
+    """
+    configured = os.environ.get(name)
+    if not configured:
+        return default
+
+    try:
+        value = int(configured)
+    except ValueError:
+        value = None
+
+    if value is None or value < minimum:
+        suffix = f" {unit}" if unit else ""
+        print(f"⚠️ Некорректное значение {name}={configured!r}, используется {default}{suffix}")
+        return default
+    return value
@@ -0,0 +1,243 @@
+"""
+Кэш метаданных PDF файлов
+
+Количество страниц, размер файла и размеры страниц нужны диалогам
+предпросмотра до того, как открыт сам документ: для статистики, списка
+файлов и раскладки непрерывной прокрутки. Для сотен файлов или
+документа на тысячи страниц их чтение занимает заметное время, поэтому
+метаданные и отпечаток содержимого запоминаются под ключом (путь,
+размер, mtime): в памяти и в базе SQLite рядом с кэшем миниатюр.
+Повторное открытие тех же файлов - даже после перезапуска приложения -
+стоит одного stat на файл, а измененный файл читается заново.
+
+Отпечаток (хеш всего содержимого файла) - общий ключ кэша миниатюр и
+поискового индекса: каждый файл хешируется один раз, кто бы ни запросил
+отпечаток первым.
+
+Кэш общий для всего приложения, доступ защищен блокировкой.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .thumbnail_store import default_cache_dir
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Сколько файлов хранит кэш в памяти
+DEFAULT_MAX_FILES = 256
+
+# Сколько файлов хранится в базе (давно не обновлявшиеся удаляются)
+MAX_STORED_FILES = 5000
+
+# Размер блока чтения при вычислении отпечатка (байт)
+FINGERPRINT_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used);
+"""
+
+
+def content_fingerprint(file_path: str) -> str:
+    """Вычисляет отпечаток (SHA-256) всего содержимого файла."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(FINGERPRINT_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def _missing_file_info(file_path: str) -> dict:
+    return {'name': os.path.basename(file_path), 'size': 0, 'pages': 0, 'exists': False}
+
+
+class MetadataCache:
+    """LRU метаданных файлов, сбрасываемых при изменении файла."""
+
+    def __init__(self, path: Optional[str] = None, max_files: int = DEFAULT_MAX_FILES):
+        """
+        Args:
+            path: База SQLite для хранения между запусками (None - только в памяти)
+            max_files: Сколько файлов хранить в памяти
+        """
+        self.path = path
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # путь -> ((размер, mtime), {поле: значение})
+        self._conn = None
+
+    def _connection(self):
+        """Лениво открывает базу (вызывается под блокировкой)."""
+        if self._conn is None and self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                conn.execute(
+                    "DELETE FROM files WHERE rowid NOT IN "
+                    "(SELECT rowid FROM files ORDER BY last_used DESC LIMIT ?)",
+                    (MAX_STORED_FILES,),
+                )
+                self._conn = conn
+            except Exception as e:
+                print(f"⚠️ Кэш метаданных на диске недоступен: {e}")
+                self.path = None
+        return self._conn
+
+    def _lookup(self, file_path: str, field: str):
+        """Возвращает (путь, версия, значение или None)."""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != version:
+                entry = self._load(path, version)
+            if entry is None:
+                return path, version, None
+            self._entries.move_to_end(path)
+            return path, version, entry[1].get(field)
+
+    def _load(self, path: str, version):
+        """Читает запись из базы в память (вызывается под блокировкой)."""
+        conn = self._connection()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT data FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, version[0], version[1]),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = (version, json.loads(row[0]))
+        self._remember(path, entry)
+        return entry
+
+    def _remember(self, path: str, entry):
+        self._entries[path] = entry
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_files:
+            self._entries.popitem(last=False)
+
+    def _store(self, path: str, version, field: str, value):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != version:
+                # Остальные поля могли остаться в базе
+                entry = self._load(path, version) or (version, {})
+            entry[1][field] = value
+            self._remember(path, entry)
+
+            conn = self._connection()
+            if conn is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns, data, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (path, version[0], version[1], json.dumps(entry[1]), time.time()),
+                )
+
+    def cached_file_info(self, file_path: str) -> Optional[dict]:
+        """
+        Информация о файле без чтения самого файла.
+
+        Returns:
+            dict как у PDFInfo.get_file_info или None, если файл еще не читался
+        """
+        try:
+            _, _, info = self._lookup(file_path, 'file_info')
+        except OSError:
+            return _missing_file_info(file_path)
+        if info is None:
+            return None
+        return dict(info, name=os.path.basename(file_path))
+
+    def file_info(self, file_path: str) -> dict:
+        """Информация о файле (имя, размер, страницы), из кэша или из файла."""
+        info = self.cached_file_info(file_path)
+        if info is not None:
+            return info
+
+        from .pdf_worker import PDFInfo
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return _missing_file_info(file_path)
+        info = PDFInfo.get_file_info(path)
+        if info['exists']:
+            self._store(path, (stat.st_size, stat.st_mtime_ns), 'file_info',
+                        {key: info[key] for key in ('size', 'pages', 'exists', 'size_mb')})
+        return dict(info, name=os.path.basename(file_path))
+
+    def fingerprint(self, file_path: str) -> Optional[str]:
+        """Отпечаток всего содержимого файла (None, если файл недоступен)."""
+        try:
+            path, version, fingerprint = self._lookup(file_path, 'fingerprint')
+            if fingerprint is None:
+                fingerprint = content_fingerprint(path)
+                self._store(path, version, 'fingerprint', fingerprint)
+        except OSError:
+            return None
+        return fingerprint
+
+    def page_sizes(self, file_path: str, doc=None):
+        """
+        Размеры страниц файла в пунктах с учетом поворота.
+
+        Args:
+            file_path: Путь к файлу
+            doc: Уже открытый документ этого файла (иначе файл открывается)
+
+        Returns:
+            list: [(ширина, высота)] для каждой страницы
+        """
+        path, version, sizes = self._lookup(file_path, 'page_sizes')
+        if sizes is not None:
+            return sizes
+        if fitz is None:
+            raise RuntimeError("PyMuPDF не установлен")
+
+        own = doc is None
+        if own:
+            doc = fitz.open(path)
+        try:
+            sizes = [(page.rect.width, page.rect.height) for page in doc]
+        finally:
+            if own:
+                doc.close()
+
+        self._store(path, version, 'page_sizes', sizes)
+        return sizes
+
+    def clear(self):
+        """Очищает кэш в памяти."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        """Закрывает базу."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Кэш, общий для всего приложения
+metadata_cache = MetadataCache(os.path.join(default_cache_dir(), 'metadata.sqlite'))
@@ -0,0 +1,318 @@
+"""
+Пул долгоживущих процессов LibreOffice для конвертации Word документов в PDF
+
+Каждый воркер — отдельный headless процесс soffice со своим профилем,
+к которому мы подключаемся по UNO. Процессы запускаются один раз и
+переиспользуются, перезапускаются после N заданий или при зависании.
+Если модуль uno недоступен, используется запасной режим командной
+строки (`soffice --convert-to pdf`) с теми же таймаутами и профилями.
+"""
+
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    UNO_AVAILABLE = True
+except ImportError:
+    uno = None
+    PropertyValue = None
+    UNO_AVAILABLE = False
+
+
+# Типичные места установки LibreOffice
+_SOFFICE_CANDIDATES = [
+    "/usr/bin/soffice",
+    "/usr/lib/libreoffice/program/soffice",
+    "/opt/libreoffice/program/soffice",
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+    "C:/Program Files/LibreOffice/program/soffice.exe",
+    "C:/Program Files (x86)/LibreOffice/program/soffice.exe",
+]
+
+
+def find_soffice() -> Optional[str]:
+    """Ищет исполняемый файл LibreOffice."""
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+
+    for path in _SOFFICE_CANDIDATES:
+        if os.path.exists(path):
+            return path
+
+    return None
+
+
+def _free_port() -> int:
+    """Возвращает свободный TCP порт на localhost."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _OfficeWorker:
+    """Один процесс soffice с собственным профилем пользователя."""
+
+    def __init__(self, soffice_path: str, worker_id: int, base_dir: str, startup_timeout: float):
+        self.soffice_path = soffice_path
+        self.worker_id = worker_id
+        self.profile_dir = os.path.join(base_dir, f"profile_{worker_id}")
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.desktop = None
+        self.jobs_done = 0
+
+    @property
+    def profile_url(self) -> str:
+        return Path(self.profile_dir).as_uri()
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Запускает процесс soffice и подключается к нему по UNO."""
+        port = _free_port()
+        self.process = subprocess.Popen(
+            [
+                self.soffice_path,
+                "--headless", "--invisible", "--nologo", "--norestore",
+                "--nodefault", "--nolockcheck",
+                f"-env:UserInstallation={self.profile_url}",
+                f"--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.jobs_done = 0
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        connect_url = f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            try:
+                context = resolver.resolve(connect_url)
+                break
+            except Exception:
+                if not self.is_alive() or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("LibreOffice не запустился вовремя")
+                time.sleep(0.25)
+
+        self.desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context
+        )
+
+    def stop(self):
+        """Завершает процесс soffice (при необходимости принудительно)."""
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def kill(self):
+        """Немедленно убивает зависший процесс."""
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+        self.desktop = None
+
+    def convert(self, source_path: str, output_path: str, timeout: float) -> Tuple[bool, str]:
+        """Конвертирует документ, убивая процесс при превышении таймаута."""
+        result = [False, "Превышено время конвертации"]
+
+        def run():
+            document = None
+            try:
+                hidden = PropertyValue(Name="Hidden", Value=True)
+                document = self.desktop.loadComponentFromURL(
+                    Path(source_path).absolute().as_uri(), "_blank", 0, (hidden,)
+                )
+                if document is None:
+                    result[:] = [False, "LibreOffice не смог открыть документ"]
+                    return
+                pdf_filter = PropertyValue(Name="FilterName", Value="writer_pdf_Export")
+                document.storeToURL(Path(output_path).absolute().as_uri(), (pdf_filter,))
+                result[:] = [True, ""]
+            except Exception as e:
+                result[:] = [False, f"Ошибка LibreOffice: {str(e)}"]
+            finally:
+                if document is not None:
+                    try:
+                        document.close(True)
+                    except Exception:
+                        pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout)
+
+        if thread.is_alive():
+            # Убийство процесса разрывает UNO соединение и освобождает поток
+            self.kill()
+            thread.join(5)
+            return False, f"Превышено время конвертации ({timeout:.0f} с)"
+
+        self.jobs_done += 1
+        return result[0], result[1]
+
+
+class _CommandLineWorker(_OfficeWorker):
+    """Запасной воркер: один вызов `soffice --convert-to` на документ."""
+
+    def is_alive(self) -> bool:
+        return True
+
+    def start(self):
+        self.jobs_done = 0
+
+    def stop(self):
+        pass
+
+    def kill(self):
+        pass
+
+    def convert(self, source_path: str, output_path: str, timeout: float) -> Tuple[bool, str]:
+        out_dir = tempfile.mkdtemp(prefix="pdf_merger_office_")
+        try:
+            subprocess.run(
+                [
+                    self.soffice_path,
+                    "--headless", "--norestore", "--nologo",
+                    f"-env:UserInstallation={self.profile_url}",
+                    "--convert-to", "pdf",
+                    "--outdir", out_dir,
+                    source_path,
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=timeout,
+            )
+            produced = os.path.join(out_dir, Path(source_path).stem + ".pdf")
+            if not os.path.exists(produced):
+                return False, "LibreOffice не создал PDF файл"
+            shutil.move(produced, output_path)
+            self.jobs_done += 1
+            return True, ""
+        except subprocess.TimeoutExpired:
+            return False, f"Превышено время конвертации ({timeout:.0f} с)"
+        except Exception as e:
+            return False, f"Ошибка LibreOffice: {str(e)}"
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+
+class OfficeConversionPool:
+    """Пул процессов LibreOffice для параллельной конвертации документов."""
+
+    def __init__(self, size: Optional[int] = None, max_jobs_per_worker: int = 50,
+                 timeout: float = 120.0, startup_timeout: float = 30.0,
+                 soffice_path: Optional[str] = None):
+        self.size = size or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.soffice_path = soffice_path or find_soffice()
+
+        self._base_dir = None
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def is_available(self) -> bool:
+        """Проверяет, найден ли LibreOffice."""
+        return self.soffice_path is not None
+
+    def _ensure_workers(self):
+        """Лениво создает воркеры при первом обращении."""
+        with self._lock:
+            if self._workers:
+                return
+            self._base_dir = tempfile.mkdtemp(prefix="pdf_merger_soffice_")
+            worker_class = _OfficeWorker if UNO_AVAILABLE else _CommandLineWorker
+            for worker_id in range(self.size):
+                worker = worker_class(self.soffice_path, worker_id, self._base_dir, self.startup_timeout)
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def _prepare(self, worker: _OfficeWorker):
+        """Перезапускает воркер, если он упал или отработал свой ресурс."""
+        if worker.is_alive() and worker.jobs_done < self.max_jobs_per_worker:
+            return
+        worker.stop()
+        worker.start()
+
+    def convert(self, source_path: str, output_path: str,
+                timeout: Optional[float] = None) -> Tuple[bool, str]:
+        """
+        Конвертирует документ в PDF на свободном воркере пула.
+
+        Returns:
+            Tuple[bool, str]: (успех, сообщение_об_ошибке)
+        """
+        if not self.is_available():
+            return False, "LibreOffice не найден"
+        if self._closed:
+            return False, "Пул LibreOffice остановлен"
+
+        self._ensure_workers()
+        worker = self._idle.get()
+        try:
+            self._prepare(worker)
+            success, error = worker.convert(source_path, output_path, timeout or self.timeout)
+            if success and not os.path.exists(output_path):
+                return False, "Не удалось создать PDF файл"
+            return success, error
+        except Exception as e:
+            worker.kill()
+            return False, f"Ошибка LibreOffice: {str(e)}"
+        finally:
+            self._idle.put(worker)
+
+    def convert_many(self, jobs: Iterable[Tuple[str, str]]) -> List[Tuple[bool, str]]:
+        """Параллельно конвертирует пары (исходный_путь, путь_к_pdf)."""
+        jobs = list(jobs)
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(lambda job: self.convert(*job), jobs))
+
+    def shutdown(self):
+        """Останавливает все процессы и удаляет профили."""
+        self._closed = True
+        with self._lock:
+            for worker in self._workers:
+                try:
+                    worker.stop()
+                except Exception:
+                    worker.kill()
+            self._workers.clear()
+            self._idle = queue.Queue()
+            if self._base_dir:
+                shutil.rmtree(self._base_dir, ignore_errors=True)
+                self._base_dir = None
@@ -5,6 +5,8 @@
 import os
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from .file_converter import ConvertedDocument, FileConverter
+
 try:
     from PyPDF2 import PdfReader, PdfWriter
     PYPDF2_AVAILABLE = True
@@ -22,6 +24,20 @@ except ImportError:
     PYMUPDF_AVAILABLE = False
 
 
+def _source_exists(source):
+    """Проверяет наличие источника: путь к файлу или ConvertedDocument."""
+    if isinstance(source, ConvertedDocument):
+        return source.in_memory or os.path.exists(source.path)
+    return os.path.exists(source)
+
+
+def _source_name(source):
+    """Возвращает имя файла источника для сообщений."""
+    if isinstance(source, ConvertedDocument):
+        return os.path.basename(source.source_path)
+    return os.path.basename(source)
+
+
 class PDFMergerWorker(QThread):
     """Рабочий поток для объединения PDF файлов."""
 
@@ -31,6 +47,11 @@ class PDFMergerWorker(QThread):
     started = pyqtSignal()      # Сигнал начала работы
 
     def __init__(self, file_paths, output_path):
+        """
+        Args:
+            file_paths: Пути к PDF или ConvertedDocument (в том числе в памяти)
+            output_path: Путь к итоговому файлу
+        """
         super().__init__()
         self.file_paths = file_paths
         self.output_path = output_path
@@ -67,13 +88,16 @@ class PDFMergerWorker(QThread):
 
             # Проходим по всем файлам
             for file_path in self.file_paths:
-                if not os.path.exists(file_path):
-                    self.error.emit(f"Файл не найден: {file_path}")
+                if not _source_exists(file_path):
+                    self.error.emit(f"Файл не найден: {_source_name(file_path)}")
                     return False
 
                 try:
-                    # Открываем PDF файл
-                    doc = fitz.open(file_path)
+                    # Открываем PDF файл (сконвертированные документы - прямо из памяти)
+                    if isinstance(file_path, ConvertedDocument):
+                        doc = file_path.open_fitz()
+                    else:
+                        doc = fitz.open(file_path)
 
                     # Добавляем все страницы
                     merged_doc.insert_pdf(doc)
@@ -82,7 +106,7 @@ class PDFMergerWorker(QThread):
                     doc.close()
 
                 except Exception as e:
-                    self.error.emit(f"Ошибка при чтении файла {os.path.basename(file_path)}: {str(e)}")
+                    self.error.emit(f"Ошибка при чтении файла {_source_name(file_path)}: {str(e)}")
                     return False
 
             # Проверяем, что есть страницы
@@ -121,20 +145,23 @@ class PDFMergerWorker(QThread):
 
             # Проходим по всем файлам
             for file_path in self.file_paths:
-                if not os.path.exists(file_path):
-                    self.error.emit(f"Файл не найден: {file_path}")
+                if not _source_exists(file_path):
+                    self.error.emit(f"Файл не найден: {_source_name(file_path)}")
                     return False
 
                 try:
                     # Читаем PDF файл
-                    pdf_reader = PdfReader(file_path)
+                    if isinstance(file_path, ConvertedDocument):
+                        pdf_reader = PdfReader(file_path.open_stream() if file_path.in_memory else file_path.path)
+                    else:
+                        pdf_reader = PdfReader(file_path)
 
                     # Добавляем все страницы в writer
                     for page in pdf_reader.pages:
                         pdf_writer.add_page(page)
 
                 except Exception as e:
-                    self.error.emit(f"Ошибка при чтении файла {os.path.basename(file_path)}: {str(e)}")
+                    self.error.emit(f"Ошибка при чтении файла {_source_name(file_path)}: {str(e)}")
                     return False
 
             # Проверяем, что есть страницы для записи
@@ -200,6 +227,35 @@ class PDFValidator:
 
         return False, "Ни PyMuPDF, ни PyPDF2 не установлены"
 
+    @staticmethod
+    def is_valid_document(document):
+        """Проверяет сконвертированный документ (в памяти или на диске)."""
+        if not document.in_memory:
+            return PDFValidator.is_valid_pdf(document.path)
+
+        if PYMUPDF_AVAILABLE and fitz:
+            try:
+                doc = document.open_fitz()
+                page_count = doc.page_count
+                doc.close()
+
+                if page_count == 0:
+                    return False, "PDF файл пустой"
+                return True, "OK"
+            except Exception:
+                pass
+
+        if PYPDF2_AVAILABLE and PdfReader:
+            try:
+                reader = PdfReader(document.open_stream())
+                if len(reader.pages) == 0:
+                    return False, "PDF файл пустой"
+                return True, "OK"
+            except Exception as e:
+                return False, f"Ошибка чтения PDF: {str(e)}"
+
+        return False, "Ни PyMuPDF, ни PyPDF2 не установлены"
+
     @staticmethod
     def validate_file_list(file_paths):
         """Валидирует список PDF файлов."""
@@ -210,9 +266,12 @@ class PDFValidator:
             return False, "Для объединения нужно минимум 2 файла"
 
         for file_path in file_paths:
-            is_valid, message = PDFValidator.is_valid_pdf(file_path)
+            if isinstance(file_path, ConvertedDocument):
+                is_valid, message = PDFValidator.is_valid_document(file_path)
+            else:
+                is_valid, message = PDFValidator.is_valid_pdf(file_path)
             if not is_valid:
-                return False, f"Файл {os.path.basename(file_path)}: {message}"
+                return False, f"Файл {_source_name(file_path)}: {message}"
 
         return True, "Все файлы валидны"
 
@@ -275,3 +334,88 @@ class PDFInfo:
                 'pages': 0,
                 'exists': False
             }
+
+
+class PDFInfoWorker(QThread):
+    """Рабочий поток для подсчета страниц, размеров и отпечатков файлов."""
+
+    # Сигналы
+    # Индекс файла, информация как у PDFInfo.get_file_info и отпечаток содержимого ('fingerprint');
+    # у файлов, требующих конвертации, страницы не считаются - только отпечаток
+    file_info_ready = pyqtSignal(int, dict)
+
+    def __init__(self, file_paths, parent=None):
+        super().__init__(parent)
+        self.file_paths = list(file_paths)
+        self._stopped = False
+
+    def stop(self):
+        """Прерывает подсчет и дожидается потока."""
+        self._stopped = True
+        self.wait()
+
+    def run(self):
+        from .metadata_cache import metadata_cache
+
+        for index, file_path in enumerate(self.file_paths):
+            if self._stopped:
+                return
+            # Известные файлы отвечают из кэша метаданных без открытия
+            info = {} if FileConverter.needs_conversion(file_path) else metadata_cache.file_info(file_path)
+            info['fingerprint'] = metadata_cache.fingerprint(file_path)
+            self.file_info_ready.emit(index, info)
+
+
+class FileConversionWorker(QThread):
+    """Рабочий поток для конвертации файлов в PDF и проверки результатов."""
+
+    # Сигналы
+    # Результаты в порядке файлов: (успех, документ_или_сообщение, (валиден, сообщение) или None,
+    # отпечаток содержимого); дубликаты не конвертируются и приходят как (False, None, None, отпечаток)
+    conversion_finished = pyqtSignal(list)
+
+    def __init__(self, converter, file_paths, options, parent=None, known_fingerprints=None):
+        """
+        Args:
+            converter: FileConverter
+            file_paths: Исходные пути
+            options: ConversionOptions для всех файлов или список - по одному на файл
+            known_fingerprints: Отпечатки уже добавленных файлов: файлы с таким же
+                содержимым (и повторы внутри пачки) пропускаются; None - без проверки
+        """
+        super().__init__(parent)
+        self.converter = converter
+        self.file_paths = list(file_paths)
+        if not isinstance(options, list):
+            options = [options] * len(self.file_paths)
+        self.options = options
+        self.known_fingerprints = known_fingerprints
+
+    def run(self):
+        from .metadata_cache import metadata_cache
+
+        fingerprints = [metadata_cache.fingerprint(file_path) for file_path in self.file_paths]
+        results = [None] * len(self.file_paths)
+        if self.known_fingerprints is not None:
+            seen = set(self.known_fingerprints)
+            for index, fingerprint in enumerate(fingerprints):
+                if fingerprint in seen:
+                    results[index] = (False, None, None, fingerprint)
+                elif fingerprint is not None:
+                    seen.add(fingerprint)
+
+        # Файлы с одними параметрами конвертируются одной пачкой (параллельно)
+        groups = {}
+        for index, options in enumerate(self.options):
+            if results[index] is None:
+                groups.setdefault(id(options), (options, []))[1].append(index)
+
+        for options, indexes in groups.values():
+            outcomes = self.converter.convert_many_to_documents(
+                [self.file_paths[i] for i in indexes], options
+            )
+            for index, (success, result) in zip(indexes, outcomes):
+                check = PDFValidator.is_valid_document(result) if success else None
+                results[index] = (success, result, check, fingerprints[index])
+
+        self.conversion_finished.emit(results)
@@ -0,0 +1,165 @@
+"""
+Многопроцессный рендеринг страниц PDF
+
+PyMuPDF держит GIL все время растеризации, поэтому потоки не ускоряют
+массовый рендеринг. RenderFarm распределяет страницы по пулу процессов:
+каждый процесс держит свои открытые документы (DocumentCache), рендерит
+страницу и кладет пиксели в разделяемую память. Родитель получает только
+имя блока и размеры (RenderedFrame) и читает пиксели без копирования
+через канал между процессами.
+
+Имя блока удаляется сразу после подключения родителя, и память
+освобождается, как только RenderedFrame закрыт. Поэтому результат каждого
+завершенного задания нужно забрать через collect(), даже если он уже не
+нужен.
+
+Количество процессов задается переменной PDF_MERGER_RENDER_WORKERS.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional
+
+from .env import env_int
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    fitz = None
+    PYMUPDF_AVAILABLE = False
+
+# Сколько документов держит открытыми каждый процесс
+MAX_OPEN_DOCUMENTS = 4
+
+
+def default_workers() -> int:
+    """Количество процессов рендеринга (0 - многопроцессный рендеринг отключен)."""
+    return env_int('PDF_MERGER_RENDER_WORKERS', max(1, os.cpu_count() or 1), minimum=0)
+
+
+# Документы процесса рендеринга (создаются в _init_worker)
+_documents = None
+
+
+def _init_worker():
+    """Инициализация процесса рендеринга."""
+    global _documents
+    from core.document_cache import DocumentCache
+    _documents = DocumentCache(MAX_OPEN_DOCUMENTS)
+
+
+def _render_page(file_path: str, page_num: int, zoom: Optional[float], fit_size: Optional[int],
+                 jpeg_quality: Optional[int]):
+    """Рендерит страницу в новый блок разделяемой памяти."""
+    page = _documents.open(file_path)[page_num]
+    if fit_size is not None:
+        zoom = fit_size / max(page.rect.width, page.rect.height, 1)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+    samples = pix.samples_mv
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(samples)))
+    try:
+        block.buf[:len(samples)] = samples
+    finally:
+        block.close()
+
+    jpeg = pix.tobytes('jpg', jpg_quality=jpeg_quality) if jpeg_quality else None
+    return block.name, pix.width, pix.height, pix.stride, jpeg
+
+
+class RenderedFrame:
+    """Изображение страницы (RGB) в разделяемой памяти."""
+
+    def __init__(self, name: str, width: int, height: int, stride: int, jpeg: Optional[bytes] = None):
+        self.width = width
+        self.height = height
+        self.stride = stride
+        # Сжатая копия для постоянного кэша миниатюр, если ее запрашивали
+        self.jpeg = jpeg
+
+        self._block = shared_memory.SharedMemory(name=name)
+        try:
+            # Блок живет, пока открыт: имя больше никому не нужно
+            self._block.unlink()
+        except FileNotFoundError:
+            pass
+        self.samples_mv = self._block.buf[:stride * height]
+
+    def close(self):
+        """Освобождает разделяемую память (после этого samples_mv недоступен)."""
+        if self._block is None:
+            return
+        self.samples_mv.release()
+        self.samples_mv = None
+        self._block.close()
+        self._block = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class RenderFarm:
+    """Пул процессов рендеринга страниц."""
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Количество процессов (по умолчанию - PDF_MERGER_RENDER_WORKERS или по числу ядер)
+        """
+        self.workers = workers or max(1, default_workers())
+        self._executor = None
+
+    @staticmethod
+    def available() -> bool:
+        """Проверяет, можно ли рендерить в процессах."""
+        return PYMUPDF_AVAILABLE
+
+    def _ensure_executor(self):
+        """Лениво запускает процессы (при первом задании)."""
+        if self._executor is None:
+            # spawn: не копируем состояние Qt и потоки родителя в дочерний процесс
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def submit(self, file_path: str, page_num: int, zoom: float = 1.0, fit_size: Optional[int] = None,
+               jpeg_quality: Optional[int] = None):
+        """
+        Ставит страницу в очередь рендеринга.
+
+        Args:
+            zoom: Масштаб рендеринга
+            fit_size: Вписать страницу в квадрат этого размера (вместо zoom)
+            jpeg_quality: Дополнительно вернуть JPEG с этим качеством
+
+        Returns:
+            Future: результат передается в collect()
+        """
+        if not PYMUPDF_AVAILABLE:
+            raise RuntimeError("PyMuPDF не установлен")
+        return self._ensure_executor().submit(_render_page, os.path.abspath(file_path), page_num,
+                                              zoom, fit_size, jpeg_quality)
+
+    @staticmethod
+    def collect(future) -> RenderedFrame:
+        """Подключается к готовому изображению задания (исключение - если рендеринг не удался)."""
+        return RenderedFrame(*future.result())
+
+    def render(self, file_path: str, page_num: int, zoom: float = 1.0) -> RenderedFrame:
+        """Рендерит страницу и дожидается результата."""
+        return self.collect(self.submit(file_path, page_num, zoom))
+
+    def shutdown(self):
+        """Отменяет очередь и останавливает процессы."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,256 @@
+"""
+Изолированные процессы для конвертации файлов
+
+Конвертация изображений, текста и таблиц выполняется в отдельных
+процессах с ограничением времени и памяти. Зависший или раздувшийся конвертер
+убивается, а ошибка возвращается вызывающему коду - приложение и
+остальные файлы пакета продолжают работу. Процессы переиспользуются
+между заданиями и перезапускаются после N заданий или аварии.
+
+Ограничение памяти ставится через resource.setrlimit(RLIMIT_AS) и
+работает только на Unix; таймаут работает везде. Результат возвращается
+байтами через канал или, если задан путь результата, пишется процессом
+прямо в файл - так большие PDF не проходят через канал. Для долгих
+конвертаций (таблицы на миллионы строк) таймаут можно отключить.
+"""
+
+import io
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple, Union
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    resource = None
+    RESOURCE_AVAILABLE = False
+
+# Таймаут одной конвертации по умолчанию (секунды)
+DEFAULT_TIMEOUT = 120.0
+
+# Ограничение адресного пространства процесса конвертации по умолчанию (МБ)
+DEFAULT_MEMORY_LIMIT_MB = 2048
+
+# Задание: (имя_конвертера, исходный_путь, параметры[, путь_результата])
+SandboxJob = Tuple
+
+
+def _apply_limits(memory_limit_mb: Optional[int]):
+    """Ограничивает память текущего процесса."""
+    if not RESOURCE_AVAILABLE or not memory_limit_mb:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(conn, memory_limit_mb: Optional[int]):
+    """Цикл процесса конвертации: принимает задания, возвращает PDF в байтах или путь к нему."""
+    # Пулы потоков BLAS резервируют сотни мегабайт адресного пространства
+    os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+    _apply_limits(memory_limit_mb)
+
+    from core.converters import registry
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        backend_name, source_path, options, output_path = job
+        buffer = None
+        try:
+            backend = registry.by_name(backend_name)
+            if output_path is not None:
+                success, error = backend.convert(source_path, output_path, options)
+                result = (True, output_path) if success else (False, error)
+            else:
+                buffer = io.BytesIO()
+                success, error = backend.convert(source_path, buffer, options)
+                result = (True, buffer.getvalue()) if success else (False, error)
+        except MemoryError:
+            result = (False, f"Превышен лимит памяти ({memory_limit_mb} МБ)")
+        except Exception as e:
+            result = (False, f"Ошибка конвертации: {str(e)}")
+        finally:
+            buffer = None
+
+        try:
+            conn.send(result)
+        except MemoryError:
+            conn.send((False, f"Превышен лимит памяти ({memory_limit_mb} МБ)"))
+
+
+class _SandboxWorker:
+    """Один процесс конвертации и канал связи с ним."""
+
+    def __init__(self, context, memory_limit_mb: Optional[int]):
+        self.context = context
+        self.memory_limit_mb = memory_limit_mb
+        self.process = None
+        self.conn = None
+        self.jobs_done = 0
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        """Запускает процесс конвертации."""
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_limit_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.jobs_done = 0
+
+    def stop(self):
+        """Просит процесс завершиться (при необходимости убивает)."""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+            return
+        self._release()
+
+    def kill(self):
+        """Немедленно убивает процесс."""
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+        self._release()
+
+    def _release(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def convert(self, job: SandboxJob, timeout: Optional[float]) -> Tuple[bool, Union[bytes, str]]:
+        """Выполняет задание, убивая процесс при превышении таймаута (None - без таймаута)."""
+        self.conn.send(job)
+
+        # poll возвращает True и при завершении процесса - тогда recv бросит EOFError
+        if not self.conn.poll(timeout):
+            self.kill()
+            return False, f"Превышено время конвертации ({timeout:g} с)"
+
+        try:
+            result = self.conn.recv()
+        except (EOFError, OSError):
+            exitcode = self.process.exitcode if self.process is not None else None
+            self.kill()
+            if exitcode is not None and exitcode < 0:
+                return False, f"Процесс конвертации завершен сигналом {-exitcode} (вероятно, нехватка памяти)"
+            return False, "Процесс конвертации аварийно завершился"
+
+        self.jobs_done += 1
+        return result
+
+
+class ConversionSandbox:
+    """Пул изолированных процессов для конвертации файлов в PDF."""
+
+    def __init__(self, size: Optional[int] = None, timeout: float = DEFAULT_TIMEOUT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+                 max_jobs_per_worker: int = 200):
+        """
+        Args:
+            size: Количество процессов (по умолчанию - по числу ядер, не больше 4)
+            timeout: Максимальное время одной конвертации (секунды)
+            memory_limit_mb: Ограничение памяти процесса (None - без ограничения)
+            max_jobs_per_worker: После скольких заданий процесс перезапускается
+        """
+        self.size = size or max(1, min(4, os.cpu_count() or 1))
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+
+        # spawn: не копируем состояние Qt и потоки родителя в дочерний процесс
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _ensure_workers(self):
+        """Лениво создает воркеры (процессы запускаются при первом задании)."""
+        with self._lock:
+            if self._workers:
+                return
+            for _ in range(self.size):
+                worker = _SandboxWorker(self._context, self.memory_limit_mb)
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def _prepare(self, worker: _SandboxWorker):
+        """Перезапускает воркер, если он упал или отработал свой ресурс."""
+        if worker.is_alive() and worker.jobs_done < self.max_jobs_per_worker:
+            return
+        worker.stop()
+        worker.start()
+
+    def convert(self, backend_name: str, source_path: str, options,
+                output_path: Optional[str] = None, timeout: Optional[float] = None,
+                time_limited: bool = True) -> Tuple[bool, Union[bytes, str]]:
+        """
+        Конвертирует файл в изолированном процессе.
+
+        Args:
+            output_path: Куда записать PDF (None - вернуть байтами)
+            timeout: Таймаут задания (None - таймаут пула)
+            time_limited: False - ждать результата без таймаута
+
+        Returns:
+            Tuple[bool, Union[bytes, str]]: (успех, pdf_в_байтах_или_путь_или_сообщение_об_ошибке)
+        """
+        if self._closed:
+            return False, "Изолированная конвертация остановлена"
+
+        self._ensure_workers()
+        worker = self._idle.get()
+        try:
+            self._prepare(worker)
+            limit = (timeout or self.timeout) if time_limited else None
+            return worker.convert((backend_name, source_path, options, output_path), limit)
+        except Exception as e:
+            worker.kill()
+            return False, f"Ошибка процесса конвертации: {str(e)}"
+        finally:
+            self._idle.put(worker)
+
+    def convert_many(self, jobs: Iterable[SandboxJob]) -> List[Tuple[bool, Union[bytes, str]]]:
+        """Параллельно конвертирует задания (имя_конвертера, исходный_путь, параметры)."""
+        jobs = list(jobs)
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(lambda job: self.convert(*job), jobs))
+
+    def shutdown(self):
+        """Останавливает все процессы конвертации."""
+        self._closed = True
+        with self._lock:
+            for worker in self._workers:
+                try:
+                    worker.stop()
+                except Exception:
+                    worker.kill()
+            self._workers.clear()
+            self._idle = queue.Queue()
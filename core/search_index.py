@@ -0,0 +1,316 @@
+"""
+Полнотекстовый поиск по страницам PDF файлов
+
+Текст страниц извлекается в фоновом потоке (SearchIndexWorker) и
+хранится в базе SQLite с индексом FTS5 под хэшем всего содержимого
+файла, как и миниатюры. Уже проиндексированный файл - в том числе
+переименованный или открытый после перезапуска - повторно не читается,
+поэтому при добавлении файлов в задание индексируются только новые.
+Поиск по проиндексированным файлам занимает миллисекунды.
+
+Индекс лежит в каталоге кэша приложения (PDF_MERGER_CACHE_DIR).
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .thumbnail_store import default_cache_dir
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    fitz = None
+    PYMUPDF_AVAILABLE = False
+
+# Сколько документов хранится в индексе (давно не использованные удаляются)
+MAX_INDEXED_DOCUMENTS = 2000
+
+# Максимум результатов поиска по умолчанию
+DEFAULT_SEARCH_LIMIT = 200
+
+# Версия схемы базы (PRAGMA user_version)
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    fingerprint TEXT PRIMARY KEY,
+    pages INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_last_used ON documents (last_used);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text,
+    fingerprint UNINDEXED,
+    page UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Приводит текст к виду для индекса: ё не отличается от е."""
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def build_query(text: str) -> Optional[str]:
+    """
+    Превращает строку поиска в запрос FTS5.
+
+    Каждое слово ищется как фраза (номера вида INV-2024-0042 не
+    разбиваются на операторы), последнее - как префикс, чтобы результаты
+    появлялись во время набора.
+
+    Returns:
+        str или None, если в строке нет слов
+    """
+    words = normalize_text(text).split()
+    if not words:
+        return None
+    phrases = ['"' + word.replace('"', '""') + '"' for word in words]
+    # Префикс имеет смысл, только если слово заканчивается буквой или цифрой
+    if re.search(r'\w$', words[-1]):
+        phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+class SearchIndex:
+    """Индекс FTS5 текста страниц по отпечаткам файлов."""
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.path.join(default_cache_dir(), 'search.sqlite')
+        self.path = path
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Соединение записи используется из разных потоков, доступ сериализуется блокировкой
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        # Поиск идет через отдельное соединение: в режиме WAL чтение не ждет
+        # индексации, которая держит соединение записи на все время вставки
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._reader.execute("PRAGMA query_only=ON")
+
+    @staticmethod
+    def available() -> bool:
+        """Проверяет, собран ли SQLite с поддержкой FTS5."""
+        try:
+            conn = sqlite3.connect(':memory:')
+            try:
+                conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+            finally:
+                conn.close()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def indexed(self, fingerprints: Iterable[str]) -> set:
+        """
+        Отбирает уже проиндексированные отпечатки и отмечает их использование.
+
+        Returns:
+            set: Отпечатки из fingerprints, текст которых есть в индексе
+        """
+        fingerprints = list(set(fingerprints))
+        found = set()
+        with self._lock:
+            for start in range(0, len(fingerprints), 500):
+                chunk = fingerprints[start:start + 500]
+                marks = ','.join('?' * len(chunk))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT fingerprint FROM documents WHERE fingerprint IN ({marks})", chunk))
+                self._conn.execute(
+                    f"UPDATE documents SET last_used = ? WHERE fingerprint IN ({marks})",
+                    [time.time()] + chunk,
+                )
+        return found
+
+    def add_document(self, fingerprint: str, texts: List[str]):
+        """
+        Сохраняет текст страниц документа (заменяя прежний).
+
+        Args:
+            fingerprint: Отпечаток содержимого файла
+            texts: Текст каждой страницы
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM pages WHERE fingerprint = ?", (fingerprint,))
+                self._conn.executemany(
+                    "INSERT INTO pages (text, fingerprint, page) VALUES (?, ?, ?)",
+                    ((normalize_text(text), fingerprint, page_num) for page_num, text in enumerate(texts) if text.strip()),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (fingerprint, pages, last_used) VALUES (?, ?, ?)",
+                    (fingerprint, len(texts), time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evict()
+
+    def _evict(self):
+        """Удаляет давно не использованные документы сверх лимита (вызывается под блокировкой)."""
+        stale = [row[0] for row in self._conn.execute(
+            "SELECT fingerprint FROM documents ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+            (MAX_INDEXED_DOCUMENTS,),
+        )]
+        for fingerprint in stale:
+            self._conn.execute("DELETE FROM pages WHERE fingerprint = ?", (fingerprint,))
+            self._conn.execute("DELETE FROM documents WHERE fingerprint = ?", (fingerprint,))
+
+    def search(self, text: str, fingerprints: Optional[Iterable[str]] = None,
+               limit: int = DEFAULT_SEARCH_LIMIT) -> List[Tuple[str, int, str]]:
+        """
+        Ищет страницы, содержащие все слова строки.
+
+        Результаты упорядочены по файлам в порядке fingerprints и по номеру
+        страницы, так что при ограничении limit возвращаются первые
+        страницы задания, а не произвольные.
+
+        Args:
+            text: Строка поиска
+            fingerprints: Искать только в этих файлах, в порядке задания
+                (None - во всем индексе в порядке индексации)
+            limit: Максимум результатов
+
+        Returns:
+            list: [(отпечаток, номер страницы, фрагмент текста)]
+        """
+        query = build_query(text)
+        if query is None:
+            return []
+
+        order = None
+        if fingerprints is not None:
+            order = {}
+            for fingerprint in fingerprints:
+                order.setdefault(fingerprint, len(order))
+            if not order:
+                return []
+
+        with self._read_lock:
+            # Оба запроса видят один снимок базы, даже если индексация тем временем записала документ
+            self._reader.execute("BEGIN")
+            try:
+                # Сначала отбираются страницы без фрагментов: фрагмент дорог,
+                # а совпадений у частого слова - тысячи
+                matches = self._reader.execute(
+                    "SELECT rowid, fingerprint, page FROM pages WHERE pages MATCH ?", (query,)).fetchall()
+                if order is not None:
+                    matches = [match for match in matches if match[1] in order]
+                    matches.sort(key=lambda match: (order[match[1]], int(match[2])))
+                matches = matches[:limit]
+                snippets = self._snippets(query, matches)
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Ошибка поискового запроса {query!r}: {e}")
+                return []
+            finally:
+                self._reader.execute("COMMIT")
+        return [(fingerprint, int(page), ' '.join(snippets.get(rowid, '').split()))
+                for rowid, fingerprint, page in matches]
+
+    def _snippets(self, query: str, matches) -> dict:
+        """
+        Фрагменты текста отобранных страниц (вызывается под блокировкой чтения).
+
+        Returns:
+            dict: rowid -> фрагмент
+        """
+        rowids = [match[0] for match in matches]
+        snippets = {}
+        for start in range(0, len(rowids), 500):
+            chunk = rowids[start:start + 500]
+            # "+rowid" - проверка по списку за один проход по совпадениям, а не
+            # поиск каждой строки заново (для префиксного запроса это дорого)
+            snippets.update(self._reader.execute(
+                f"SELECT rowid, snippet(pages, 0, '', '', '…', 10) FROM pages "
+                f"WHERE pages MATCH ? AND +rowid IN ({','.join('?' * len(chunk))})",
+                [query] + chunk,
+            ))
+        return snippets
+
+    def close(self):
+        """Закрывает базу."""
+        with self._read_lock:
+            self._reader.close()
+        with self._lock:
+            self._conn.close()
+
+
+class SearchIndexWorker(QThread):
+    """Рабочий поток индексации текста файлов."""
+
+    # Сигналы
+    file_indexed = pyqtSignal(int, str)  # индекс файла, отпечаток (текст файла есть в индексе)
+
+    def __init__(self, file_paths, index: SearchIndex, parent=None):
+        super().__init__(parent)
+        self.file_paths = list(file_paths)
+        self.index = index
+        self._stopped = False
+
+    def stop(self):
+        """Прерывает индексацию и дожидается потока."""
+        self._stopped = True
+        self.wait()
+
+    def run(self):
+        from .metadata_cache import metadata_cache
+
+        fingerprints = [metadata_cache.fingerprint(file_path) for file_path in self.file_paths]
+        known = self.index.indexed(fp for fp in fingerprints if fp)
+        indexed = set(known)
+
+        # Сначала сообщаем об уже проиндексированных файлах: по ним можно искать сразу
+        for file_index, fingerprint in enumerate(fingerprints):
+            if fingerprint in known:
+                self.file_indexed.emit(file_index, fingerprint)
+
+        for file_index, (file_path, fingerprint) in enumerate(zip(self.file_paths, fingerprints)):
+            if self._stopped:
+                return
+            if fingerprint is None or fingerprint in known or not PYMUPDF_AVAILABLE:
+                continue
+            if fingerprint in indexed:
+                # Копия файла, уже проиндексированного в этом проходе
+                self.file_indexed.emit(file_index, fingerprint)
+                continue
+            texts = self._extract(file_path)
+            if texts is None:
+                continue
+            try:
+                self.index.add_document(fingerprint, texts)
+            except sqlite3.Error as e:
+                print(f"⚠️ Не удалось сохранить текст {os.path.basename(file_path)} в индекс: {e}")
+                continue
+            indexed.add(fingerprint)
+            self.file_indexed.emit(file_index, fingerprint)
+
+    def _extract(self, file_path: str) -> Optional[List[str]]:
+        """Извлекает текст страниц (None - при ошибке или остановке)."""
+        try:
+            with fitz.open(file_path) as doc:
+                texts = []
+                for page in doc:
+                    if self._stopped:
+                        return None
+                    texts.append(page.get_text())
+                return texts
+        except Exception as e:
+            print(f"⚠️ Не удалось извлечь текст {os.path.basename(file_path)}: {e}")
+            return None
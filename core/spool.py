@@ -0,0 +1,214 @@
+"""
+Управляемый каталог для временных артефактов конвертации
+
+Каждый запуск приложения получает собственный каталог сессии внутри
+общего корня (по умолчанию в системном temp, можно указать tmpfs через
+PDF_MERGER_SPOOL_DIR). Файлы именуются по хешу содержимого, поэтому
+экземпляры не перезаписывают чужие файлы, а повторная конвертация того же
+источника находит готовый результат. Объем каталога ограничен квотой с
+вытеснением давно не использованных файлов, а каталоги упавших сессий
+удаляются при следующем запуске.
+
+Каталогом пользуются несколько потоков конвертации, поэтому запись,
+регистрация и вытеснение файлов выполняются под одной блокировкой.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from .env import env_int
+
+# Квота каталога сессии по умолчанию (байт)
+DEFAULT_SPOOL_QUOTA = 1024 * 1024 * 1024
+
+# Через сколько секунд без активности каталог сессии считается брошенным
+DEFAULT_STALE_AFTER = 24 * 60 * 60
+
+SESSION_PREFIX = "session_"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _pid_alive(pid: int) -> bool:
+    """Проверяет, жив ли процесс (на Windows надежной проверки нет - считаем живым)."""
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SpoolDirectory:
+    """Каталог сессии с адресацией по содержимому и квотой."""
+
+    def __init__(self, root: Optional[str] = None, quota_bytes: Optional[int] = None,
+                 stale_after: float = DEFAULT_STALE_AFTER):
+        if root is None:
+            root = os.environ.get('PDF_MERGER_SPOOL_DIR') or os.path.join(
+                tempfile.gettempdir(), 'pdf_merger_spool'
+            )
+        if quota_bytes is None:
+            quota_bytes = env_int('PDF_MERGER_SPOOL_QUOTA_MB', DEFAULT_SPOOL_QUOTA // (1024 * 1024),
+                                  unit="МБ") * 1024 * 1024
+
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.stale_after = stale_after
+        self.session_dir = os.path.join(root, f"{SESSION_PREFIX}{os.getpid()}_{uuid.uuid4().hex[:8]}")
+
+        self._entries = OrderedDict()  # путь -> размер, от давних к свежим
+        self._usage = 0
+        self._created = False
+        self._lock = threading.RLock()
+
+        # Убираем каталоги сессий, оставшиеся после аварийных завершений
+        self.sweep_stale_sessions(root, stale_after)
+
+    @property
+    def usage(self) -> int:
+        """Текущий объем артефактов сессии в байтах."""
+        return self._usage
+
+    @staticmethod
+    def key_for_file(file_path: str, variant: str = "") -> str:
+        """Вычисляет ключ по содержимому файла и варианту конвертации."""
+        digest = hashlib.sha256(variant.encode('utf-8'))
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:32]
+
+    @staticmethod
+    def key_for_bytes(data: bytes, variant: str = "") -> str:
+        """Вычисляет ключ по данным в памяти."""
+        digest = hashlib.sha256(variant.encode('utf-8'))
+        digest.update(data)
+        return digest.hexdigest()[:32]
+
+    def _ensure_session_dir(self):
+        if not self._created:
+            os.makedirs(self.session_dir, exist_ok=True)
+            self._created = True
+
+    def path_for(self, key: str, suffix: str = ".pdf") -> str:
+        """Возвращает путь артефакта в каталоге сессии (файл не создается)."""
+        self._ensure_session_dir()
+        return os.path.join(self.session_dir, f"{key}{suffix}")
+
+    def get(self, key: str, suffix: str = ".pdf") -> Optional[str]:
+        """Возвращает путь к готовому артефакту или None."""
+        path = os.path.join(self.session_dir, f"{key}{suffix}")
+        with self._lock:
+            if path not in self._entries:
+                return None
+            if not os.path.exists(path):
+                self._forget(path)
+                return None
+            self._entries.move_to_end(path)
+            return path
+
+    def add(self, path: str):
+        """Регистрирует записанный файл и освобождает место при превышении квоты."""
+        size = os.path.getsize(path)
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = size
+            self._usage += size
+
+            # Обновляем время каталога - признак живой сессии для других экземпляров
+            try:
+                os.utime(self.session_dir)
+            except OSError:
+                pass
+
+            self._enforce_quota(keep=path)
+
+    def write(self, key: str, data: bytes, suffix: str = ".pdf") -> str:
+        """Записывает данные в артефакт с указанным ключом (запись и регистрация атомарны)."""
+        path = self.path_for(key, suffix)
+        with self._lock:
+            if self.get(key, suffix) is None:
+                with open(path, 'wb') as f:
+                    f.write(data)
+                self.add(path)
+        return path
+
+    def discard(self, path: str):
+        """Удаляет артефакт."""
+        with self._lock:
+            self._forget(path)
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                print(f"Не удалось удалить временный файл {path}: {e}")
+
+    def _forget(self, path: str):
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._usage -= size
+
+    def _enforce_quota(self, keep: Optional[str] = None):
+        """Вытесняет давно не использованные артефакты, пока объем превышает квоту."""
+        for path in list(self._entries):
+            if self._usage <= self.quota_bytes:
+                break
+            if path != keep:
+                self.discard(path)
+
+    def clear(self):
+        """Удаляет все артефакты сессии, оставляя сам каталог."""
+        with self._lock:
+            for path in list(self._entries):
+                self.discard(path)
+
+    def close(self):
+        """Удаляет каталог сессии целиком."""
+        with self._lock:
+            self._entries.clear()
+            self._usage = 0
+            if self._created:
+                shutil.rmtree(self.session_dir, ignore_errors=True)
+                self._created = False
+
+    @staticmethod
+    def sweep_stale_sessions(root: str, stale_after: float = DEFAULT_STALE_AFTER) -> int:
+        """
+        Удаляет каталоги сессий, чьи процессы завершились или давно неактивны.
+
+        Returns:
+            int: количество удаленных каталогов
+        """
+        if not os.path.isdir(root):
+            return 0
+
+        removed = 0
+        now = time.time()
+        for name in os.listdir(root):
+            if not name.startswith(SESSION_PREFIX):
+                continue
+            session_path = os.path.join(root, name)
+            try:
+                pid = int(name[len(SESSION_PREFIX):].split('_', 1)[0])
+                idle = now - os.path.getmtime(session_path)
+            except (ValueError, OSError):
+                continue
+
+            if _pid_alive(pid) and idle < stale_after:
+                continue
+
+            shutil.rmtree(session_path, ignore_errors=True)
+            removed += 1
+
+        return removed
@@ -0,0 +1,134 @@
+"""
+Постоянный кэш миниатюр страниц на диске
+
+Миниатюры хранятся сжатыми (JPEG) в базе SQLite под ключом (отпечаток
+содержимого файла, страница, размер), поэтому переименованный или
+скопированный файл находит свои миниатюры, а измененный - нет. Отпечатки
+выдает общий кэш метаданных (MetadataCache.fingerprint). Объем кэша
+ограничен квотой с вытеснением давно не использованных миниатюр.
+
+Расположение задается переменной PDF_MERGER_CACHE_DIR, квота -
+PDF_MERGER_THUMBNAIL_CACHE_MB.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .env import env_int
+
+# Квота кэша миниатюр по умолчанию (байт)
+DEFAULT_THUMBNAIL_QUOTA = 128 * 1024 * 1024
+
+# Версия схемы базы (PRAGMA user_version)
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbnails (
+    fingerprint TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (fingerprint, page, size)
+);
+CREATE INDEX IF NOT EXISTS thumbnails_last_used ON thumbnails (last_used);
+"""
+
+
+def default_cache_dir() -> str:
+    """Каталог кэша приложения."""
+    configured = os.environ.get('PDF_MERGER_CACHE_DIR')
+    if configured:
+        return configured
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pdf_merger')
+
+
+class ThumbnailStore:
+    """Миниатюры страниц в SQLite с квотой и вытеснением давно не использованных."""
+
+    def __init__(self, path: Optional[str] = None, quota_bytes: Optional[int] = None):
+        if path is None:
+            path = os.path.join(default_cache_dir(), 'thumbnails.sqlite')
+        if quota_bytes is None:
+            quota_bytes = env_int('PDF_MERGER_THUMBNAIL_CACHE_MB', DEFAULT_THUMBNAIL_QUOTA // (1024 * 1024),
+                                  unit="МБ") * 1024 * 1024
+
+        self.path = path
+        self.quota_bytes = quota_bytes
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Соединение используется из разных потоков, доступ сериализуется блокировкой
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._usage = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbnails").fetchone()[0]
+
+    @property
+    def usage(self) -> int:
+        """Текущий объем миниатюр в байтах."""
+        return self._usage
+
+    def get(self, fingerprint: str, page: int, size: int) -> Optional[bytes]:
+        """Возвращает сжатую миниатюру или None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM thumbnails WHERE fingerprint = ? AND page = ? AND size = ?",
+                (fingerprint, page, size),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE thumbnails SET last_used = ? WHERE fingerprint = ? AND page = ? AND size = ?",
+                (time.time(), fingerprint, page, size),
+            )
+        return row[0]
+
+    def put(self, fingerprint: str, page: int, size: int, data: bytes):
+        """Сохраняет миниатюру и освобождает место при превышении квоты."""
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT bytes FROM thumbnails WHERE fingerprint = ? AND page = ? AND size = ?",
+                (fingerprint, page, size),
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thumbnails (fingerprint, page, size, data, bytes, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fingerprint, page, size, sqlite3.Binary(data), len(data), time.time()),
+            )
+            self._usage += len(data) - (old[0] if old else 0)
+            self._enforce_quota()
+
+    def _enforce_quota(self):
+        """Вытесняет давно не использованные миниатюры, пока объем превышает квоту."""
+        while self._usage > self.quota_bytes:
+            rows = self._conn.execute(
+                "SELECT rowid, bytes FROM thumbnails ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._usage = 0
+                break
+            # Удаляем пачкой: освобождаем немного больше, чтобы не вытеснять на каждой записи
+            target = self.quota_bytes * 0.9
+            doomed = []
+            for rowid, size in rows:
+                doomed.append((rowid,))
+                self._usage -= size
+                if self._usage <= target:
+                    break
+            self._conn.executemany("DELETE FROM thumbnails WHERE rowid = ?", doomed)
+
+    def close(self):
+        """Закрывает базу."""
+        with self._lock:
+            self._conn.close()
@@ -9,6 +9,7 @@ PDF Merger Pro - Приложение для объединения PDF файл
 
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 
 # Добавляем текущую директорию в путь для импортов
@@ -154,4 +155,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # Нужно для процессов конвертации в собранном exe
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+
+from core import document_cache
+from core.document_cache import DocumentCache
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / 'doc.pdf'
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), 'page')
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_two_consumers_parse_file_once(pdf_path, monkeypatch):
+    opened = []
+    real_open = fitz.open
+
+    def counting_open(*args, **kwargs):
+        opened.append(args)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(document_cache.fitz, 'open', counting_open)
+
+    # Диалог открывает файл в потоке GUI, поток рендеринга - в своем
+    dialog = DocumentCache()
+    renderer = DocumentCache()
+    doc = dialog.open(pdf_path)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(doc=renderer.open(pdf_path)))
+    thread.start()
+    thread.join()
+
+    assert len(opened) == 1
+    assert result['doc'] is doc
+
+    # Документ закрывается только после того, как его отпустили оба кэша
+    dialog.close()
+    assert not doc.is_closed
+    renderer.close()
+    assert doc.is_closed
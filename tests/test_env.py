@@ -0,0 +1,30 @@
+from core.env import env_int
+
+NAME = 'PDF_MERGER_TEST_VALUE'
+
+
+def test_unset_and_empty_give_default(monkeypatch):
+    monkeypatch.delenv(NAME, raising=False)
+    assert env_int(NAME, 7) == 7
+    monkeypatch.setenv(NAME, '')
+    assert env_int(NAME, 7) == 7
+
+
+def test_valid_value(monkeypatch):
+    monkeypatch.setenv(NAME, '42')
+    assert env_int(NAME, 7) == 42
+
+
+def test_minimum_is_inclusive(monkeypatch):
+    monkeypatch.setenv(NAME, '0')
+    assert env_int(NAME, 7, minimum=0) == 0
+
+
+def test_rejects_malformed_zero_and_negative(monkeypatch, capsys):
+    for value in ('abc', '1.5', '0', '-1'):
+        monkeypatch.setenv(NAME, value)
+        assert env_int(NAME, 7, unit="МБ") == 7
+        assert f"{NAME}={value!r}, используется 7 МБ" in capsys.readouterr().out
+
+    monkeypatch.setenv(NAME, '-1')
+    assert env_int(NAME, 3, minimum=0) == 3
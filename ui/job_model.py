@@ -0,0 +1,293 @@
+"""
+Список файлов задания объединения
+
+JobListModel хранит файлы задания компактными записями JobEntry (путь,
+сконвертированный документ, параметры конвертации, страницы, размер, состояние) в порядке
+объединения и индексы путь -> запись и отпечаток содержимого -> запись.
+Проверка дубликатов (в том числе переименованной копии уже добавленного
+файла) и поиск файла по пути - поиск в словаре, а не перебор строк
+представления, поэтому список остается быстрым и на десятках тысяч файлов. Добавление и
+удаление нескольких файлов сообщаются представлению одним изменением
+на пачку (смежный диапазон строк), а не по строке.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+# Состояния файла
+STATUS_NEW = 'new'          # добавлен без проверки (например, перетаскиванием)
+STATUS_READY = 'ready'      # проверен и готов к объединению
+STATUS_MISSING = 'missing'  # файл не найден
+STATUS_BROKEN = 'broken'    # не удалось прочитать страницы
+
+# Больше разрозненных диапазонов удаляемых строк - перестройка модели целиком
+MAX_REMOVED_RANGES = 32
+
+
+class JobEntry:
+    """Файл задания объединения."""
+
+    __slots__ = ('path', 'converted', 'options', 'fingerprint', 'pages', 'size', 'status')
+
+    def __init__(self, path: str, converted=None, status: str = STATUS_NEW, options=None,
+                 fingerprint: Optional[str] = None):
+        """
+        Args:
+            path: Исходный путь (показывается в списке и служит ключом)
+            converted: ConvertedDocument, если файл сконвертирован в PDF
+            status: Состояние файла
+            options: ConversionOptions, выбранные для файла при добавлении
+                (сохраняются, даже когда сконвертированный документ освобожден)
+            fingerprint: Отпечаток содержимого исходного файла (None - еще не вычислен)
+        """
+        self.path = path
+        self.converted = converted
+        self.options = options
+        self.fingerprint = fingerprint
+        self.pages = None  # None - еще не подсчитано
+        self.size = converted.size if converted is not None else None
+        self.status = status
+
+
+class JobListModel(QAbstractListModel):
+    """Файлы задания в порядке объединения с индексами по пути и содержимому."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries: List[JobEntry] = []
+        self._index: Dict[str, JobEntry] = {}
+        self._by_fingerprint: Dict[str, JobEntry] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._index
+
+    def find(self, path: str) -> Optional[JobEntry]:
+        """Запись файла по пути или None."""
+        return self._index.get(path)
+
+    def find_by_fingerprint(self, fingerprint: Optional[str]) -> Optional[JobEntry]:
+        """Запись файла с таким содержимым или None."""
+        if fingerprint is None:
+            return None
+        return self._by_fingerprint.get(fingerprint)
+
+    def entry(self, row: int) -> Optional[JobEntry]:
+        """Запись в строке или None."""
+        if 0 <= row < len(self._entries):
+            return self._entries[row]
+        return None
+
+    def entries(self) -> List[JobEntry]:
+        """Записи в порядке объединения (копия списка)."""
+        return list(self._entries)
+
+    def paths(self) -> List[str]:
+        """Исходные пути в порядке объединения."""
+        return [entry.path for entry in self._entries]
+
+    def fingerprints(self) -> List[str]:
+        """Известные отпечатки содержимого файлов."""
+        return list(self._by_fingerprint)
+
+    def add_paths(self, paths: Iterable[str]) -> List[JobEntry]:
+        """Добавляет файлы без проверки; уже добавленные пропускаются."""
+        return self.add_entries(JobEntry(path) for path in paths)
+
+    def add_entries(self, entries: Iterable[JobEntry]) -> List[JobEntry]:
+        """
+        Добавляет записи в конец списка одной пачкой.
+
+        Returns:
+            list: Добавленные записи (без дубликатов путей и содержимого)
+        """
+        added = []
+        for entry in entries:
+            if entry.path in self._index or self.find_by_fingerprint(entry.fingerprint) is not None:
+                continue
+            self._index[entry.path] = entry
+            if entry.fingerprint is not None:
+                self._by_fingerprint[entry.fingerprint] = entry
+            added.append(entry)
+
+        if added:
+            first = len(self._entries)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self._entries.extend(added)
+            self.endInsertRows()
+        return added
+
+    def remove_rows(self, rows: Iterable[int]) -> List[JobEntry]:
+        """
+        Удаляет строки; смежные строки удаляются одним диапазоном.
+
+        Returns:
+            list: Удаленные записи
+        """
+        rows = sorted({row for row in rows if 0 <= row < len(self._entries)}, reverse=True)
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1][0] = row
+            else:
+                ranges.append([row, row])
+
+        if len(ranges) > MAX_REMOVED_RANGES:
+            # Разрозненные строки: одна перестройка представления вместо сотен изменений
+            self.beginResetModel()
+            removed_rows = set(rows)
+            removed = [self._entries[row] for row in reversed(rows)]
+            self._entries = [entry for row, entry in enumerate(self._entries) if row not in removed_rows]
+            for entry in removed:
+                self._forget(entry)
+            self.endResetModel()
+            return removed
+
+        removed = []
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            chunk = self._entries[first:last + 1]
+            del self._entries[first:last + 1]
+            for entry in chunk:
+                self._forget(entry)
+            self.endRemoveRows()
+            removed[:0] = chunk
+        return removed
+
+    def remove_entries(self, entries: Iterable[JobEntry]) -> List[JobEntry]:
+        """Удаляет записи (см. remove_rows)."""
+        doomed = {id(entry) for entry in entries}
+        return self.remove_rows(row for row, entry in enumerate(self._entries) if id(entry) in doomed)
+
+    def _forget(self, entry: JobEntry):
+        """Убирает запись из индексов."""
+        del self._index[entry.path]
+        if self._by_fingerprint.get(entry.fingerprint) is entry:
+            del self._by_fingerprint[entry.fingerprint]
+
+    def clear(self):
+        """Удаляет все файлы."""
+        self.beginResetModel()
+        self._entries.clear()
+        self._index.clear()
+        self._by_fingerprint.clear()
+        self.endResetModel()
+
+    def move_row(self, row: int, destination: int) -> bool:
+        """Перемещает строку на место destination (индекс после перемещения)."""
+        if destination > row:
+            destination += 1
+        return self.moveRows(QModelIndex(), row, 1, QModelIndex(), destination)
+
+    def set_file_infos(self, infos: Dict[str, dict]) -> List[JobEntry]:
+        """
+        Запоминает отпечатки, страницы и размеры файлов.
+
+        Информация - dict как у PDFInfo.get_file_info с полем 'fingerprint'
+        (у файлов, требующих конвертации, - только 'fingerprint').
+        Представление получает одно изменение на всю пачку.
+
+        Returns:
+            list: Записи, содержимое которых совпало с уже добавленным файлом
+                (остаются в списке - удаляет вызывающий код)
+        """
+        changed = False
+        duplicates = []
+        for path, info in infos.items():
+            entry = self._index.get(path)
+            if entry is None:
+                continue
+
+            fingerprint = info.get('fingerprint')
+            if fingerprint is not None and entry.fingerprint is None:
+                original = self._by_fingerprint.get(fingerprint)
+                if original is not None and original is not entry:
+                    duplicates.append(entry)
+                    continue
+                entry.fingerprint = fingerprint
+                self._by_fingerprint[fingerprint] = entry
+
+            if 'pages' not in info:
+                continue
+            entry.size = info['size']
+            entry.pages = info['pages']
+            if not info['exists']:
+                entry.status = STATUS_MISSING
+            elif info['pages'] == 0:
+                entry.status = STATUS_BROKEN
+            else:
+                entry.status = STATUS_READY
+            changed = True
+
+        if changed and self._entries:
+            self.dataChanged.emit(self.index(0), self.index(len(self._entries) - 1),
+                                  [Qt.ItemDataRole.ToolTipRole, Qt.ItemDataRole.ForegroundRole])
+        return duplicates
+
+    # Интерфейс QAbstractListModel
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._entries):
+            return None
+        entry = self._entries[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry.path
+
+        if role == Qt.ItemDataRole.ToolTipRole:
+            details = []
+            if entry.pages is not None:
+                details.append(f"{entry.pages} стр.")
+            if entry.size is not None:
+                details.append(f"{entry.size / (1024 * 1024):.1f} МБ")
+            if entry.converted is not None:
+                details.append("сконвертирован в PDF")
+            if entry.status == STATUS_MISSING:
+                details.append("файл не найден")
+            elif entry.status == STATUS_BROKEN:
+                details.append("не удалось прочитать")
+            return entry.path + ('\n' + ', '.join(details) if details else '')
+
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if entry.status in (STATUS_MISSING, STATUS_BROKEN):
+                return QColor('#dc3545')
+            return None
+
+        if role == Qt.ItemDataRole.UserRole:
+            return entry
+
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            # Перетаскивание возможно только между строками
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+                | Qt.ItemFlag.ItemIsDragEnabled)
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination_child):
+        if (source_parent.isValid() or destination_parent.isValid() or count <= 0
+                or source_row < 0 or source_row + count > len(self._entries)
+                or not 0 <= destination_child <= len(self._entries)):
+            return False
+        if not self.beginMoveRows(source_parent, source_row, source_row + count - 1,
+                                  destination_parent, destination_child):
+            return False
+
+        moved = self._entries[source_row:source_row + count]
+        del self._entries[source_row:source_row + count]
+        if destination_child > source_row:
+            destination_child -= count
+        self._entries[destination_child:destination_child] = moved
+        self.endMoveRows()
+        return True
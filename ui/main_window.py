@@ -4,16 +4,22 @@
 
 import os
 from PyQt6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
-                             QPushButton, QFileDialog, QMessageBox, QLabel)
-from PyQt6.QtCore import Qt
+                             QPushButton, QFileDialog, QMessageBox, QLabel, QComboBox)
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont
 import qtawesome as qta
 
-from .widgets import PDFListWidget, StatusWidget, FileCountWidget, CompactButton
+from .widgets import PDFListView, StatusWidget, FileCountWidget, CompactButton
+from .job_model import JobEntry, STATUS_READY
 from .styles import APP_STYLES
 from .preview_dialogs import PDFPreviewDialog, MultiPreviewDialog
-from core.pdf_worker import PDFMergerWorker, PDFValidator, PDFInfo
+from core.pdf_worker import (PDFMergerWorker, PDFValidator, PDFInfo, PDFInfoWorker,
+                             FileConversionWorker)
 from core.file_converter import FileConverter
+from core.converters import ConversionOptions, PAGE_SIZE_LABELS
+
+# Как часто список файлов обновляется по мере подсчета страниц (мс)
+INFO_UPDATE_INTERVAL = 150
 
 
 class PDFMergerMainWindow(QMainWindow):
@@ -22,8 +28,17 @@ class PDFMergerMainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.worker = None
+        self.conversion_worker = None
         self.file_converter = FileConverter()
-        self.temp_files = []  # Список временных файлов для очистки
+
+        # Страницы и размеры добавленных файлов считаются в фоне и попадают в список пачками
+        self.info_workers = []
+        self.pending_infos = {}
+        self.info_timer = QTimer(self)
+        self.info_timer.setSingleShot(True)
+        self.info_timer.setInterval(INFO_UPDATE_INTERVAL)
+        self.info_timer.timeout.connect(self.apply_file_infos)
+
         self.init_ui()
         self.setup_connections()
 
@@ -92,7 +107,9 @@ class PDFMergerMainWindow(QMainWindow):
 
     def create_file_list(self, main_layout):
         """Создает список файлов."""
-        self.file_list = PDFListWidget()
+        self.file_list = PDFListView()
+        # Файлы задания (исходные пути, сконвертированные документы, страницы)
+        self.jobs = self.file_list.jobs
         self.file_list.setMinimumHeight(180)
         self.file_list.setMaximumHeight(250)
         self.file_list.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
@@ -177,6 +194,17 @@ class PDFMergerMainWindow(QMainWindow):
         secondary_controls_layout.addWidget(self.clear_btn)
 
         secondary_controls_layout.addStretch()
+
+        # Размер страниц для добавляемых изображений
+        page_size_label = QLabel('Изображения:')
+        page_size_label.setStyleSheet("color: #495057; font-size: 12px;")
+        secondary_controls_layout.addWidget(page_size_label)
+
+        self.page_size_combo = QComboBox()
+        for page_size, label in PAGE_SIZE_LABELS.items():
+            self.page_size_combo.addItem(label, page_size)
+        self.page_size_combo.setToolTip('Размер страницы PDF для добавляемых изображений')
+        secondary_controls_layout.addWidget(self.page_size_combo)
         file_controls_layout.addLayout(secondary_controls_layout)
 
         main_layout.addWidget(file_controls_group)
@@ -243,14 +271,15 @@ class PDFMergerMainWindow(QMainWindow):
     def setup_connections(self):
         """Настройка соединений сигналов."""
         # Обновление информации при изменении списка
-        self.file_list.itemChanged.connect(self.update_info)
-        self.file_list.itemSelectionChanged.connect(self.update_buttons)
-
-        # Безопасное подключение сигналов модели
-        model = self.file_list.model()
-        if model:
-            model.rowsInserted.connect(self.update_info)
-            model.rowsRemoved.connect(self.update_info)
+        self.file_list.selectionModel().currentChanged.connect(self.update_buttons)
+        self.jobs.rowsInserted.connect(self.update_info)
+        self.jobs.rowsRemoved.connect(self.update_info)
+        self.jobs.modelReset.connect(self.update_info)
+        self.jobs.rowsInserted.connect(self.update_buttons)
+        self.jobs.rowsRemoved.connect(self.update_buttons)
+        self.jobs.modelReset.connect(self.update_buttons)
+        self.jobs.rowsMoved.connect(self.update_buttons)
+        self.jobs.rowsInserted.connect(self.on_files_inserted)
 
         # Начальное обновление
         self.update_info()
@@ -267,96 +296,176 @@ class PDFMergerMainWindow(QMainWindow):
         )
 
         if files:
-            # Получаем существующие файлы
-            existing_files = []
-            for i in range(self.file_list.count()):
-                item = self.file_list.item(i)
-                if item:
-                    existing_files.append(item.text())
-
-            # Добавляем только новые файлы
-            added_count = 0
-            converted_count = 0
-
+            # Отбираем новые файлы поддерживаемых форматов
+            new_files = []
+            seen = set()
             for file_path in files:
-                if file_path not in existing_files:
-                    # Проверяем поддержку формата
-                    if not FileConverter.is_supported_format(file_path):
-                        QMessageBox.warning(
-                            self,
-                            'Неподдерживаемый формат',
-                            f'Файл {os.path.basename(file_path)} имеет неподдерживаемый формат'
-                        )
-                        continue
-
-                    # Конвертируем файл в PDF если нужно
-                    success, result = self.file_converter.convert_to_pdf(file_path)
-
-                    if success:
-                        pdf_path = result
-
-                        # Если файл был сконвертирован (не оригинальный PDF)
-                        if pdf_path != file_path:
-                            converted_count += 1
-                            self.temp_files.append(pdf_path)
-
-                        # Валидируем получившийся PDF
-                        is_valid, message = PDFValidator.is_valid_pdf(pdf_path)
-                        if is_valid:
-                            # Добавляем оригинальный путь в список (для отображения)
-                            # но сохраняем путь к PDF для объединения
-                            self.file_list.addItem(file_path)
-                            added_count += 1
-                        else:
-                            QMessageBox.warning(
-                                self,
-                                'Ошибка файла',
-                                f'Файл {os.path.basename(file_path)}:\n{message}'
-                            )
-                            # Удаляем временный файл если он был создан
-                            if pdf_path != file_path and pdf_path in self.temp_files:
-                                self.temp_files.remove(pdf_path)
-                                try:
-                                    os.remove(pdf_path)
-                                except Exception:
-                                    pass
-                    else:
-                        # Ошибка конвертации
-                        error_message = result
-                        QMessageBox.warning(
-                            self,
-                            'Ошибка конвертации',
-                            f'Не удалось обработать файл {os.path.basename(file_path)}:\n{error_message}'
-                        )
-
-            # Показываем результат
-            if added_count > 0:
-                status_msg = f'Добавлено файлов: {added_count}'
-                if converted_count > 0:
-                    status_msg += f' (сконвертировано: {converted_count})'
-                self.status_widget.set_status(status_msg, 'success')
-
-                # Показываем информацию о недостающих зависимостях
-                missing_deps = self.file_converter.get_missing_dependencies()
-                if missing_deps and converted_count == 0:
-                    QMessageBox.information(
+                if file_path in self.jobs or file_path in seen:
+                    continue
+                seen.add(file_path)
+                # Проверяем поддержку формата
+                if not FileConverter.is_supported_format(file_path):
+                    QMessageBox.warning(
+                        self,
+                        'Неподдерживаемый формат',
+                        f'Файл {os.path.basename(file_path)} имеет неподдерживаемый формат'
+                    )
+                    continue
+                new_files.append(file_path)
+
+            if not new_files:
+                return
+
+            # Конвертируем файлы в PDF если нужно (Word документы - параллельно) в фоне:
+            # большие таблицы и документы конвертируются минутами
+            # Переименованные копии уже добавленных файлов отсеиваются по содержимому
+            options = self.conversion_options()
+            self.start_conversion(
+                new_files, options,
+                lambda results, new_files=new_files, options=options:
+                    self.on_files_converted(new_files, options, results),
+                known_fingerprints=self.jobs.fingerprints()
+            )
+
+    def on_files_converted(self, new_files, options, results):
+        """Добавить сконвертированные и проверенные файлы в список."""
+        entries = []
+        converted_count = 0
+        duplicate_count = 0
+
+        for file_path, (success, result, check, fingerprint) in zip(new_files, results):
+            if not success and result is None:
+                # Файл с таким содержимым уже есть в списке
+                duplicate_count += 1
+            elif success:
+                document = result
+
+                # Если файл был сконвертирован (не оригинальный PDF)
+                is_converted = document.source_path != document.path
+
+                # PDF уже проверен в рабочем потоке
+                is_valid, message = check
+                if is_valid:
+                    # В списке показывается оригинальный путь,
+                    # а сконвертированный документ хранится в записи для объединения
+                    if is_converted:
+                        converted_count += 1
+                    entries.append(JobEntry(file_path, document if is_converted else None,
+                                            STATUS_READY, options, fingerprint))
+                else:
+                    QMessageBox.warning(
                         self,
-                        'Информация о зависимостях',
-                        f'Для полной поддержки конвертации установите:\n' +
-                        '\n'.join([f'• pip install {dep.split()[0].lower()}' for dep in missing_deps])
+                        'Ошибка файла',
+                        f'Файл {os.path.basename(file_path)}:\n{message}'
                     )
+                    # Удаляем временный файл если он был создан
+                    if is_converted and not document.in_memory:
+                        try:
+                            os.remove(document.path)
+                        except Exception:
+                            pass
+            else:
+                # Ошибка конвертации
+                error_message = result
+                QMessageBox.warning(
+                    self,
+                    'Ошибка конвертации',
+                    f'Не удалось обработать файл {os.path.basename(file_path)}:\n{error_message}'
+                )
+
+        # Добавляем в список одной пачкой
+        added_count = len(self.jobs.add_entries(entries))
+        # Совпавшие по содержимому с файлами, добавленными за время конвертации
+        duplicate_count += len(entries) - added_count
+
+        # Показываем результат
+        if added_count > 0:
+            status_msg = f'Добавлено файлов: {added_count}'
+            if converted_count > 0:
+                status_msg += f' (сконвертировано: {converted_count})'
+            if duplicate_count > 0:
+                status_msg += f' (пропущено дубликатов: {duplicate_count})'
+            self.status_widget.set_status(status_msg, 'success')
+
+            # Показываем информацию о недостающих зависимостях
+            missing_deps = self.file_converter.get_missing_dependencies()
+            if missing_deps and converted_count == 0:
+                QMessageBox.information(
+                    self,
+                    'Информация о зависимостях',
+                    f'Для полной поддержки конвертации установите:\n' +
+                    '\n'.join([f'• pip install {dep.split()[0].lower()}' for dep in missing_deps])
+                )
+        elif duplicate_count > 0:
+            self.status_widget.set_status(f'Файлы уже есть в списке: {duplicate_count}', 'info')
+        else:
+            self.update_info()
+
+    def start_conversion(self, file_paths, options, on_finished, known_fingerprints=None):
+        """Запустить конвертацию файлов в рабочем потоке; on_finished получит результаты."""
+        self.conversion_worker = FileConversionWorker(self.file_converter, file_paths, options, self,
+                                                      known_fingerprints)
+        self.conversion_worker.conversion_finished.connect(on_finished)
+        self.conversion_worker.finished.connect(self.conversion_worker_finished)
+        self.status_widget.set_status(f'Конвертация файлов ({len(file_paths)})...', 'processing')
+        self.status_icon.setPixmap(qta.icon('fa5s.spinner', color='#6f42c1').pixmap(16, 16))
+        self.conversion_worker.start()
+        self.update_buttons()
+
+    def conversion_worker_finished(self):
+        """Слот, вызываемый после завершения потока конвертации."""
+        if self.conversion_worker is not None:
+            self.conversion_worker.deleteLater()
+            self.conversion_worker = None
+        self.update_buttons()
+
+    def on_files_inserted(self, parent, first, last):
+        """Запустить подсчет страниц, размеров и отпечатков добавленных файлов"""
+        entries = (self.jobs.entry(row) for row in range(first, last + 1))
+        # Перетащенные файлы еще без отпечатка: дубликаты по содержимому удаляются после подсчета
+        paths = [entry.path for entry in entries
+                 if entry.fingerprint is None
+                 or (entry.converted is None and not FileConverter.needs_conversion(entry.path))]
+        if not paths:
+            return
+        worker = PDFInfoWorker(paths, self)
+        worker.file_info_ready.connect(
+            lambda position, info, paths=paths: self.on_file_info_ready(paths[position], info))
+        worker.finished.connect(self.apply_file_infos)
+        worker.finished.connect(lambda worker=worker: self.info_worker_finished(worker))
+        self.info_workers.append(worker)
+        worker.start()
+
+    def info_worker_finished(self, worker):
+        if worker in self.info_workers:
+            self.info_workers.remove(worker)
+            worker.deleteLater()
+
+    def on_file_info_ready(self, file_path, info):
+        """Запомнить информацию о файле; список обновляется пачками"""
+        self.pending_infos[file_path] = info
+        if not self.info_timer.isActive():
+            self.info_timer.start()
+
+    def apply_file_infos(self):
+        """Передать подсчитанные страницы и размеры в список файлов"""
+        pending, self.pending_infos = self.pending_infos, {}
+        if pending:
+            duplicates = self.jobs.set_file_infos(pending)
+            if duplicates:
+                self.jobs.remove_entries(duplicates)
+                self.status_widget.set_status(f'Пропущено дубликатов: {len(duplicates)}', 'info')
 
     def remove_file(self):
         """Удалить выбранный файл."""
-        current_row = self.file_list.currentRow()
+        current_row = self.file_list.current_row()
         if current_row >= 0:
-            item = self.file_list.takeItem(current_row)
-            if item:
-                self.status_widget.set_status(f'Удален файл: {os.path.basename(item.text())}', 'info')
+            for entry in self.jobs.remove_rows([current_row]):
+                self.status_widget.set_status(f'Удален файл: {os.path.basename(entry.path)}', 'info')
 
     def clear_list(self):
         """Очистить список файлов."""
-        if self.file_list.count() > 0:
+        if len(self.jobs) > 0:
             reply = QMessageBox.question(
                 self,
                 'Подтверждение',
@@ -365,53 +474,45 @@ class PDFMergerMainWindow(QMainWindow):
             )
 
             if reply == QMessageBox.StandardButton.Yes:
-                count = self.file_list.count()
-                self.file_list.clear()
+                count = len(self.jobs)
+                self.jobs.clear()
                 self.status_widget.set_status(f'Удалено файлов: {count}', 'info')
 
     def move_up(self):
         """Переместить файл вверх."""
-        current_row = self.file_list.currentRow()
+        current_row = self.file_list.current_row()
         if current_row > 0:
-            item = self.file_list.takeItem(current_row)
-            self.file_list.insertItem(current_row - 1, item)
-            self.file_list.setCurrentRow(current_row - 1)
+            self.jobs.move_row(current_row, current_row - 1)
+            self.file_list.set_current_row(current_row - 1)
 
     def move_down(self):
         """Переместить файл вниз."""
-        current_row = self.file_list.currentRow()
-        if current_row >= 0 and current_row < self.file_list.count() - 1:
-            item = self.file_list.takeItem(current_row)
-            self.file_list.insertItem(current_row + 1, item)
-            self.file_list.setCurrentRow(current_row + 1)
+        current_row = self.file_list.current_row()
+        if current_row >= 0 and current_row < len(self.jobs) - 1:
+            self.jobs.move_row(current_row, current_row + 1)
+            self.file_list.set_current_row(current_row + 1)
 
     def preview_pdf(self):
         """Открыть окно предварительного просмотра для выбранного PDF файла."""
-        current_row = self.file_list.currentRow()
-        if current_row >= 0:
-            item = self.file_list.item(current_row)
-            if item:
-                file_path = item.text()
-
-                if not os.path.exists(file_path):
-                    QMessageBox.warning(
-                        self,
-                        'Ошибка',
-                        f'Файл не найден: {os.path.basename(file_path)}'
-                    )
-                    return
-
-                # Открываем окно предварительного просмотра
-                preview_dialog = PDFPreviewDialog(self, file_path)
-                preview_dialog.exec()
+        entry = self.jobs.entry(self.file_list.current_row())
+        if entry is not None:
+            file_path = entry.path
+
+            if not os.path.exists(file_path):
+                QMessageBox.warning(
+                    self,
+                    'Ошибка',
+                    f'Файл не найден: {os.path.basename(file_path)}'
+                )
+                return
+
+            # Открываем окно предварительного просмотра
+            preview_dialog = PDFPreviewDialog(self, file_path)
+            preview_dialog.exec()
 
     def preview_all_pdfs(self):
         """Открыть окно предварительного просмотра всех PDF файлов."""
-        file_paths = []
-        for i in range(self.file_list.count()):
-            item = self.file_list.item(i)
-            if item:
-                file_paths.append(item.text())
+        file_paths = self.jobs.paths()
 
         if not file_paths:
             QMessageBox.information(
@@ -445,34 +546,45 @@ class PDFMergerMainWindow(QMainWindow):
 
     def merge_pdfs(self):
         """Объединить PDF файлы."""
-        original_paths = []
-        pdf_paths = []
-
-        # Получаем пути к файлам и их PDF версиям
-        for i in range(self.file_list.count()):
-            item = self.file_list.item(i)
-            if item:
-                original_path = item.text()
-                original_paths.append(original_path)
-
-                # Если файл был сконвертирован, используем PDF версию
-                if original_path.lower().endswith('.pdf'):
-                    pdf_paths.append(original_path)
-                else:
-                    # Ищем соответствующий временный PDF файл
-                    success, pdf_path = self.file_converter.convert_to_pdf(original_path)
-                    if success:
-                        pdf_paths.append(pdf_path)
-                        # Добавляем в список временных файлов если еще нет
-                        if pdf_path not in self.temp_files:
-                            self.temp_files.append(pdf_path)
-                    else:
-                        QMessageBox.warning(
-                            self,
-                            'Ошибка конвертации',
-                            f'Не удалось подготовить файл {os.path.basename(original_path)} для объединения'
-                        )
-                        return
+        entries = self.jobs.entries()
+
+        # Файлы без доступной PDF версии (например, после очистки временных файлов
+        # или вытеснения из каталога по квоте) конвертируем заново в фоне с
+        # параметрами, выбранными при добавлении; для перетащенных - с текущими
+        stale = [entry for entry in entries
+                 if FileConverter.needs_conversion(entry.path) and not self._has_converted_document(entry)]
+        if stale:
+            for entry in stale:
+                if entry.options is None:
+                    entry.options = self.conversion_options()
+            self.start_conversion(
+                [entry.path for entry in stale], [entry.options for entry in stale],
+                lambda results, entries=entries, stale=stale:
+                    self.on_merge_sources_converted(entries, stale, results)
+            )
+            return
+
+        self.start_merge(entries)
+
+    def on_merge_sources_converted(self, entries, stale, results):
+        """Запомнить заново сконвертированные документы и продолжить объединение."""
+        for entry, (success, document, check, _) in zip(stale, results):
+            if not success or not check[0]:
+                self.update_info()
+                QMessageBox.warning(
+                    self,
+                    'Ошибка конвертации',
+                    f'Не удалось подготовить файл {os.path.basename(entry.path)} для объединения'
+                )
+                return
+            entry.converted = document
+
+        self.start_merge(entries)
+
+    def start_merge(self, entries):
+        """Проверить файлы, выбрать место сохранения и запустить объединение."""
+        # Получаем PDF версии файлов в порядке списка
+        pdf_paths = [entry.path if entry.converted is None else entry.converted for entry in entries]
 
         # Валидация PDF файлов
         is_valid, message = PDFValidator.validate_file_list(pdf_paths)
@@ -496,13 +608,24 @@ class PDFMergerMainWindow(QMainWindow):
             self.worker.error.connect(self.merging_error)
             self.worker.start()
 
+    def conversion_options(self):
+        """Параметры конвертации, выбранные в интерфейсе."""
+        return ConversionOptions(page_size=self.page_size_combo.currentData())
+
+    def _has_converted_document(self, entry):
+        """Проверяет, что сконвертированная версия файла еще доступна."""
+        document = entry.converted
+        if document is None:
+            return False
+        return document.in_memory or os.path.exists(document.path)
+
     def update_info(self):
         """Обновить информацию о файлах."""
-        count = self.file_list.count()
+        count = len(self.jobs)
         self.file_count_widget.update_count(count)
 
         # Обновляем статус
-        if not hasattr(self, 'worker') or not (self.worker and self.worker.isRunning()):
+        if not self.is_working():
             if count == 0:
                 self.status_widget.set_status('Добавьте PDF файлы для начала работы', 'info')
                 self.status_icon.setPixmap(qta.icon('fa5s.info-circle', color='#17a2b8').pixmap(16, 16))
@@ -513,12 +636,17 @@ class PDFMergerMainWindow(QMainWindow):
                 self.status_widget.set_status('Готов к объединению', 'success')
                 self.status_icon.setPixmap(qta.icon('fa5s.check-circle', color='#28a745').pixmap(16, 16))
 
+    def is_working(self):
+        """Идет ли объединение или конвертация файлов."""
+        return any(worker is not None and worker.isRunning()
+                   for worker in (self.worker, self.conversion_worker))
+
     def update_buttons(self):
         """Обновить состояние кнопок."""
-        count = self.file_list.count()
-        current_row = self.file_list.currentRow()
+        count = len(self.jobs)
+        current_row = self.file_list.current_row()
         has_selection = current_row >= 0
-        is_working = hasattr(self, 'worker') and self.worker and self.worker.isRunning()
+        is_working = self.is_working()
 
         # Кнопки управления файлами
         self.add_btn.setEnabled(not is_working)
@@ -584,19 +712,24 @@ class PDFMergerMainWindow(QMainWindow):
         msg.exec()
 
     def cleanup_temp_files(self):
-        """Очищает временные файлы."""
-        for temp_file in self.temp_files:
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            except Exception as e:
-                print(f"Не удалось удалить временный файл {temp_file}: {e}")
-
-        self.temp_files.clear()
+        """Очищает временные файлы; документы в памяти остаются для следующего объединения."""
+        for entry in self.jobs.entries():
+            if entry.converted is not None and not entry.converted.in_memory:
+                entry.converted = None
         self.file_converter.cleanup_temp_files()
 
     def closeEvent(self, event):
         """Обработчик закрытия приложения."""
         # Очищаем временные файлы при закрытии
+        for worker in self.info_workers:
+            worker.stop()
+        self.info_timer.stop()
+        conversion_worker = self.conversion_worker
+        if conversion_worker is not None:
+            # Результат уже не нужен: остановка процессов конвертации прерывает ее
+            conversion_worker.conversion_finished.disconnect()
         self.cleanup_temp_files()
+        self.file_converter.shutdown()
+        if conversion_worker is not None:
+            conversion_worker.wait()
         event.accept()
@@ -0,0 +1,136 @@
+"""
+Общий кэш отрисованных страниц для диалогов предпросмотра
+
+Страницы хранятся как QPixmap под ключом (файл, страница, масштаб,
+device pixel ratio), плитки страниц - под тем же ключом с номерами
+столбца и строки. Файл идентифицируется путем, размером и временем
+изменения, поэтому после перезаписи файла старые изображения не
+используются. Объем кэша ограничен бюджетом в байтах с вытеснением давно
+не использованных страниц. Кэш один на приложение: повторное открытие
+предпросмотра и возврат к уже просмотренной странице обходятся без
+рендеринга. Используется только из GUI потока.
+"""
+
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PyQt6.QtGui import QPixmap
+
+from core.env import env_int
+
+# Бюджет кэша по умолчанию (байт)
+DEFAULT_CACHE_BUDGET = 192 * 1024 * 1024
+
+# (путь, размер, mtime_ns)
+FileIdentity = Tuple[str, int, int]
+
+# (идентификатор_файла, страница, масштаб, device_pixel_ratio[, столбец, строка])
+PageKey = tuple
+
+
+def file_identity(file_path: str) -> FileIdentity:
+    """Идентификатор файла: меняется при перезаписи файла."""
+    path = os.path.abspath(file_path)
+    try:
+        stat = os.stat(path)
+        return path, stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return path, -1, -1
+
+
+def pixmap_bytes(pixmap: QPixmap) -> int:
+    """Объем памяти изображения в байтах."""
+    return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+
+class PagePixmapCache:
+    """LRU кэш отрисованных страниц с ограничением по объему."""
+
+    def __init__(self, budget_bytes: Optional[int] = None):
+        if budget_bytes is None:
+            budget_bytes = env_int('PDF_MERGER_PREVIEW_CACHE_MB', DEFAULT_CACHE_BUDGET // (1024 * 1024),
+                                   unit="МБ") * 1024 * 1024
+
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()  # ключ -> (QPixmap, размер), от давних к свежим
+        self._usage = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def usage(self) -> int:
+        """Текущий объем кэша в байтах."""
+        return self._usage
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: PageKey) -> bool:
+        # Проверка без учета в статистике и без изменения порядка вытеснения
+        return key in self._entries
+
+    @staticmethod
+    def make_key(file_path: str, page: int, zoom: float, device_pixel_ratio: float = 1.0) -> PageKey:
+        """Строит ключ страницы."""
+        return file_identity(file_path), page, round(zoom, 4), round(device_pixel_ratio, 4)
+
+    def get(self, key: PageKey) -> Optional[QPixmap]:
+        """Возвращает изображение страницы или None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def peek(self, key: PageKey) -> Optional[QPixmap]:
+        """Возвращает изображение без учета в статистике (для перерисовки)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: PageKey, pixmap: QPixmap):
+        """Добавляет изображение и вытесняет старые при превышении бюджета."""
+        size = pixmap_bytes(pixmap)
+        self._forget(key)
+        if size > self.budget_bytes:
+            return
+        self._entries[key] = (pixmap, size)
+        self._usage += size
+        self._enforce_budget()
+
+    def _forget(self, key: PageKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._usage -= entry[1]
+
+    def _enforce_budget(self):
+        """Вытесняет давно не использованные страницы, пока объем превышает бюджет."""
+        while self._usage > self.budget_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._usage -= size
+
+    def clear(self):
+        """Очищает кэш (счетчики попаданий сохраняются)."""
+        self._entries.clear()
+        self._usage = 0
+
+    def stats(self) -> dict:
+        """Статистика кэша: страницы, объем, попадания и промахи."""
+        total = self.hits + self.misses
+        return {
+            'pages': len(self._entries),
+            'usage': self._usage,
+            'budget': self.budget_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+# Кэш, общий для всех диалогов предпросмотра
+page_cache = PagePixmapCache()
@@ -0,0 +1,465 @@
+"""
+Фоновый рендеринг страниц PDF для диалогов предпросмотра
+
+PyMuPDF не отпускает GIL во время рендеринга, поэтому просто вынести
+get_pixmap в поток недостаточно - интерфейс все равно замрет. Рабочий
+поток строит список отображения страницы и растеризует его полосами по
+BAND_HEIGHT пикселей: между полосами GIL достается GUI потоку, а поток
+проверяет, не устарел ли запрос. Новый запрос вытесняет ожидающий, а
+выполняемый прерывается на ближайшей границе полосы - при быстром
+листании рендерится только последняя запрошенная страница.
+
+Когда запрошенная страница готова, поток рендерит страницы из очереди
+упреждающего рендеринга (соседние страницы, следующий файл). Запрос
+страницы прерывает упреждающий рендеринг на границе полосы, а
+незаконченная страница досчитывается позже с того же места; если
+запрошена именно она, рендеринг просто продолжается.
+
+Большие страницы рендерятся в два прохода: сначала быстрый эскиз низкого
+разрешения (сигнал page_preview), затем полное изображение. Оба прохода
+идут полосами и прерываются так же, как обычный рендеринг.
+
+При большом масштабе диалог запрашивает не страницу целиком, а только
+видимые плитки (request_tiles): каждая плитка рендерится отдельно с
+обрезкой по своему прямоугольнику, а новый набор плиток при прокрутке
+вытесняет еще не отрисованные плитки предыдущего.
+
+Страницы рендерятся в пикселях устройства: масштаб умножается на
+плотность пикселей экрана (device pixel ratio), а готовое изображение
+помечается ею, поэтому на HiDPI экране Qt не растягивает страницу.
+
+Готовое изображение передается в GUI поток как RenderedImage: QImage
+смотрит прямо в буфер Pixmap PyMuPDF (samples_mv), а сам Pixmap живет,
+пока изображение не превращено в QPixmap. Страница высотой в одну полосу
+и плитки (кроме обрезанных по краю) не копируются до QPixmap.fromImage.
+Страница из нескольких полос собирается в общий Pixmap - это еще одно
+копирование всех строк: публичного способа рисовать список отображения
+прямо в чужой Pixmap у PyMuPDF нет.
+Объем копирований считает copy_stats (PDF_MERGER_RENDER_DEBUG=1 печатает
+его для каждого кадра).
+"""
+
+import math
+import os
+import threading
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+
+from core.document_cache import DocumentCache
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+# Сколько документов поток рендеринга держит открытыми
+MAX_OPEN_DOCUMENTS = 4
+
+
+class CopyStats:
+    """Отладочный счетчик байт, скопированных при подготовке кадров."""
+
+    def __init__(self):
+        self.debug = os.environ.get('PDF_MERGER_RENDER_DEBUG') == '1'
+        self.frames = 0
+        self.bytes_copied = 0
+        self.last_frame_bytes = 0
+
+    def add_frame(self, width: int, height: int, bytes_copied: int):
+        self.frames += 1
+        self.bytes_copied += bytes_copied
+        self.last_frame_bytes = bytes_copied
+        if self.debug:
+            print(f"🖼️ Кадр {width}x{height}: скопировано {bytes_copied / (1024 * 1024):.2f} МБ")
+
+
+copy_stats = CopyStats()
+
+
+class RenderedImage:
+    """Отрисованное изображение поверх буфера Pixmap (QImage не копирует пиксели)."""
+
+    def __init__(self, pixmap, bytes_copied: int = 0, device_pixel_ratio: float = 1.0):
+        """
+        Args:
+            pixmap: fitz.Pixmap (RGB без альфа-канала)
+            bytes_copied: Сколько байт уже скопировано при сборке изображения
+            device_pixel_ratio: Плотность пикселей экрана, для которой отрисовано изображение
+        """
+        # Pixmap держит буфер, на который смотрит QImage
+        self._pixmap = pixmap
+        self.image = QImage(pixmap.samples_mv, pixmap.width, pixmap.height, pixmap.stride,
+                            QImage.Format.Format_RGB888)
+        self.bytes_copied = bytes_copied
+        self.device_pixel_ratio = device_pixel_ratio
+
+    def width(self) -> int:
+        return self.image.width()
+
+    def height(self) -> int:
+        return self.image.height()
+
+    def to_pixmap(self) -> QPixmap:
+        """Создает QPixmap (только в GUI потоке) и освобождает буфер."""
+        pixmap = QPixmap.fromImage(self.image)
+        pixmap.setDevicePixelRatio(self.device_pixel_ratio)
+        copy_stats.add_frame(pixmap.width(), pixmap.height(),
+                             self.bytes_copied + pixmap.width() * pixmap.height() * pixmap.depth() // 8)
+        self.image = None
+        self._pixmap = None
+        return pixmap
+
+
+class RenderRequest:
+    """Запрос на рендеринг страницы."""
+
+    def __init__(self, request_id: int, file_path: str, page: int, zoom: float,
+                 device_pixel_ratio: float = 1.0, tiles=None, tile_size: int = 0,
+                 with_preview: bool = False):
+        self.request_id = request_id
+        self.file_path = file_path
+        self.page = page
+        self.zoom = zoom
+        self.device_pixel_ratio = device_pixel_ratio
+
+        # Для запроса плиток: [(столбец, строка)], размер плитки и нужен ли эскиз
+        self.tiles = tiles
+        self.tile_size = tile_size
+        self.with_preview = with_preview
+
+    @property
+    def job(self):
+        """(файл, страница, масштаб, плотность пикселей) - одинаковые для одинаковых страниц."""
+        return self.file_path, self.page, self.zoom, self.device_pixel_ratio
+
+    @property
+    def scale(self) -> float:
+        """Масштаб растеризации: пикселей устройства на пункт PDF."""
+        return self.zoom * self.device_pixel_ratio
+
+
+class PageRenderWorker(QThread):
+    """Рабочий поток рендеринга страниц с вытеснением устаревших запросов."""
+
+    # Сигналы
+    # Изображения передаются как RenderedImage (object - без копирования через сигнал)
+    page_rendered = pyqtSignal(int, object)  # id запроса, изображение страницы
+    render_failed = pyqtSignal(int, str)     # id запроса, сообщение об ошибке
+    page_preview = pyqtSignal(int, object, int, int)  # id запроса, эскиз, ширина и высота страницы
+    page_prefetched = pyqtSignal(str, int, float, float, object)  # файл, страница, масштаб, плотность, изображение
+    tile_rendered = pyqtSignal(str, int, float, float, int, int, object)  # файл, страница, масштаб, плотность, столбец, строка, плитка
+
+    # Высота полосы растеризации (пиксели)
+    BAND_HEIGHT = 128
+
+    # Страницы больше этого размера сначала показываются эскизом (пиксели)
+    PROGRESSIVE_MIN_PIXELS = 3_000_000
+
+    # Размер эскиза (пиксели)
+    PREVIEW_PIXELS = 250_000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._condition = threading.Condition()
+        self._pending = None
+        self._latest_id = 0
+        self._running = True
+
+        # Очередь упреждающего рендеринга и прерванная задача (запрос, генератор)
+        self._prefetch_queue = []
+        self._prefetch_generation = 0
+        self._suspended = None
+
+        # Открытые документы используются только из рабочего потока
+        self._documents = DocumentCache(MAX_OPEN_DOCUMENTS)
+
+        # (документ, номер, страница, список отображения) последней страницы:
+        # плитки одной страницы рендерятся из одного списка
+        self._display_list = None
+
+    def request(self, file_path: str, page: int, zoom: float, device_pixel_ratio: float = 1.0) -> int:
+        """
+        Ставит страницу в очередь на рендеринг, вытесняя предыдущий запрос.
+
+        Страница рендерится в пикселях устройства (масштаб * плотность
+        пикселей экрана), изображение помечается этой плотностью.
+
+        Returns:
+            int: id запроса, с которым придет сигнал page_rendered
+        """
+        with self._condition:
+            self._latest_id += 1
+            self._pending = RenderRequest(self._latest_id, file_path, page, zoom, device_pixel_ratio)
+            self._condition.notify()
+
+        if not self.isRunning():
+            self.start()
+        return self._latest_id
+
+    def request_tiles(self, file_path: str, page: int, zoom: float, device_pixel_ratio: float,
+                      tiles, tile_size: int, with_preview: bool = False) -> int:
+        """
+        Ставит плитки страницы в очередь на рендеринг, вытесняя предыдущий запрос.
+
+        Args:
+            tiles: Плитки (столбец, строка) в порядке важности
+            tile_size: Размер плитки (пиксели устройства)
+            with_preview: Сначала прислать эскиз страницы целиком (page_preview)
+
+        Returns:
+            int: id запроса
+        """
+        with self._condition:
+            self._latest_id += 1
+            self._pending = RenderRequest(self._latest_id, file_path, page, zoom, device_pixel_ratio,
+                                          list(tiles), tile_size, with_preview)
+            self._condition.notify()
+
+        if not self.isRunning():
+            self.start()
+        return self._latest_id
+
+    def prefetch(self, jobs):
+        """
+        Заменяет очередь упреждающего рендеринга.
+
+        Args:
+            jobs: Страницы (файл, страница, масштаб, плотность пикселей) в порядке важности
+        """
+        with self._condition:
+            jobs = list(dict.fromkeys(jobs))
+            # Прерванная страница продолжится в свою очередь, если все еще нужна
+            if self._suspended is not None and self._suspended[0].job not in jobs:
+                self._suspended = None
+            self._prefetch_queue = jobs
+            self._prefetch_generation += 1
+            self._condition.notify()
+
+        if jobs and not self.isRunning():
+            self.start()
+
+    def cancel(self):
+        """Отменяет ожидающий и выполняемый запросы."""
+        with self._condition:
+            self._latest_id += 1
+            self._pending = None
+
+    def stop(self):
+        """Останавливает поток и дожидается его завершения."""
+        with self._condition:
+            self._running = False
+            self._pending = None
+            self._prefetch_queue = []
+            self._suspended = None
+            self._latest_id += 1
+            self._condition.notify()
+        self.wait()
+
+    def is_stale(self, request: RenderRequest) -> bool:
+        """Проверяет, вытеснен ли запрос более новым."""
+        return request.request_id != self._latest_id
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._running and self._pending is None and not self._prefetch_queue:
+                    self._condition.wait()
+                if not self._running:
+                    break
+                request, self._pending = self._pending, None
+
+                if request is None:
+                    job = self._prefetch_queue.pop(0)
+                    if self._suspended is not None and self._suspended[0].job == job:
+                        task, self._suspended = self._suspended, None
+                    else:
+                        task = (RenderRequest(0, *job), None)
+                elif (request.tiles is None and self._suspended is not None
+                      and self._suspended[0].job == request.job):
+                    # Запрошенная страница уже рендерится упреждающе - продолжаем ее
+                    task = (request, self._suspended[1])
+                    self._suspended = None
+                    if request.job in self._prefetch_queue:
+                        self._prefetch_queue.remove(request.job)
+                else:
+                    task = (request, None)
+
+            if request is not None:
+                self._run_request(*task)
+            else:
+                self._run_prefetch(*task)
+
+        self._suspended = None
+        self._display_list = None
+        self._documents.close()
+
+    def _run_request(self, request: RenderRequest, steps):
+        """Рендерит запрошенную страницу, пока запрос не устарел."""
+        def on_event(kind, *args):
+            if kind == 'tile':
+                # Плитка пригодится и после вытеснения запроса - диалог кэширует ее
+                self.tile_rendered.emit(request.file_path, request.page, request.zoom,
+                                        request.device_pixel_ratio, *args)
+            elif not self.is_stale(request):
+                self.page_preview.emit(request.request_id, *args)
+
+        if steps is None:
+            if request.tiles is not None:
+                steps = self._tile_steps(request)
+            else:
+                steps = self._render_steps(request, progressive=True)
+
+        try:
+            image = self._finish(steps, lambda: self.is_stale(request), on_event)
+        except Exception as e:
+            if not self.is_stale(request):
+                self.render_failed.emit(request.request_id, f"Ошибка при отображении страницы: {str(e)}")
+            return
+
+        if image is not None and not self.is_stale(request):
+            self.page_rendered.emit(request.request_id, image)
+
+    def _run_prefetch(self, request: RenderRequest, steps):
+        """Рендерит страницу упреждающе, уступая место запрошенным страницам."""
+        steps = steps or self._render_steps(request)
+        generation = self._prefetch_generation
+        try:
+            image = self._finish(steps, lambda: (self._pending is not None or not self._running
+                                                 or self._prefetch_generation != generation))
+        except Exception:
+            # Ошибку покажет обычный рендеринг, если страницу действительно откроют
+            return
+
+        if image is None:
+            with self._condition:
+                if not self._running:
+                    return
+                if self._prefetch_generation != generation:
+                    # Очередь сменилась: страница остается, только если все еще нужна
+                    if request.job not in self._prefetch_queue:
+                        return
+                else:
+                    # Уступили запрошенной странице - продолжим следующими
+                    self._prefetch_queue.insert(0, request.job)
+                self._suspended = (request, steps)
+            return
+
+        self.page_prefetched.emit(request.file_path, request.page, request.zoom,
+                                  request.device_pixel_ratio, image)
+
+    @staticmethod
+    def _finish(steps, interrupted, on_event=None):
+        """Выполняет шаги рендеринга. Возвращает None, если рендеринг прерван."""
+        try:
+            while True:
+                if interrupted():
+                    return None
+                event = next(steps)
+                if event is not None and on_event is not None:
+                    on_event(*event)
+        except StopIteration as done:
+            return done.value
+
+    def _open_document(self, file_path: str):
+        """Возвращает документ из кэша открытых документов."""
+        doc = self._documents.open(file_path)
+        with self._condition:
+            # Прерванная задача ссылается на страницу вытесненного из кэша документа
+            if self._suspended is not None and self._suspended[0].file_path not in self._documents:
+                self._suspended = None
+        return doc
+
+    def _render_steps(self, request: RenderRequest, progressive: bool = False):
+        """
+        Рендерит страницу полосами, уступая управление после каждой.
+
+        Генератор: между полосами выдает None или эскиз (изображение, ширина,
+        высота), готовое изображение возвращает через StopIteration.value.
+        """
+        if fitz is None:
+            raise RuntimeError("PyMuPDF не установлен")
+
+        page, display_list = self._page_display_list(request)
+        matrix = fitz.Matrix(request.scale, request.scale)
+        area = fitz.IRect((page.rect * matrix).round())
+
+        if progressive and area.width * area.height > self.PROGRESSIVE_MIN_PIXELS:
+            yield from self._preview_steps(display_list, page.rect, matrix)
+
+        return (yield from self._rasterize(display_list, page.rect, matrix, request.device_pixel_ratio))
+
+    def _tile_steps(self, request: RenderRequest):
+        """Рендерит плитки страницы по одной, выдавая ('tile', столбец, строка, изображение)."""
+        if fitz is None:
+            raise RuntimeError("PyMuPDF не установлен")
+
+        page, display_list = self._page_display_list(request)
+        matrix = fitz.Matrix(request.scale, request.scale)
+        area = fitz.IRect((page.rect * matrix).round())
+
+        if request.with_preview:
+            yield from self._preview_steps(display_list, page.rect, matrix)
+
+        size = request.tile_size
+        for column, row in request.tiles:
+            yield
+            tile = fitz.IRect(area.x0 + column * size, area.y0 + row * size,
+                              area.x0 + (column + 1) * size, area.y0 + (row + 1) * size) & area
+            if tile.is_empty:
+                continue
+            pix = display_list.get_pixmap(matrix=matrix, clip=fitz.Rect(tile) / matrix, alpha=False)
+            if pix.irect == tile:
+                yield 'tile', column, row, RenderedImage(pix, 0, request.device_pixel_ratio)
+                continue
+            # Округление обрезки дало лишний пиксель - вырезаем ровно плитку
+            target = fitz.Pixmap(fitz.csRGB, tile, False)
+            target.copy(pix, tile)
+            yield 'tile', column, row, RenderedImage(target, len(target.samples_mv), request.device_pixel_ratio)
+
+        return None
+
+    def _preview_steps(self, display_list, rect, matrix):
+        """Рендерит эскиз страницы и выдает ('preview', эскиз, ширина, высота)."""
+        area = fitz.IRect((rect * matrix).round())
+        scale = min(1.0, math.sqrt(self.PREVIEW_PIXELS / (area.width * area.height)))
+        # Эскиз растягивается на размер страницы в пикселях устройства
+        preview = yield from self._rasterize(display_list, rect, matrix * scale)
+        yield 'preview', preview, area.width, area.height
+
+    def _page_display_list(self, request: RenderRequest):
+        """Возвращает страницу и ее список отображения (последний переиспользуется)."""
+        doc = self._open_document(request.file_path)
+        cached = self._display_list
+        if cached is None or cached[0] is not doc or cached[1] != request.page:
+            page = doc[request.page]
+            self._display_list = (doc, request.page, page, page.get_displaylist())
+        return self._display_list[2:]
+
+    def _rasterize(self, display_list, rect, matrix, device_pixel_ratio: float = 1.0):
+        """Растеризует список отображения полосами в RenderedImage."""
+        area = fitz.IRect((rect * matrix).round())
+
+        if area.height <= self.BAND_HEIGHT:
+            # Одна полоса - ее Pixmap и есть результат
+            yield
+            pix = display_list.get_pixmap(matrix=matrix, clip=rect, alpha=False)
+            if pix.irect == area:
+                return RenderedImage(pix, 0, device_pixel_ratio)
+            bands = [pix]
+        else:
+            bands = None
+
+        # Полосы собираются в общий Pixmap: это копирование всех строк один раз
+        # (учитывается в bytes_copied)
+        target = fitz.Pixmap(fitz.csRGB, area, False)
+        if bands:
+            target.copy(bands[0], area)
+        else:
+            for top in range(area.y0, area.y1, self.BAND_HEIGHT):
+                yield
+                band = fitz.Rect(area.x0, top, area.x1, min(top + self.BAND_HEIGHT, area.y1))
+                target.copy(display_list.get_pixmap(matrix=matrix, clip=band / matrix, alpha=False), band.irect)
+
+        return RenderedImage(target, len(target.samples_mv), device_pixel_ratio)
@@ -2,14 +2,39 @@
 Диалоги предпросмотра PDF файлов
 """
 
+import math
 import os
+import sqlite3
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QScrollArea, QComboBox, QToolButton, QPushButton,
-                             QWidget, QSplitter, QListWidget)
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap, QImage, QKeySequence, QShortcut, QFont
+                             QWidget, QSplitter, QListWidget, QListWidgetItem, QListView,
+                             QStackedWidget, QLineEdit)
+from PyQt6.QtCore import Qt, QEvent, QRect, QSize, QTimer
+from PyQt6.QtGui import QPixmap, QKeySequence, QShortcut, QFont
 import qtawesome as qta
+from core.document_cache import DocumentCache
+from core.metadata_cache import metadata_cache
+from core.pdf_worker import PDFInfoWorker
+from core.search_index import DEFAULT_SEARCH_LIMIT, SearchIndex, SearchIndexWorker
 from .styles import DIALOG_STYLES
+from .page_cache import page_cache
+from .page_renderer import PageRenderWorker
+from .widgets import ContinuousPageView, TiledPageView
+from .thumbnails import ThumbnailModel, THUMBNAIL_SIZE
+
+# Сколько страниц рендерится заранее вперед и назад от текущей
+PREFETCH_AHEAD = 2
+PREFETCH_BEHIND = 1
+
+# Как часто список файлов и статистика обновляются по мере подсчета (мс)
+STATS_UPDATE_INTERVAL = 150
+
+# Пауза после ввода в поле поиска до выполнения запроса (мс)
+SEARCH_DELAY = 200
+
+# Страницы больше этого размера показываются плитками - рендерится только видимая часть
+TILED_MIN_PIXELS = 4_000_000
+TILE_SIZE = 256
 
 try:
     import fitz  # PyMuPDF
@@ -23,11 +48,33 @@ class BasePDFPreviewDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.doc = None
+        # Открытые документы GUI потока: повторное открытие файла не разбирает его заново
+        self.documents = DocumentCache()
         self.current_page = 0
         self.total_pages = 0
         self.zoom_factor = 1.0
         self.setStyleSheet(DIALOG_STYLES)
 
+        # Рендеринг страниц в фоне; показываем только результат последнего запроса
+        self.render_request_id = None
+        self.render_key = None
+        self.tiled_page = None  # (файл, страница, масштаб, плотность пикселей) в режиме плиток
+        self.tiled_key = None
+        # Непрерывная прокрутка: (файл, масштаб, плотность пикселей) разложенного документа
+        self.continuous = False
+        self.continuous_layout = None
+        self.continuous_zooms = []
+        self.renderer = PageRenderWorker(self)
+        self.renderer.page_rendered.connect(self.on_page_rendered)
+        self.renderer.render_failed.connect(self.on_render_failed)
+        self.renderer.page_preview.connect(self.on_page_preview)
+        self.renderer.page_prefetched.connect(self.on_page_prefetched)
+        self.renderer.tile_rendered.connect(self.on_tile_rendered)
+
+    def current_file_path(self):
+        """Путь к файлу, страницы которого отображаются."""
+        return None
+
     def create_navigation_controls(self):
         """Создает элементы навигации."""
         # Кнопки навигации по страницам
@@ -49,6 +96,14 @@ class BasePDFPreviewDialog(QDialog):
         self.next_btn.clicked.connect(self.next_page)
         self.next_btn.setFixedSize(32, 32)
 
+        # Переключатель непрерывной прокрутки
+        self.continuous_btn = QToolButton()
+        self.continuous_btn.setIcon(qta.icon('fa5s.stream'))
+        self.continuous_btn.setToolTip('Непрерывная прокрутка')
+        self.continuous_btn.setCheckable(True)
+        self.continuous_btn.toggled.connect(self.set_continuous)
+        self.continuous_btn.setFixedSize(32, 32)
+
     def create_zoom_controls(self):
         """Создает элементы масштабирования."""
         # Выбор масштаба
@@ -84,36 +139,281 @@ class BasePDFPreviewDialog(QDialog):
 
         self.scroll_area.setWidget(self.preview_label)
 
+        # Крупные страницы: плитки догружаются при прокрутке
+        self.tiled_view = TiledPageView()
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(self.request_visible_tiles)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.request_visible_tiles)
+
+        # Непрерывная прокрутка: виджеты только для страниц рядом с видимой областью
+        self.continuous_view = ContinuousPageView()
+        self.continuous_view.verticalScrollBar().valueChanged.connect(self.update_continuous_view)
+        self.continuous_view.verticalScrollBar().rangeChanged.connect(self.update_continuous_view)
+
+        # Область предпросмотра: одна страница или непрерывная лента
+        self.preview_stack = QStackedWidget()
+        self.preview_stack.addWidget(self.scroll_area)
+        self.preview_stack.addWidget(self.continuous_view)
+
+    def set_preview_widget(self, widget):
+        """Поместить в область просмотра надпись, страницу из плиток или ленту страниц"""
+        if widget is self.continuous_view:
+            self.preview_stack.setCurrentWidget(self.continuous_view)
+            return
+
+        self.continuous_layout = None
+        self.preview_stack.setCurrentWidget(self.scroll_area)
+        if self.scroll_area.widget() is not widget:
+            # takeWidget: иначе QScrollArea удалит предыдущий виджет
+            self.scroll_area.takeWidget()
+            self.scroll_area.setWidget(widget)
+
+    def show_message(self, text):
+        """Показать сообщение вместо страницы"""
+        self.tiled_page = None
+        self.set_preview_widget(self.preview_label)
+        self.preview_label.setText(text)
+
     def display_page(self, page_num):
         """Отобразить указанную страницу PDF"""
         if not self.doc or page_num < 0 or page_num >= self.total_pages:
             return
 
-        try:
-            if not fitz:
-                self.preview_label.setText("PyMuPDF не установлен")
-                return
+        if not fitz:
+            self.show_message("PyMuPDF не установлен")
+            return
+
+        # Номер страницы обновляем сразу, изображение придет из потока рендеринга
+        self.page_label.setText(f'Страница: {page_num + 1} / {self.total_pages}')
+        self.update_navigation_buttons()
+
+        if self.continuous:
+            self.show_continuous(page_num)
+            return
+
+        # Страница рендерится в пикселях устройства - на HiDPI экране она не размыта
+        file_path = self.current_file_path()
+        dpr = self.devicePixelRatioF()
+        matrix = fitz.Matrix(self.zoom_factor * dpr, self.zoom_factor * dpr)
+        area = fitz.IRect((self.doc[page_num].rect * matrix).round())
+        if area.width * area.height > TILED_MIN_PIXELS:
+            # Соседние страницы такого размера заранее не рендерим - слишком много памяти
+            self.renderer.prefetch([])
+            self.show_tiled_page(file_path, page_num, area.width, area.height, dpr)
+            return
+
+        key = page_cache.make_key(file_path, page_num, self.zoom_factor, dpr)
+        pixmap = page_cache.get(key)
+        if pixmap is not None:
+            # Страница уже отрисована - отменяем незавершенный рендеринг
+            self.render_request_id = None
+            self.renderer.cancel()
+            self.show_pixmap(pixmap)
+        else:
+            self.render_key = key
+            self.render_request_id = self.renderer.request(file_path, page_num, self.zoom_factor, dpr)
+
+        # Упреждающий рендеринг начнется, когда текущая страница будет готова
+        self.schedule_prefetch(page_num)
+
+    def prefetch_candidates(self, page_num):
+        """Страницы (файл, номер), которые вероятно откроют следующими"""
+        file_path = self.current_file_path()
+        pages = [page_num + step for step in range(1, PREFETCH_AHEAD + 1)]
+        pages += [page_num - step for step in range(1, PREFETCH_BEHIND + 1)]
+        return [(file_path, page) for page in pages if 0 <= page < self.total_pages]
+
+    def schedule_prefetch(self, page_num):
+        """Поставить в очередь упреждающего рендеринга еще не отрисованные страницы"""
+        dpr = self.devicePixelRatioF()
+        jobs = [
+            (file_path, page, self.zoom_factor, dpr)
+            for file_path, page in self.prefetch_candidates(page_num)
+            if page_cache.make_key(file_path, page, self.zoom_factor, dpr) not in page_cache
+        ]
+        self.renderer.prefetch(jobs)
+
+    def on_page_prefetched(self, file_path, page_num, zoom, dpr, image):
+        """Сохранить заранее отрисованную страницу в кэш"""
+        key = page_cache.make_key(file_path, page_num, zoom, dpr)
+        pixmap = image.to_pixmap()
+        page_cache.put(key, pixmap)
+
+        if (self.continuous_layout == (file_path, self.zoom_factor, dpr)
+                and self.continuous_zooms[page_num] == zoom):
+            self.continuous_view.refresh_page(page_num)
+            return
 
-            # Получаем страницу
-            page = self.doc[page_num]
+        # Страницу успели запросить, пока она рендерилась заранее
+        if self.render_request_id is not None and key == self.render_key:
+            self.render_request_id = None
+            self.renderer.cancel()
+            self.show_pixmap(pixmap)
 
-            # Рендерим страницу с масштабом
-            pix = page.get_pixmap(matrix=fitz.Matrix(self.zoom_factor, self.zoom_factor))
+    def set_continuous(self, enabled):
+        """Включить или выключить непрерывную прокрутку"""
+        self.continuous = enabled
+        self.continuous_layout = None
+        if self.doc:
+            self.display_page(self.current_page)
 
-            # Преобразуем в QImage
-            img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
+    def show_continuous(self, page_num):
+        """Показать документ непрерывной лентой и прокрутить к странице"""
+        file_path = self.current_file_path()
+        dpr = self.devicePixelRatioF()
+        layout = (file_path, self.zoom_factor, dpr)
 
-            # Преобразуем в QPixmap и отображаем
-            pixmap = QPixmap.fromImage(img)
-            self.preview_label.setPixmap(pixmap)
-            self.preview_label.resize(pixmap.size())
+        if self.continuous_layout != layout:
+            try:
+                sizes = metadata_cache.page_sizes(file_path, self.doc)
+            except Exception as e:
+                self.show_message(f"Ошибка при загрузке PDF: {str(e)}")
+                return
 
-            # Обновляем информацию о текущей странице
+            # Запрошенная одиночная страница больше не нужна
+            self.tiled_page = None
+            self.render_request_id = None
+            self.renderer.cancel()
+
+            # Огромные страницы рендерятся с уменьшением и растягиваются в ленте
+            self.continuous_zooms = [
+                min(self.zoom_factor, math.sqrt(TILED_MIN_PIXELS / max(1.0, width * height * dpr * dpr)))
+                for width, height in sizes
+            ]
+            self.continuous_layout = layout
+            self.continuous_view.set_pages(
+                [(width * self.zoom_factor, height * self.zoom_factor) for width, height in sizes],
+                self.continuous_page,
+            )
+            self.set_preview_widget(self.continuous_view)
+
+        self.continuous_view.scroll_to_page(page_num)
+        self.update_continuous_view()
+        # Текущей остается выбранная страница, даже если до середины окна ее не докрутить
+        self.current_page = page_num
+        self.page_label.setText(f'Страница: {page_num + 1} / {self.total_pages}')
+        self.update_navigation_buttons()
+
+    def continuous_page(self, page_num):
+        """Страница ленты из кэша или None"""
+        file_path, _, dpr = self.continuous_layout
+        return page_cache.peek(page_cache.make_key(file_path, page_num, self.continuous_zooms[page_num], dpr))
+
+    def update_continuous_view(self, *args):
+        """Разместить виджеты видимых страниц и запросить рендеринг недостающих"""
+        if self.continuous_layout is None:
+            return
+
+        visible_rect = self.continuous_view.visible_rect()
+        viewport_height = visible_rect.height()
+        top = visible_rect.top()
+        visible = self.continuous_view.pages_in(top, top + viewport_height)
+        # Полоса в высоту окна сверху и снизу: страницы готовы до того, как их докрутят
+        nearby = self.continuous_view.pages_in(top - viewport_height, top + 2 * viewport_height)
+        self.continuous_view.show_pages(nearby)
+
+        # Текущей считается страница в середине окна
+        page_num = self.continuous_view.page_at(top + viewport_height // 2)
+        if page_num != self.current_page:
+            self.current_page = page_num
             self.page_label.setText(f'Страница: {page_num + 1} / {self.total_pages}')
             self.update_navigation_buttons()
 
-        except Exception as e:
-            self.preview_label.setText(f"Ошибка при отображении страницы: {str(e)}")
+        # Сначала видимые страницы, затем соседние
+        file_path, _, dpr = self.continuous_layout
+        pages = list(visible) + [page for page in nearby if page not in visible]
+        jobs = []
+        for page in pages:
+            job = (file_path, page, self.continuous_zooms[page], dpr)
+            if page_cache.make_key(*job) not in page_cache:
+                jobs.append(job)
+        self.renderer.prefetch(jobs)
+
+    def show_tiled_page(self, file_path, page_num, width, height, dpr):
+        """Показать крупную страницу плитками (размер страницы - в пикселях устройства)"""
+        self.render_key = None
+        self.tiled_page = (file_path, page_num, self.zoom_factor, dpr)
+        self.tiled_key = page_cache.make_key(file_path, page_num, self.zoom_factor, dpr)
+        self.tiled_view.set_page(width, height, TILE_SIZE, self.cached_tile, dpr)
+        self.set_preview_widget(self.tiled_view)
+        self.request_visible_tiles(with_preview=True)
+
+    def cached_tile(self, column, row):
+        """Плитка текущей страницы из кэша или None"""
+        return page_cache.peek(self.tiled_key + (column, row))
+
+    def request_visible_tiles(self, *args, with_preview=False):
+        """Запросить рендеринг видимых плиток (и полосы плиток вокруг), которых нет в кэше"""
+        if self.tiled_page is None:
+            return
+
+        viewport = self.scroll_area.viewport()
+        visible = QRect(self.scroll_area.horizontalScrollBar().value(),
+                        self.scroll_area.verticalScrollBar().value(),
+                        viewport.width(), viewport.height())
+        area = visible.adjusted(-TILE_SIZE, -TILE_SIZE, TILE_SIZE, TILE_SIZE)
+
+        visible_tiles = self.tiled_view.tiles_in(visible)
+        tiles = visible_tiles + [tile for tile in self.tiled_view.tiles_in(area) if tile not in visible_tiles]
+        tiles = [tile for tile in tiles if self.tiled_key + tile not in page_cache]
+
+        # Эскиз нужен, только если видимая часть еще не собрана из плиток
+        with_preview = with_preview and any(tile in tiles for tile in visible_tiles)
+        if not tiles:
+            self.render_request_id = None
+            self.renderer.cancel()
+            return
+
+        file_path, page_num, zoom, dpr = self.tiled_page
+        self.render_request_id = self.renderer.request_tiles(
+            file_path, page_num, zoom, dpr, tiles, TILE_SIZE, with_preview
+        )
+
+    def on_tile_rendered(self, file_path, page_num, zoom, dpr, column, row, image):
+        """Сохранить плитку в кэш и перерисовать ее, если страница на экране"""
+        key = page_cache.make_key(file_path, page_num, zoom, dpr) + (column, row)
+        page_cache.put(key, image.to_pixmap())
+        if self.tiled_page == (file_path, page_num, zoom, dpr):
+            self.tiled_view.update(self.tiled_view.tile_rect(column, row))
+
+    def on_page_preview(self, request_id, image, width, height):
+        """Показать эскиз страницы, пока рендерится полное изображение"""
+        if request_id != self.render_request_id:
+            return
+
+        if self.tiled_page is not None:
+            self.tiled_view.set_preview(image.to_pixmap())
+            return
+
+        # Эскиз растягивается на размер страницы при отрисовке, и только в видимой
+        # части: увеличенная копия размером с полную страницу не создается
+        self.tiled_view.set_page(width, height, TILE_SIZE, None, self.devicePixelRatioF())
+        self.tiled_view.set_preview(image.to_pixmap())
+        self.set_preview_widget(self.tiled_view)
+
+    def on_page_rendered(self, request_id, image):
+        """Показать отрендеренную страницу (устаревшие результаты игнорируются)"""
+        if request_id != self.render_request_id:
+            return
+
+        self.render_request_id = None
+        pixmap = image.to_pixmap()
+        page_cache.put(self.render_key, pixmap)
+        self.show_pixmap(pixmap)
+
+    def show_pixmap(self, pixmap):
+        """Показать изображение страницы"""
+        self.tiled_page = None
+        self.set_preview_widget(self.preview_label)
+        self.preview_label.setPixmap(pixmap)
+        self.preview_label.resize(pixmap.deviceIndependentSize().toSize())
+
+    def on_render_failed(self, request_id, message):
+        """Показать ошибку рендеринга последнего запроса"""
+        if request_id != self.render_request_id:
+            return
+
+        self.show_message(message)
+        self.preview_label.adjustSize()
 
     def prev_page(self):
         """Перейти к предыдущей странице"""
@@ -159,10 +459,24 @@ class BasePDFPreviewDialog(QDialog):
         self.zoom_in_btn.setEnabled(has_doc)
         self.zoom_out_btn.setEnabled(has_doc)
 
+    def event(self, event):
+        """При переносе окна на экран с другой плотностью пикселей перерисовываем страницу"""
+        # DevicePixelRatioChange есть начиная с Qt 6.6
+        if (event.type() == getattr(QEvent.Type, 'DevicePixelRatioChange', None)
+                and self.doc is not None and self.total_pages):
+            self.display_page(self.current_page)
+        return super().event(event)
+
+    def resizeEvent(self, event):
+        """При увеличении окна догружаем плитки, попавшие в область просмотра"""
+        super().resizeEvent(event)
+        self.request_visible_tiles()
+
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
-        if self.doc:
-            self.doc.close()
+        self.renderer.stop()
+        self.doc = None
+        self.documents.close()
         event.accept()
 
 
@@ -176,6 +490,9 @@ class PDFPreviewDialog(BasePDFPreviewDialog):
         if file_path:
             self.load_pdf(file_path)
 
+    def current_file_path(self):
+        return self.file_path
+
     def init_ui(self):
         self.setWindowTitle('Предварительный просмотр PDF')
         self.setGeometry(100, 30, 750, 690)
@@ -204,6 +521,7 @@ class PDFPreviewDialog(BasePDFPreviewDialog):
         nav_panel.addWidget(self.prev_btn)
         nav_panel.addWidget(self.page_label)
         nav_panel.addWidget(self.next_btn)
+        nav_panel.addWidget(self.continuous_btn)
         nav_panel.addStretch()
         controls_layout.addLayout(nav_panel)
 
@@ -218,7 +536,7 @@ class PDFPreviewDialog(BasePDFPreviewDialog):
         controls_layout.addLayout(zoom_panel)
 
         main_layout.addWidget(controls_widget)
-        main_layout.addWidget(self.scroll_area, 1)
+        main_layout.addWidget(self.preview_stack, 1)
 
         # Нижняя панель с кнопками
         bottom_panel = QHBoxLayout()
@@ -258,12 +576,12 @@ class PDFPreviewDialog(BasePDFPreviewDialog):
     def load_pdf(self, file_path):
         """Загрузить PDF файл для просмотра"""
         if not fitz:
-            self.preview_label.setText("PyMuPDF не установлен.\nУстановите библиотеку: pip install PyMuPDF")
+            self.show_message("PyMuPDF не установлен.\nУстановите библиотеку: pip install PyMuPDF")
             return
 
         try:
             self.file_path = file_path
-            self.doc = fitz.open(file_path)
+            self.doc = self.documents.open(file_path)
             self.total_pages = len(self.doc)
             self.current_page = 0
 
@@ -273,7 +591,7 @@ class PDFPreviewDialog(BasePDFPreviewDialog):
             self.setWindowTitle(f'Просмотр: {os.path.basename(file_path)}')
 
         except Exception as e:
-            self.preview_label.setText(f"Ошибка при загрузке PDF: {str(e)}")
+            self.show_message(f"Ошибка при загрузке PDF: {str(e)}")
 
 
 class MultiPreviewDialog(BasePDFPreviewDialog):
@@ -283,10 +601,55 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
         super().__init__(parent)
         self.file_paths = file_paths or []
         self.current_file_index = 0
+
+        # Страницы и размеры файлов: известные - из кэша метаданных, остальные считаются в фоне
+        self.file_infos = [metadata_cache.cached_file_info(file_path) for file_path in self.file_paths]
+        self.pending_infos = set()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setSingleShot(True)
+        self.stats_timer.setInterval(STATS_UPDATE_INTERVAL)
+        self.stats_timer.timeout.connect(self.apply_file_infos)
+
+        # Полнотекстовый поиск: текст файлов индексируется в фоне
+        self.search_index = None
+        self.search_worker = None
+        self.file_fingerprints = {}  # отпечаток -> индексы файлов с таким содержимым
+        self.indexed_files = 0
+        self.search_truncated = False  # найдено больше страниц, чем показано
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.run_search)
+
         self.init_ui()
+
+        self.info_worker = PDFInfoWorker(
+            [file_path for file_path, info in zip(self.file_paths, self.file_infos) if info is None], self
+        )
+        self.info_indexes = [index for index, info in enumerate(self.file_infos) if info is None]
+        self.info_worker.file_info_ready.connect(self.on_file_info_ready)
+        self.info_worker.finished.connect(self.apply_file_infos)
+        if self.info_indexes:
+            self.info_worker.start()
+
+        self.start_indexing()
+
         if self.file_paths:
             self.load_current_file()
 
+    def current_file_path(self):
+        if 0 <= self.current_file_index < len(self.file_paths):
+            return self.file_paths[self.current_file_index]
+        return None
+
+    def prefetch_candidates(self, page_num):
+        candidates = super().prefetch_candidates(page_num)
+        # Первая страница следующего файла
+        next_index = self.current_file_index + 1
+        if next_index < len(self.file_paths) and os.path.exists(self.file_paths[next_index]):
+            candidates.append((self.file_paths[next_index], 0))
+        return candidates
+
     def init_ui(self):
         self.setWindowTitle('Предпросмотр всех файлов')
         # Адаптируем под низкие разрешения
@@ -335,6 +698,27 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
         self.update_stats()
         file_layout.addWidget(self.stats_label)
 
+        # Поиск по тексту всех файлов
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Поиск по тексту (Ctrl+F)')
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setMaximumWidth(250)
+        self.search_edit.textChanged.connect(lambda: self.search_timer.start())
+        self.search_edit.returnPressed.connect(self.next_search_result)
+        file_layout.addWidget(self.search_edit)
+
+        self.search_status = QLabel()
+        self.search_status.setStyleSheet("color: #666; font-size: 11px;")
+        self.search_status.hide()
+        file_layout.addWidget(self.search_status)
+
+        self.search_results = QListWidget()
+        self.search_results.setMaximumWidth(250)
+        self.search_results.setWordWrap(True)
+        self.search_results.itemClicked.connect(self.open_search_result)
+        self.search_results.itemActivated.connect(self.open_search_result)
+        self.search_results.hide()
+
         # Список файлов
         self.file_list_widget = QListWidget()
         self.file_list_widget.setMaximumWidth(250)
@@ -348,7 +732,30 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
         # Подключаем сигнал выбора файла
         self.file_list_widget.currentRowChanged.connect(self.change_file)
 
-        file_layout.addWidget(self.file_list_widget, 1)
+        # Миниатюры всех страниц всех файлов
+        self.thumbnail_model = ThumbnailModel(self.file_paths, self.get_page_counts(), self,
+                                              self.devicePixelRatioF())
+        self.thumbnail_view = QListView()
+        self.thumbnail_view.setViewMode(QListView.ViewMode.IconMode)
+        self.thumbnail_view.setMovement(QListView.Movement.Static)
+        self.thumbnail_view.setResizeMode(QListView.ResizeMode.Adjust)
+        # Одинаковые ячейки: раскладка не опрашивает каждую строку
+        self.thumbnail_view.setUniformItemSizes(True)
+        self.thumbnail_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.thumbnail_view.setBatchSize(500)
+        self.thumbnail_view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.thumbnail_view.setGridSize(QSize(THUMBNAIL_SIZE + 16, THUMBNAIL_SIZE + 24))
+        self.thumbnail_view.setMaximumWidth(250)
+        self.thumbnail_view.setModel(self.thumbnail_model)
+        self.thumbnail_view.clicked.connect(self.open_thumbnail)
+
+        file_splitter = QSplitter(Qt.Orientation.Vertical)
+        file_splitter.addWidget(self.search_results)
+        file_splitter.addWidget(self.file_list_widget)
+        file_splitter.addWidget(self.thumbnail_view)
+        file_splitter.setSizes([200, 300])
+
+        file_layout.addWidget(file_splitter, 1)
         splitter.addWidget(file_panel)
 
         # Правая панель - просмотр PDF
@@ -385,6 +792,7 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
         nav_panel.addWidget(self.prev_btn)
         nav_panel.addWidget(self.page_label)
         nav_panel.addWidget(self.next_btn)
+        nav_panel.addWidget(self.continuous_btn)
         nav_panel.addStretch()
 
         # Выбор масштаба
@@ -395,7 +803,7 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
 
         controls_layout.addLayout(nav_panel)
         preview_layout.addWidget(controls_widget)
-        preview_layout.addWidget(self.scroll_area, 1)
+        preview_layout.addWidget(self.preview_stack, 1)
 
         splitter.addWidget(preview_panel)
 
@@ -439,31 +847,35 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
 
     def load_current_file(self):
         """Загрузить текущий PDF файл для просмотра"""
-        # Закрываем предыдущий документ, если он открыт
-        if self.doc:
-            self.doc.close()
-            self.doc = None
+        # Страница предыдущего файла больше не нужна
+        self.render_request_id = None
+        self.renderer.cancel()
+
+        # Предыдущий документ остается открытым в кэше документов
+        self.doc = None
 
         if not self.file_paths or self.current_file_index >= len(self.file_paths):
-            self.preview_label.setText("Нет файлов для предварительного просмотра")
+            self.show_message("Нет файлов для предварительного просмотра")
             self.update_navigation()
             return
 
         if not fitz:
-            self.preview_label.setText("PyMuPDF не установлен.\nУстановите библиотеку: pip install PyMuPDF")
+            self.show_message("PyMuPDF не установлен.\nУстановите библиотеку: pip install PyMuPDF")
             self.update_navigation()
             return
 
         try:
             file_path = self.file_paths[self.current_file_index]
             if not os.path.exists(file_path):
-                self.preview_label.setText(f"Файл не найден: {os.path.basename(file_path)}")
+                self.show_message(f"Файл не найден: {os.path.basename(file_path)}")
                 self.update_navigation()
                 return
 
-            self.doc = fitz.open(file_path)
+            self.doc = self.documents.open(file_path)
             self.current_page = 0
             self.total_pages = len(self.doc)
+            # Страницы открытого файла известны, не дожидаясь фонового подсчета
+            self.thumbnail_model.set_page_count(self.current_file_index, self.total_pages)
 
             # Обновляем информацию о файле и страницах
             self.file_info_label.setText(f'Файл: {os.path.basename(file_path)}')
@@ -478,9 +890,31 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
             # Обновляем состояние кнопок навигации
             self.update_navigation()
         except Exception as e:
-            self.preview_label.setText(f"Ошибка при загрузке PDF: {str(e)}")
+            self.show_message(f"Ошибка при загрузке PDF: {str(e)}")
             self.update_navigation()
 
+    def display_page(self, page_num):
+        super().display_page(page_num)
+        # Отмечаем страницу в миниатюрах
+        row = self.thumbnail_model.row_for(self.current_file_index, page_num)
+        if row >= 0:
+            index = self.thumbnail_model.index(row)
+            self.thumbnail_view.setCurrentIndex(index)
+            self.thumbnail_view.scrollTo(index)
+
+    def open_thumbnail(self, index):
+        """Открыть страницу, выбранную в миниатюрах"""
+        self.open_file_page(*self.thumbnail_model.locate(index.row()))
+
+    def open_file_page(self, file_index, page_num):
+        """Открыть страницу файла"""
+        if file_index != self.current_file_index:
+            self.current_file_index = file_index
+            self.load_current_file()
+        if 0 <= page_num < self.total_pages and page_num != self.current_page:
+            self.current_page = page_num
+            self.display_page(page_num)
+
     def prev_file(self):
         """Перейти к предыдущему файлу"""
         if self.current_file_index > 0:
@@ -526,47 +960,147 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
         self.zoom_combo.setEnabled(doc_has_pages)
 
     def update_stats(self):
-        """Обновить статистику файлов"""
+        """Обновить статистику файлов (по уже подсчитанным файлам)"""
         if not self.file_paths:
             self.stats_label.setText("Нет файлов")
             return
 
-        try:
-            from core.pdf_worker import PDFInfo
-
-            total_files = len(self.file_paths)
-            total_pages = 0
-            total_size = 0
-            valid_files = 0
-
-            for file_path in self.file_paths:
-                if os.path.exists(file_path):
-                    valid_files += 1
-                    info = PDFInfo.get_file_info(file_path)
-                    total_pages += info['pages']
-                    total_size += info['size']
+        total_files = len(self.file_paths)
+        known = [info for info in self.file_infos if info is not None]
+        valid_files = sum(1 for info in known if info['exists'])
+        total_pages = sum(info['pages'] for info in known)
+        size_mb = round(sum(info['size'] for info in known) / (1024 * 1024), 1)
+
+        stats_text = f"Файлов: {valid_files}/{total_files}\n"
+        stats_text += f"Страниц: {total_pages}\n"
+        stats_text += f"Размер: {size_mb} МБ"
+        if len(known) < total_files:
+            stats_text += f"\nПодсчет: {len(known)}/{total_files}…"
+
+        self.stats_label.setText(stats_text)
+
+    def on_file_info_ready(self, position, info):
+        """Запомнить информацию о файле; список и статистика обновляются пачками"""
+        index = self.info_indexes[position]
+        self.file_infos[index] = info
+        self.pending_infos.add(index)
+        if not self.stats_timer.isActive():
+            self.stats_timer.start()
+
+    def apply_file_infos(self):
+        """Обновить строки подсчитанных файлов, миниатюры и статистику"""
+        pending, self.pending_infos = self.pending_infos, set()
+        for index in sorted(pending):
+            self.file_list_widget.item(index).setText(self.get_file_display_name(self.file_paths[index], index))
+            self.thumbnail_model.set_page_count(index, self.file_infos[index]['pages'])
+        self.update_stats()
 
-            size_mb = round(total_size / (1024 * 1024), 1)
+    def start_indexing(self):
+        """Запустить фоновую индексацию текста (проиндексированные файлы не читаются)"""
+        if fitz is None or not self.file_paths or not SearchIndex.available():
+            self.search_edit.setEnabled(False)
+            self.search_edit.setPlaceholderText('Поиск по тексту недоступен')
+            return
+        try:
+            self.search_index = SearchIndex()
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ Поисковый индекс недоступен: {e}")
+            self.search_edit.setEnabled(False)
+            self.search_edit.setPlaceholderText('Поиск по тексту недоступен')
+            return
 
-            stats_text = f"Файлов: {valid_files}/{total_files}\n"
-            stats_text += f"Страниц: {total_pages}\n"
-            stats_text += f"Размер: {size_mb} МБ"
+        self.search_worker = SearchIndexWorker(self.file_paths, self.search_index, self)
+        self.search_worker.file_indexed.connect(self.on_file_indexed)
+        self.search_worker.finished.connect(self.update_search_status)
+        self.search_worker.start()
+
+    def on_file_indexed(self, index, fingerprint):
+        """Файл доступен для поиска; открытый запрос повторяется с его учетом"""
+        self.file_fingerprints.setdefault(fingerprint, []).append(index)
+        self.indexed_files += 1
+        if self.search_edit.text().strip() and not self.search_timer.isActive():
+            self.search_timer.start()
+
+    def run_search(self):
+        """Найти страницы с текстом из поля поиска во всех файлах"""
+        self.search_timer.stop()
+        text = self.search_edit.text().strip()
+        self.search_results.clear()
+        self.search_truncated = False
+        if not text or self.search_index is None:
+            self.search_results.hide()
+            self.search_status.hide()
+            return
 
-            self.stats_label.setText(stats_text)
+        # Файлы в порядке задания; на одну страницу больше лимита - чтобы знать, что список обрезан
+        first_index = {fingerprint: min(indexes) for fingerprint, indexes in self.file_fingerprints.items()}
+        fingerprints = sorted(first_index, key=first_index.get)
+        matches = self.search_index.search(text, fingerprints, DEFAULT_SEARCH_LIMIT + 1)
+        hits = sorted(
+            (file_index, page_num, snippet)
+            for fingerprint, page_num, snippet in matches[:DEFAULT_SEARCH_LIMIT]
+            for file_index in self.file_fingerprints.get(fingerprint, ())
+        )
+        if len(matches) > DEFAULT_SEARCH_LIMIT:
+            self.search_truncated = True
+            # Копии файлов дальше последней отобранной страницы могли бы перескочить пропущенные файлы
+            last_fingerprint, last_page, _ = matches[DEFAULT_SEARCH_LIMIT - 1]
+            last = (first_index[last_fingerprint], last_page)
+            hits = [hit for hit in hits if hit[:2] <= last][:DEFAULT_SEARCH_LIMIT]
+        for file_index, page_num, snippet in hits:
+            name = os.path.basename(self.file_paths[file_index])
+            item = QListWidgetItem(f"{file_index+1}. {name}, стр. {page_num+1}\n{snippet}")
+            item.setToolTip(snippet)
+            item.setData(Qt.ItemDataRole.UserRole, (file_index, page_num))
+            self.search_results.addItem(item)
+
+        self.search_results.setVisible(bool(hits))
+        self.update_search_status()
+
+    def update_search_status(self):
+        """Показать число найденных страниц и ход индексации"""
+        if not self.search_edit.text().strip():
+            self.search_status.hide()
+            return
+        count = self.search_results.count()
+        if self.search_truncated:
+            status = f"Найдено больше {count} страниц, показаны первые {count} - уточните запрос"
+        else:
+            status = f"Найдено страниц: {count}"
+        if self.search_worker is not None and self.search_worker.isRunning():
+            status += f" (индексация {self.indexed_files}/{len(self.file_paths)}…)"
+        self.search_status.setText(status)
+        self.search_status.show()
+
+    def open_search_result(self, item):
+        """Открыть страницу, найденную поиском"""
+        self.open_file_page(*item.data(Qt.ItemDataRole.UserRole))
+
+    def next_search_result(self):
+        """Перейти к следующей найденной странице (Enter в поле поиска)"""
+        if self.search_timer.isActive():
+            self.run_search()
+        count = self.search_results.count()
+        if count == 0:
+            return
+        row = (self.search_results.currentRow() + 1) % count
+        self.search_results.setCurrentRow(row)
+        self.open_search_result(self.search_results.item(row))
 
-        except Exception:
-            self.stats_label.setText(f"Файлов: {len(self.file_paths)}")
+    def get_page_counts(self):
+        """Количество страниц каждого файла (0 для отсутствующих и еще не подсчитанных)"""
+        return [info['pages'] if info else 0 for info in self.file_infos]
 
     def get_file_display_name(self, file_path, index):
         """Получить отображаемое имя файла с дополнительной информацией"""
         try:
-            from core.pdf_worker import PDFInfo
-
             base_name = os.path.basename(file_path)
-            if not os.path.exists(file_path):
+            info = self.file_infos[index]
+            if info is None:
+                return f"{index+1}. {base_name} …"
+            if not info['exists']:
                 return f"{index+1}. {base_name} ❌"
 
-            info = PDFInfo.get_file_info(file_path)
             if info['pages'] > 0:
                 return f"{index+1}. {base_name} ({info['pages']} стр.)"
             else:
@@ -595,6 +1129,9 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
         QShortcut(QKeySequence("Ctrl+-"), self, self.zoom_out)
         QShortcut(QKeySequence("Ctrl+0"), self, self.reset_zoom)
 
+        # Поиск
+        QShortcut(QKeySequence("Ctrl+F"), self, self.focus_search)
+
         # Закрытие
         QShortcut(QKeySequence("Escape"), self, self.close)
         QShortcut(QKeySequence("Ctrl+W"), self, self.close)
@@ -602,3 +1139,21 @@ class MultiPreviewDialog(BasePDFPreviewDialog):
     def reset_zoom(self):
         """Сбросить масштаб к 100%"""
         self.zoom_combo.setCurrentText('100%')
+
+    def focus_search(self):
+        """Перейти в поле поиска"""
+        self.search_edit.setFocus()
+        self.search_edit.selectAll()
+
+    def closeEvent(self, event):
+        """Обработчик закрытия окна"""
+        self.info_worker.stop()
+        self.stats_timer.stop()
+        self.search_timer.stop()
+        if self.search_worker is not None:
+            self.search_worker.stop()
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+        self.thumbnail_model.shutdown()
+        super().closeEvent(event)
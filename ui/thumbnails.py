@@ -0,0 +1,374 @@
+"""
+Миниатюры страниц для предпросмотра нескольких файлов
+
+ThumbnailModel представляет все страницы всех файлов одним плоским
+списком для QListView. Миниатюра запрашивается только тогда, когда
+представление запрашивает ее изображение, то есть для видимых ячеек;
+остальные строки ничего не стоят, поэтому список остается плавным и на
+десятках тысяч страниц. Рендеринг выполняет ThumbnailLoader в
+QThreadPool: новые запросы обрабатываются первыми (только что
+прокрученные ячейки), а самые старые отбрасываются, если пользователь
+пролистал их не дождавшись. Готовые миниатюры сохраняются в постоянный
+кэш на диске (core.thumbnail_store) и при следующем открытии читаются
+оттуда без рендеринга.
+
+PyMuPDF не отпускает GIL и не рассчитан на одновременную работу из
+нескольких потоков, поэтому пул рендерит миниатюры в один поток. Для
+больших заданий (FARM_MIN_THUMBNAILS страниц и больше) этот поток только
+раздает страницы процессам core.render_farm и забирает готовые
+изображения из разделяемой памяти - рендеринг масштабируется по ядрам.
+"""
+
+import os
+import threading
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import accumulate
+
+from PyQt6.QtCore import (QAbstractListModel, QModelIndex, QObject, QRunnable,
+                          QThreadPool, Qt, pyqtSignal)
+from PyQt6.QtGui import QColor, QImage, QPixmap
+
+from core.document_cache import DocumentCache
+from core.metadata_cache import metadata_cache
+from core.render_farm import RenderFarm, default_workers
+from core.thumbnail_store import ThumbnailStore
+from .page_cache import PagePixmapCache
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Размер миниатюры по большей стороне (пиксели)
+THUMBNAIL_SIZE = 96
+
+# Память под миниатюры в GUI (байт)
+THUMBNAIL_CACHE_BUDGET = 48 * 1024 * 1024
+
+# Сколько последних запросов хранится в очереди; более старые отбрасываются
+MAX_PENDING_THUMBNAILS = 256
+
+# Сколько документов держит открытыми поток миниатюр
+MAX_OPEN_DOCUMENTS = 4
+
+# Качество JPEG миниатюр в постоянном кэше
+THUMBNAIL_JPEG_QUALITY = 80
+
+# С какого количества страниц миниатюры рендерятся в пуле процессов
+FARM_MIN_THUMBNAILS = 200
+
+
+class _DrainJob(QRunnable):
+    """Задача пула: рендерит миниатюры, пока очередь не опустеет."""
+
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+
+    def run(self):
+        self.loader._drain()
+
+
+class ThumbnailLoader(QObject):
+    """Фоновый рендеринг миниатюр с приоритетом последних запросов."""
+
+    # Сигналы
+    thumbnail_ready = pyqtSignal(object, QImage)  # ключ запроса, миниатюра
+
+    def __init__(self, store=None, size: int = THUMBNAIL_SIZE, farm=None, parent=None):
+        """
+        Args:
+            store: Постоянный кэш миниатюр (ThumbnailStore) или None
+            size: Размер миниатюры по большей стороне (пиксели устройства)
+            farm: Пул процессов рендеринга (RenderFarm) или None - рендеринг в потоке
+        """
+        super().__init__(parent)
+        self.store = store
+        self.size = size
+        self.farm = farm
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+        self._lock = threading.Lock()
+        self._jobs = []  # (ключ, файл, страница), последние запросы - в конце
+        self._active = False
+        self._closed = False
+
+        # Открытые документы и отпечатки файлов используются только из потока пула
+        self._documents = DocumentCache(MAX_OPEN_DOCUMENTS)
+        self._fingerprints = {}
+
+    def request(self, key, file_path: str, page: int):
+        """
+        Ставит миниатюру в очередь.
+
+        Args:
+            key: Ключ, с которым придет сигнал thumbnail_ready
+
+        Returns:
+            list: ключи запросов, вытесненных из очереди (их нужно запросить заново)
+        """
+        with self._lock:
+            if self._closed:
+                return []
+            self._jobs.append((key, file_path, page))
+            dropped = []
+            if len(self._jobs) > MAX_PENDING_THUMBNAILS:
+                excess = len(self._jobs) - MAX_PENDING_THUMBNAILS
+                dropped = [job[0] for job in self._jobs[:excess]]
+                del self._jobs[:excess]
+            if not self._active:
+                self._active = True
+                self._pool.start(_DrainJob(self))
+        return dropped
+
+    def use_farm(self, farm):
+        """Переключает рендеринг на пул процессов (со следующего запроса)."""
+        with self._lock:
+            if self._closed or self.farm is not None:
+                farm.shutdown()
+                return
+            self.farm = farm
+
+    def stop(self):
+        """Отменяет очередь и дожидается текущей миниатюры."""
+        with self._lock:
+            self._closed = True
+            self._jobs.clear()
+        self._pool.waitForDone()
+        self._documents.close()
+        if self.farm is not None:
+            self.farm.shutdown()
+            self.farm = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def _drain(self):
+        while True:
+            if self.farm is not None:
+                self._drain_farm()
+                return
+
+            with self._lock:
+                if not self._jobs or self._closed:
+                    self._active = False
+                    return
+                key, file_path, page = self._jobs.pop()
+
+            try:
+                image = self._render(file_path, page)
+            except Exception:
+                # Пустая миниатюра: ячейка не будет запрашивать ее снова
+                image = QImage()
+            self.thumbnail_ready.emit(key, image)
+
+    def _drain_farm(self):
+        """Раздает миниатюры процессам рендеринга, держа каждый процесс занятым."""
+        in_flight = {}  # задание -> (ключ, страница, отпечаток)
+        try:
+            while True:
+                # Новые запросы - первыми, в работе не больше двух на процесс
+                while len(in_flight) < self.farm.workers * 2:
+                    with self._lock:
+                        if not self._jobs or self._closed:
+                            break
+                        key, file_path, page = self._jobs.pop()
+                    try:
+                        fingerprint, image = self._stored(file_path, page)
+                        if image is None:
+                            future = self.farm.submit(file_path, page, fit_size=self.size,
+                                                      jpeg_quality=THUMBNAIL_JPEG_QUALITY)
+                            in_flight[future] = (key, page, fingerprint)
+                            continue
+                    except Exception:
+                        image = QImage()
+                    self.thumbnail_ready.emit(key, image)
+
+                with self._lock:
+                    if self._closed or (not in_flight and not self._jobs):
+                        self._active = False
+                        return
+                if not in_flight:
+                    continue
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, page, fingerprint = in_flight.pop(future)
+                    try:
+                        frame = self.farm.collect(future)
+                    except Exception:
+                        self.thumbnail_ready.emit(key, QImage())
+                        continue
+                    image = QImage(frame.samples_mv, frame.width, frame.height, frame.stride,
+                                   QImage.Format.Format_RGB888).copy()
+                    frame.close()
+                    if fingerprint is not None:
+                        self.store.put(fingerprint, page, self.size, frame.jpeg)
+                    self.thumbnail_ready.emit(key, image)
+        finally:
+            # Забираем уже отрисованные изображения, иначе разделяемая память не освободится
+            for future in in_flight:
+                if not future.cancel():
+                    try:
+                        self.farm.collect(future).close()
+                    except Exception:
+                        pass
+
+    def _stored(self, file_path: str, page_num: int):
+        """Возвращает (отпечаток файла, миниатюра из постоянного кэша или None)."""
+        if self.store is None:
+            return None, None
+        if file_path not in self._fingerprints:
+            self._fingerprints[file_path] = metadata_cache.fingerprint(file_path)
+        fingerprint = self._fingerprints[file_path]
+        if fingerprint is None:
+            return None, None
+
+        data = self.store.get(fingerprint, page_num, self.size)
+        return fingerprint, QImage.fromData(data) if data is not None else None
+
+    def _render(self, file_path: str, page_num: int) -> QImage:
+        fingerprint, image = self._stored(file_path, page_num)
+        if image is not None:
+            return image
+
+        if fitz is None:
+            return QImage()
+
+        page = self._documents.open(file_path)[page_num]
+        scale = self.size / max(page.rect.width, page.rect.height, 1)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+
+        if fingerprint is not None:
+            self.store.put(fingerprint, page_num, self.size,
+                           pix.tobytes('jpg', jpg_quality=THUMBNAIL_JPEG_QUALITY))
+
+        return QImage(pix.samples, pix.width, pix.height, pix.stride,
+                      QImage.Format.Format_RGB888).copy()
+
+
+class ThumbnailModel(QAbstractListModel):
+    """Все страницы всех файлов как один список с ленивыми миниатюрами."""
+
+    def __init__(self, file_paths, page_counts, parent=None, device_pixel_ratio: float = 1.0):
+        """
+        Args:
+            file_paths: Пути к файлам
+            page_counts: Количество страниц каждого файла (0 - пока неизвестно, см. set_page_count)
+            device_pixel_ratio: Плотность пикселей экрана: миниатюры рендерятся в пикселях устройства
+        """
+        super().__init__(parent)
+        self.file_paths = list(file_paths)
+        self.device_pixel_ratio = device_pixel_ratio
+        self._page_counts = list(page_counts)
+        # Номер первой строки каждого файла (и общее число строк в конце)
+        self._offsets = [0] + list(accumulate(page_counts))
+
+        self._cache = PagePixmapCache(THUMBNAIL_CACHE_BUDGET)
+        self._requested = set()
+        self._failed = set()
+
+        self._placeholder = QPixmap(THUMBNAIL_SIZE * 3 // 4, THUMBNAIL_SIZE)
+        self._placeholder.fill(QColor('#e9ecef'))
+
+        self.loader = ThumbnailLoader(self._open_store(), round(THUMBNAIL_SIZE * device_pixel_ratio), parent=self)
+        self.loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self._update_farm()
+
+    @staticmethod
+    def _open_store():
+        """Открывает постоянный кэш миниатюр (без него миниатюры просто не сохраняются)."""
+        try:
+            return ThumbnailStore()
+        except Exception as e:
+            print(f"⚠️ Кэш миниатюр недоступен: {e}")
+            return None
+
+    def _update_farm(self):
+        """Подключает пул процессов, когда страниц стало много (если ядер больше одного)."""
+        if (self.loader.farm is None and self._offsets[-1] >= FARM_MIN_THUMBNAILS
+                and default_workers() >= 2 and RenderFarm.available()):
+            self.loader.use_farm(RenderFarm())
+
+    def set_page_count(self, file_index: int, count: int):
+        """Задает количество страниц файла, когда оно стало известно."""
+        old = self._page_counts[file_index]
+        if count == old:
+            return
+
+        first = self._offsets[file_index] + min(old, count)
+        last = self._offsets[file_index] + max(old, count) - 1
+        if count > old:
+            self.beginInsertRows(QModelIndex(), first, last)
+        else:
+            self.beginRemoveRows(QModelIndex(), first, last)
+        self._page_counts[file_index] = count
+        self._offsets = [0] + list(accumulate(self._page_counts))
+        if count > old:
+            self.endInsertRows()
+        else:
+            self.endRemoveRows()
+        self._update_farm()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._offsets[-1]
+
+    def locate(self, row: int):
+        """Возвращает (индекс_файла, страница) для строки."""
+        file_index = bisect_right(self._offsets, row) - 1
+        return file_index, row - self._offsets[file_index]
+
+    def row_for(self, file_index: int, page: int) -> int:
+        """Возвращает строку страницы файла или -1."""
+        if not 0 <= file_index < len(self.file_paths):
+            return -1
+        row = self._offsets[file_index] + page
+        return row if row < self._offsets[file_index + 1] else -1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        file_index, page = self.locate(index.row())
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{file_index + 1} · {page + 1}"
+
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{os.path.basename(self.file_paths[file_index])}, страница {page + 1}"
+
+        if role == Qt.ItemDataRole.DecorationRole:
+            # Ключ (файл, страница) не меняется, когда в модель добавляются строки
+            key = (file_index, page)
+            pixmap = self._cache.peek(key)
+            if pixmap is not None:
+                return pixmap
+            # Представление спрашивает изображение только у видимых ячеек
+            if key not in self._requested and key not in self._failed:
+                self._requested.add(key)
+                for dropped in self.loader.request(key, self.file_paths[file_index], page):
+                    self._requested.discard(dropped)
+            return self._placeholder
+
+        return None
+
+    def on_thumbnail_ready(self, key, image):
+        """Сохраняет готовую миниатюру и перерисовывает ячейку"""
+        self._requested.discard(key)
+        if image.isNull():
+            self._failed.add(key)
+            return
+
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(self.device_pixel_ratio)
+        self._cache.put(key, pixmap)
+        row = self.row_for(*key)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def shutdown(self):
+        """Останавливает рендеринг миниатюр."""
+        self.loader.stop()
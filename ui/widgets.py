@@ -2,118 +2,109 @@
 Пользовательские виджеты для PDF Merger Pro
 """
 
+import math
 import os
-from PyQt6.QtWidgets import QListWidget, QLabel
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QDragEnterEvent, QDropEvent
+from bisect import bisect_right
+from PyQt6.QtWidgets import QAbstractScrollArea, QListView, QLabel, QWidget
+from PyQt6.QtCore import Qt, QPoint, QRect, QRectF, QSize
+from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QPainter
 
+from core.file_converter import FileConverter
+from .job_model import JobListModel
 
-class PDFListWidget(QListWidget):
-    """Список PDF файлов с поддержкой drag & drop."""
+
+class PDFListView(QListView):
+    """Список файлов задания (JobListModel) с поддержкой drag & drop."""
+
+    PLACEHOLDER_STYLE = """
+        QListView {
+            border: 2px dashed #adb5bd;
+            border-radius: 12px;
+            background-color: #f8f9fa;
+            color: #6c757d;
+            font-size: 14px;
+            text-align: center;
+            padding: 40px;
+        }
+        QListView:focus {
+            border-color: #667eea;
+            background-color: #f8f9fa;
+        }
+    """
 
     def __init__(self):
         super().__init__()
+        self.jobs = JobListModel(self)
+        self.setModel(self.jobs)
+
         self.setAcceptDrops(True)
-        self.setDragDropMode(QListWidget.DragDropMode.InternalMove)
+        self.setDragDropMode(QListView.DragDropMode.InternalMove)
         self.setDefaultDropAction(Qt.DropAction.MoveAction)
-
-        # Улучшенный placeholder для пустого списка
-        self.setStyleSheet("""
-            QListWidget {
-                border: 2px dashed #adb5bd;
-                border-radius: 12px;
-                background-color: #f8f9fa;
-                color: #6c757d;
-                font-size: 14px;
-                text-align: center;
-                padding: 40px;
-            }
-            QListWidget:focus {
-                border-color: #667eea;
-                background-color: #f8f9fa;
-            }
-        """)
+        # Строки одной высоты: раскладка не опрашивает каждую строку
+        self.setUniformItemSizes(True)
 
         # Добавляем placeholder текст
         self.placeholder_text = "📁 Перетащите файлы сюда\n(PDF, Word, изображения, текст)\nили используйте кнопку 'Добавить файлы'"
+        self.jobs.rowsInserted.connect(self.update_placeholder)
+        self.jobs.rowsRemoved.connect(self.update_placeholder)
+        self.jobs.modelReset.connect(self.update_placeholder)
         self.update_placeholder()
 
     def update_placeholder(self):
         """Обновляет отображение placeholder текста"""
-        if self.count() == 0:
-            # Показываем placeholder
-            self.setStyleSheet("""
-                QListWidget {
-                    border: 2px dashed #adb5bd;
-                    border-radius: 12px;
-                    background-color: #f8f9fa;
-                    color: #6c757d;
-                    font-size: 14px;
-                    text-align: center;
-                    padding: 40px;
-                }
-                QListWidget:focus {
-                    border-color: #667eea;
-                    background-color: #f8f9fa;
-                }
-            """)
-        else:
-            # Обычный стиль для списка с элементами
-            self.setStyleSheet("")
+        # Смена стиля перестраивает оформление виджета - только при смене состояния
+        style = self.PLACEHOLDER_STYLE if len(self.jobs) == 0 else ""
+        if self.styleSheet() != style:
+            self.setStyleSheet(style)
 
-    def addItem(self, item):
-        """Переопределяем для обновления placeholder"""
-        super().addItem(item)
-        self.update_placeholder()
+    def current_row(self):
+        """Номер выбранной строки (-1 - ничего не выбрано)."""
+        index = self.currentIndex()
+        return index.row() if index.isValid() else -1
 
-    def clear(self):
-        """Переопределяем для обновления placeholder"""
-        super().clear()
-        self.update_placeholder()
-
-    def takeItem(self, row):
-        """Переопределяем для обновления placeholder"""
-        result = super().takeItem(row)
-        self.update_placeholder()
-        return result
+    def set_current_row(self, row):
+        """Выбирает строку."""
+        self.setCurrentIndex(self.jobs.index(row))
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         """Обработка входа при перетаскивании"""
         mime_data = event.mimeData()
         if mime_data and mime_data.hasUrls():
             event.accept()
+        elif event.source() is self:
+            super().dragEnterEvent(event)
         else:
             event.ignore()
 
+    def dragMoveEvent(self, event):
+        """Файлы извне принимаются в любом месте списка"""
+        mime_data = event.mimeData()
+        if mime_data and mime_data.hasUrls():
+            event.accept()
+        else:
+            super().dragMoveEvent(event)
+
     def dropEvent(self, event: QDropEvent):
         """Обработка сброса файлов"""
         mime_data = event.mimeData()
         if mime_data and mime_data.hasUrls():
             files = []
-            # Поддерживаемые расширения
-            supported_extensions = ['.pdf', '.doc', '.docx', '.txt', '.jpg', '.jpeg', '.png', '.bmp']
 
             for url in mime_data.urls():
                 if url.isLocalFile():
                     file_path = url.toLocalFile()
-                    # Проверяем расширение файла
-                    if any(file_path.lower().endswith(ext) for ext in supported_extensions):
+                    # Проверяем расширение файла по реестру конвертеров
+                    if FileConverter.is_supported_format(file_path):
                         files.append(file_path)
 
             if files:
-                # Добавляем только уникальные файлы
-                existing_files = []
-                for i in range(self.count()):
-                    item = self.item(i)
-                    if item:
-                        existing_files.append(item.text())
-                for file_path in files:
-                    if file_path and file_path not in existing_files:
-                        self.addItem(file_path)
+                # Уже добавленные файлы модель пропускает
+                self.jobs.add_paths(files)
                 event.accept()
             else:
                 event.ignore()
         else:
+            # Перестановка строк внутри списка (JobListModel.moveRows)
             super().dropEvent(event)
 
 
@@ -192,6 +183,222 @@ class FileCountWidget(QLabel):
         """)
 
 
+class TiledPageView(QWidget):
+    """Страница, собранная из плиток: рисуются только попавшие в область плитки."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tile_size = 256
+        self.tile_source = None  # функция (столбец, строка) -> QPixmap или None
+        self.preview = None      # эскиз страницы под еще не готовыми плитками
+        # Размер страницы и плиток задается в пикселях устройства, виджет - в логических
+        self.device_pixel_ratio = 1.0
+        self.page_size = QSize()
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+    def set_page(self, width, height, tile_size, tile_source, device_pixel_ratio=1.0):
+        """Задает размер страницы и плиток (пиксели устройства) и источник плиток"""
+        self.tile_size = tile_size
+        self.tile_source = tile_source
+        self.preview = None
+        self.device_pixel_ratio = device_pixel_ratio
+        self.page_size = QSize(width, height)
+        self.resize(math.ceil(width / device_pixel_ratio), math.ceil(height / device_pixel_ratio))
+        self.update()
+
+    def set_preview(self, pixmap):
+        """Задает эскиз страницы (растягивается на всю страницу)"""
+        self.preview = pixmap
+        self.update()
+
+    def tile_rect(self, column, row):
+        """Прямоугольник плитки в координатах виджета"""
+        return self._to_logical(self._tile_device_rect(column, row)).toAlignedRect().intersected(self.rect())
+
+    def _tile_device_rect(self, column, row):
+        size = self.tile_size
+        return QRect(column * size, row * size, size, size).intersected(QRect(QPoint(0, 0), self.page_size))
+
+    def _to_logical(self, rect):
+        ratio = self.device_pixel_ratio
+        return QRectF(rect.x() / ratio, rect.y() / ratio, rect.width() / ratio, rect.height() / ratio)
+
+    def tiles_in(self, rect):
+        """Плитки, пересекающие прямоугольник, - от центра прямоугольника к краям"""
+        rect = rect.intersected(self.rect())
+        if rect.isEmpty():
+            return []
+
+        # Прямоугольник в пикселях устройства
+        ratio = self.device_pixel_ratio
+        left = int(rect.x() * ratio)
+        top = int(rect.y() * ratio)
+        right = min(math.ceil((rect.x() + rect.width()) * ratio), self.page_size.width()) - 1
+        bottom = min(math.ceil((rect.y() + rect.height()) * ratio), self.page_size.height()) - 1
+        if right < left or bottom < top:
+            return []
+
+        size = self.tile_size
+        center_x = (left + right) / 2
+        center_y = (top + bottom) / 2
+        tiles = [
+            (column, row)
+            for row in range(top // size, bottom // size + 1)
+            for column in range(left // size, right // size + 1)
+        ]
+        tiles.sort(key=lambda tile: abs((tile[0] + 0.5) * size - center_x)
+                   + abs((tile[1] + 0.5) * size - center_y))
+        return tiles
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        exposed = event.rect()
+        painter.fillRect(exposed, Qt.GlobalColor.white)
+
+        if self.preview is not None and self.width() and self.height():
+            # Масштабируем только видимую часть эскиза
+            sx = self.preview.width() / self.width()
+            sy = self.preview.height() / self.height()
+            source = QRectF(exposed.x() * sx, exposed.y() * sy, exposed.width() * sx, exposed.height() * sy)
+            painter.drawPixmap(QRectF(exposed), self.preview, source)
+
+        if self.tile_source is None:
+            return
+        for column, row in self.tiles_in(exposed):
+            pixmap = self.tile_source(column, row)
+            if pixmap is not None:
+                # Плитка помечена плотностью пикселей и рисуется без масштабирования
+                painter.drawPixmap(self._to_logical(self._tile_device_rect(column, row)).topLeft(), pixmap)
+
+
+class ContinuousPageView(QAbstractScrollArea):
+    """
+    Все страницы документа одна под другой для непрерывной прокрутки.
+
+    Раскладка строится по известным размерам страниц, а виджеты создаются
+    только для страниц рядом с видимой областью: при прокрутке виджеты
+    ушедших страниц переиспользуются для новых, поэтому их число не зависит
+    от количества страниц. Высота ленты задается диапазоном полосы
+    прокрутки, а не размером виджета, и не упирается в предельный размер
+    виджета Qt.
+    """
+
+    SPACING = 12
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.page_source = None  # функция (страница) -> QPixmap или None
+        self._sizes = []         # логические размеры страниц (ширина, высота)
+        self._offsets = [0]      # верхняя граница каждой страницы (и высота в конце)
+        self._width = 0
+        self._assigned = {}      # страница -> QLabel
+        self._pool = []          # свободные QLabel
+        self.viewport().setStyleSheet("background-color: #e9ecef;")
+        self.verticalScrollBar().setSingleStep(40)
+        self.horizontalScrollBar().setSingleStep(20)
+
+    def set_pages(self, sizes, page_source):
+        """Задает логические размеры страниц и источник изображений"""
+        self.page_source = page_source
+        self._sizes = [(max(1, round(w)), max(1, round(h))) for w, h in sizes]
+        self._offsets = [0]
+        for _, height in self._sizes:
+            self._offsets.append(self._offsets[-1] + height + self.SPACING)
+        self._width = max((w for w, _ in self._sizes), default=0) + 2 * self.SPACING
+
+        for label in self._assigned.values():
+            label.hide()
+            self._pool.append(label)
+        self._assigned.clear()
+        self._update_scrollbars()
+
+    def page_count(self):
+        return len(self._sizes)
+
+    def content_height(self):
+        return self._offsets[-1] + self.SPACING
+
+    def visible_rect(self):
+        """Видимая область в координатах ленты"""
+        return QRect(self.horizontalScrollBar().value(), self.verticalScrollBar().value(),
+                     self.viewport().width(), self.viewport().height())
+
+    def page_rect(self, page):
+        """Прямоугольник страницы в координатах ленты"""
+        width, height = self._sizes[page]
+        return QRect(self.SPACING, self._offsets[page] + self.SPACING, width, height)
+
+    def page_at(self, y):
+        """Страница, на которую приходится координата y"""
+        if not self._sizes:
+            return -1
+        return max(0, min(bisect_right(self._offsets, y) - 1, len(self._sizes) - 1))
+
+    def pages_in(self, top, bottom):
+        """Страницы, пересекающие полосу [top, bottom]"""
+        if not self._sizes:
+            return range(0)
+        return range(self.page_at(top), self.page_at(bottom) + 1)
+
+    def scroll_to_page(self, page):
+        """Прокручивает ленту к началу страницы"""
+        self.verticalScrollBar().setValue(self._offsets[page])
+
+    def show_pages(self, pages):
+        """Размещает виджеты для указанных страниц, остальные возвращает в запас"""
+        pages = set(pages)
+        for page in [page for page in self._assigned if page not in pages]:
+            label = self._assigned.pop(page)
+            label.hide()
+            self._pool.append(label)
+
+        for page in sorted(pages - self._assigned.keys()):
+            label = self._pool.pop() if self._pool else self._create_label()
+            self._assigned[page] = label
+            self._place(page, label)
+            self.refresh_page(page)
+            label.show()
+
+    def refresh_page(self, page):
+        """Обновляет изображение страницы, если ее виджет размещен"""
+        label = self._assigned.get(page)
+        if label is None:
+            return
+        pixmap = self.page_source(page) if self.page_source else None
+        if pixmap is not None:
+            label.setPixmap(pixmap)
+        else:
+            label.setText(f"Страница {page + 1}")
+
+    def _create_label(self):
+        label = QLabel(self.viewport())
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # Изображение страницы может быть отрисовано в меньшем разрешении
+        label.setScaledContents(True)
+        label.setStyleSheet("background-color: white; color: #adb5bd;")
+        return label
+
+    def _place(self, page, label):
+        label.setGeometry(self.page_rect(page).translated(-self.horizontalScrollBar().value(),
+                                                          -self.verticalScrollBar().value()))
+
+    def _update_scrollbars(self):
+        viewport = self.viewport().size()
+        self.verticalScrollBar().setPageStep(viewport.height())
+        self.verticalScrollBar().setRange(0, max(0, self.content_height() - viewport.height()))
+        self.horizontalScrollBar().setPageStep(viewport.width())
+        self.horizontalScrollBar().setRange(0, max(0, self._width - viewport.width()))
+
+    def scrollContentsBy(self, dx, dy):
+        # Сдвигаем только размещенные виджеты - их несколько при любой длине документа
+        for page, label in self._assigned.items():
+            self._place(page, label)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+
 class CompactButton:
     """Фабрика для создания компактных кнопок."""
 